@@ -7,9 +7,14 @@ import yaml
 import platform
 import subprocess
 import shutil
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import streamlit as st
 
+from model_store import ModelStore
+
 # Try to import hardware detection libraries
 # These are optional and the installer will work without them
 HW_DETECTION_AVAILABLE = False
@@ -53,6 +58,27 @@ PLATFORM_TYPES = ["auto", "dgx_digit", "jetson_orin", "jetson_agx", "apple_silic
 GPU_VENDORS = ["auto", "nvidia", "amd", "apple", "cpu"]
 POWER_MODES = ["balanced", "performance", "efficiency"]
 
+# Image cache options: a cache node runs pull-through registry mirrors that
+# client nodes pull from over the LAN
+REGISTRY_MODES = ["none", "cache_node", "client"]
+REGISTRY_IMAGE = "docker.io/library/registry:2"
+# registry:2 proxies a single upstream, so each upstream gets its own mirror
+REGISTRY_MIRRORS = {
+    "docker.io": {"name": "dockerhub", "remote": "https://registry-1.docker.io", "port": 5000},
+    "ghcr.io": {"name": "ghcr", "remote": "https://ghcr.io", "port": 5001}
+}
+REGISTRIES_CONF = Path("/etc/containers/registries.conf.d/50-fusionloom-mirror.conf")
+DOCKER_DAEMON_CONFIG = Path("/etc/docker/daemon.json")
+IMAGE_DIGESTS_FILE = CONFIG_DIR / "image-digests.json"
+IMAGE_TARBALL_DIR = REPO_ROOT / "data" / "images"
+WEBUI_IMAGE = "ghcr.io/open-webui/open-webui:main"
+MANIFEST_ACCEPT = ", ".join([
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json"
+])
+
 # Platform directory mapping
 PLATFORM_DIR_MAPPING = {
     "apple_silicon": "apple",
@@ -246,6 +272,338 @@ def get_cpu_info():
         "arch": platform.machine()
     }
 
+# Image cache functions
+def parse_image_ref(ref):
+    """Split an image reference into (registry, repository, tag)"""
+    name, tag = ref, "latest"
+    if "@" in name:
+        name, tag = name.split("@", 1)
+    elif ":" in name.rsplit("/", 1)[-1]:
+        name, tag = name.rsplit(":", 1)
+
+    parts = name.split("/", 1)
+    if len(parts) == 2 and ("." in parts[0] or ":" in parts[0] or parts[0] == "localhost"):
+        registry, repository = parts
+    else:
+        registry, repository = "docker.io", name
+
+    if registry == "docker.io" and "/" not in repository:
+        repository = f"library/{repository}"
+    return registry, repository, tag
+
+def get_platform_dir(platform_type):
+    """Return the compose/platforms directory for a platform type"""
+    return PLATFORM_DIR_MAPPING.get(platform_type, platform_type)
+
+def get_required_images(settings, platform_type):
+    """List the images the selected services need"""
+    images = [WEBUI_IMAGE]
+    if settings['services'].get("ollama", False):
+        compose_file = REPO_ROOT / "compose" / "platforms" / get_platform_dir(platform_type) / "ollama-compose.yaml"
+        try:
+            with open(compose_file, "r") as f:
+                compose = yaml.safe_load(f)
+            images.extend(service["image"] for service in compose.get("services", {}).values() if service.get("image"))
+        except Exception as e:
+            print(f"Warning: Could not read images from {compose_file}: {e}")
+    return images
+
+def image_exists(container_engine, ref):
+    """Check whether an image is already in the local store"""
+    try:
+        result = subprocess.run([container_engine, "image", "inspect", ref], capture_output=True, text=True, check=False)
+        return result.returncode == 0
+    except:
+        return False
+
+def start_registry_cache(container_engine):
+    """Run the pull-through registry mirrors on this node"""
+    for upstream, mirror in REGISTRY_MIRRORS.items():
+        container_name = f"fusionloom-registry-{mirror['name']}"
+        storage_dir = REPO_ROOT / "data" / "registry" / mirror["name"]
+        os.makedirs(storage_dir, exist_ok=True)
+
+        running = subprocess.run(
+            [container_engine, "ps", "--filter", f"name=^{container_name}$", "--format", "{{.Names}}"],
+            capture_output=True, text=True, check=False
+        )
+        if container_name in running.stdout:
+            continue
+
+        # Remove a stopped container left from an earlier install
+        subprocess.run([container_engine, "rm", "-f", container_name], capture_output=True, check=False)
+        subprocess.run([
+            container_engine, "run", "-d",
+            "--name", container_name,
+            "--restart", "unless-stopped",
+            "-p", f"{mirror['port']}:5000",
+            "-e", f"REGISTRY_PROXY_REMOTEURL={mirror['remote']}",
+            "-v", f"{storage_dir}:/var/lib/registry",
+            REGISTRY_IMAGE
+        ], check=False)
+
+def configure_registry_mirror(container_engine, cache_host):
+    """Point the container engine at the cache node's mirrors
+
+    Podman consults the mirrors transparently for docker.io and ghcr.io
+    pulls. Docker only supports mirroring Docker Hub, so other registries
+    are pulled from the mirror explicitly (see pull_image).
+    """
+    try:
+        if container_engine == "podman":
+            os.makedirs(REGISTRIES_CONF.parent, exist_ok=True)
+            with open(REGISTRIES_CONF, "w") as f:
+                f.write("# Generated by the FusionLoom installer\n")
+                for upstream, mirror in REGISTRY_MIRRORS.items():
+                    f.write("\n[[registry]]\n")
+                    f.write(f'prefix = "{upstream}"\n')
+                    f.write(f'location = "{upstream}"\n')
+                    f.write("\n[[registry.mirror]]\n")
+                    f.write(f'location = "{cache_host}:{mirror["port"]}"\n')
+                    f.write("insecure = true\n")
+        elif container_engine == "docker":
+            daemon_config = {}
+            if DOCKER_DAEMON_CONFIG.exists():
+                with open(DOCKER_DAEMON_CONFIG, "r") as f:
+                    daemon_config = json.load(f)
+            previous = json.dumps(daemon_config, sort_keys=True)
+            mirror_url = f"http://{cache_host}:{REGISTRY_MIRRORS['docker.io']['port']}"
+            insecure = [f"{cache_host}:{mirror['port']}" for mirror in REGISTRY_MIRRORS.values()]
+            daemon_config["registry-mirrors"] = [mirror_url] + [m for m in daemon_config.get("registry-mirrors", []) if m != mirror_url]
+            daemon_config["insecure-registries"] = sorted(set(daemon_config.get("insecure-registries", [])) | set(insecure))
+            if json.dumps(daemon_config, sort_keys=True) != previous:
+                os.makedirs(DOCKER_DAEMON_CONFIG.parent, exist_ok=True)
+                with open(DOCKER_DAEMON_CONFIG, "w") as f:
+                    json.dump(daemon_config, f, indent=2)
+                # The daemon reads daemon.json only at startup; without a
+                # restart this install's Docker Hub pulls bypass the mirror
+                restarted = subprocess.run(["systemctl", "restart", "docker"], capture_output=True, text=True, check=False)
+                if restarted.returncode != 0:
+                    st.warning("The Docker registry mirror was configured, but the Docker daemon could not be "
+                               "restarted. Images are pulled directly from Docker Hub until it is restarted.")
+                    print(f"Warning: Could not restart Docker: {restarted.stderr.strip()}")
+                    return False
+        return True
+    except PermissionError:
+        print(f"Warning: Run the installer as root to configure the registry mirror for {container_engine}")
+    except Exception as e:
+        print(f"Warning: Could not configure the registry mirror: {e}")
+    return False
+
+def resolve_image_digest(ref, cache_host):
+    """Ask the cache node's mirror for the digest an image tag currently points at"""
+    registry, repository, tag = parse_image_ref(ref)
+    mirror = REGISTRY_MIRRORS.get(registry)
+    if mirror is None or tag.startswith("sha256:"):
+        return None
+
+    request = urllib.request.Request(
+        f"http://{cache_host}:{mirror['port']}/v2/{repository}/manifests/{tag}",
+        headers={"Accept": MANIFEST_ACCEPT},
+        method="HEAD"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.headers.get("Docker-Content-Digest")
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Warning: Could not resolve {ref} through the mirror at {cache_host}: {e}")
+        return None
+
+def load_image_digests():
+    """Load pinned image digests recorded by earlier installs"""
+    try:
+        with open(IMAGE_DIGESTS_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_image_digests(digests):
+    """Record pinned image digests so every node runs identical images"""
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    with open(IMAGE_DIGESTS_FILE, "w") as f:
+        json.dump(digests, f, indent=2, sort_keys=True)
+
+def image_tarball_path(tarball_dir, ref, digest=None):
+    """Where the tarball of an image is saved: named by its pinned digest, or else its tag"""
+    registry, repository, tag = parse_image_ref(ref)
+    version = digest or tag
+    return Path(tarball_dir) / f"{repository.replace('/', '_')}_{version.replace(':', '_')}.tar"
+
+def digest_tarballs(tarball_dir, ref):
+    """Tarballs saved for any pinned digest of an image's repository"""
+    registry, repository, tag = parse_image_ref(ref)
+    return list(Path(tarball_dir).glob(f"{repository.replace('/', '_')}_sha256_*.tar"))
+
+def seed_images_from_tarballs(container_engine, images, tarball_dir=IMAGE_TARBALL_DIR, digests=None):
+    """Load saved image tarballs (from '<engine> save') for images not in the local store
+
+    Only the tarball of an image's pinned digest is loaded. Without a pinned
+    digest, the tarball saved under its tag, or else the newest one a cache
+    node saved for its repository, is used. Tarballs loaded before are not
+    loaded again while the image is still present, since a loaded image
+    does not always keep its repository digest.
+    """
+    tarball_dir = Path(tarball_dir)
+    if not tarball_dir.is_dir():
+        return 0
+
+    state_file = tarball_dir / "loaded.json"
+    try:
+        with open(state_file, "r") as f:
+            already_loaded = set(json.load(f))
+    except (OSError, ValueError):
+        already_loaded = set()
+
+    loaded = 0
+    for ref in images:
+        digest = (digests or {}).get(ref)
+        registry, repository, tag = parse_image_ref(ref)
+        pinned = f"{registry}/{repository}@{digest}" if digest else ref
+        tarball = image_tarball_path(tarball_dir, ref, digest)
+        if not tarball.exists() and not digest:
+            tarball = max(digest_tarballs(tarball_dir, ref), key=lambda path: path.stat().st_mtime, default=tarball)
+        if not tarball.exists() or image_exists(container_engine, pinned):
+            continue
+        if tarball.name in already_loaded and image_exists(container_engine, ref):
+            continue
+
+        result = subprocess.run([container_engine, "load", "-i", str(tarball)], capture_output=True, text=True, check=False)
+        if result.returncode == 0:
+            loaded += 1
+            already_loaded.add(tarball.name)
+        else:
+            print(f"Warning: Could not load {tarball}: {result.stderr.strip()}")
+
+    if loaded:
+        with open(state_file, "w") as f:
+            json.dump(sorted(already_loaded), f, indent=2)
+    return loaded
+
+def save_image_tarballs(container_engine, images, tarball_dir=IMAGE_TARBALL_DIR, digests=None):
+    """Export images as tarballs that other nodes can be pre-seeded from
+
+    Pinned images are named after their digest, so a tarball is only
+    written again when the image it holds changes. Tarballs of digests the
+    image was pinned to before are removed.
+    """
+    os.makedirs(tarball_dir, exist_ok=True)
+    saved = 0
+    for ref in images:
+        digest = (digests or {}).get(ref)
+        tarball = image_tarball_path(tarball_dir, ref, digest)
+        if tarball.exists() or not image_exists(container_engine, ref):
+            continue
+        result = subprocess.run([container_engine, "save", "-o", str(tarball), ref], capture_output=True, text=True, check=False)
+        if result.returncode == 0:
+            saved += 1
+            if digest:
+                for stale in digest_tarballs(tarball_dir, ref):
+                    if stale != tarball:
+                        stale.unlink()
+        else:
+            print(f"Warning: Could not save {ref}: {result.stderr.strip()}")
+    return saved
+
+def pin_compose_images(src_file, dst_file, digests):
+    """Copy a compose file, pinning images to recorded digests
+
+    Pinned services lose their io.containers.autoupdate label, since
+    podman auto-update would otherwise move them back to the newest tag.
+    """
+    with open(src_file, "r") as f:
+        compose = yaml.safe_load(f)
+
+    pinned = 0
+    for service in (compose.get("services") or {}).values():
+        digest = digests.get(service.get("image"))
+        if not digest:
+            continue
+        registry, repository, tag = parse_image_ref(service["image"])
+        service["image"] = f"{registry}/{repository}@{digest}"
+        labels = service.get("labels")
+        if isinstance(labels, list):
+            service["labels"] = [label for label in labels if not str(label).startswith("io.containers.autoupdate")]
+        elif isinstance(labels, dict):
+            labels.pop("io.containers.autoupdate", None)
+        if not service.get("labels"):
+            service.pop("labels", None)
+        pinned += 1
+
+    if not pinned:
+        shutil.copy(src_file, dst_file)
+        return 0
+    with open(dst_file, "w") as f:
+        f.write(f"# Generated from {src_file} with images pinned by the FusionLoom installer\n")
+        yaml.safe_dump(compose, f, default_flow_style=False, sort_keys=False)
+    return pinned
+
+def pull_image(container_engine, ref, cache_host=None, digest=None):
+    """Pull one image, by digest and through the cache node when configured"""
+    registry, repository, tag = parse_image_ref(ref)
+    pinned = f"{registry}/{repository}@{digest}" if digest else ref
+
+    if image_exists(container_engine, pinned):
+        # Pre-seeded or already pulled; only make sure the tag points at it
+        if digest:
+            subprocess.run([container_engine, "tag", pinned, ref], check=False)
+        return True
+
+    source = pinned
+    if cache_host and container_engine == "docker" and registry in REGISTRY_MIRRORS and registry != "docker.io":
+        # Docker cannot mirror registries other than Docker Hub transparently
+        mirror = REGISTRY_MIRRORS[registry]
+        source = f"{cache_host}:{mirror['port']}/{repository}" + (f"@{digest}" if digest else f":{tag}")
+
+    result = subprocess.run([container_engine, "pull", source], check=False)
+    if result.returncode != 0:
+        return False
+    if source != ref:
+        subprocess.run([container_engine, "tag", source, ref], check=False)
+    return True
+
+def registry_cache_host(settings):
+    """The host serving the registry mirrors, or None without a cache"""
+    registry_mode = settings.get("registry_mode", "none")
+    if registry_mode == "cache_node":
+        return "localhost"
+    if registry_mode == "client":
+        return settings.get("registry_cache_host") or None
+    return None
+
+def pin_image_digests(images, settings):
+    """Resolve the digests the cache node serves, falling back to recorded ones"""
+    cache_host = registry_cache_host(settings)
+    digests = load_image_digests()
+    if cache_host:
+        for ref in images:
+            digest = resolve_image_digest(ref, cache_host)
+            if digest:
+                digests[ref] = digest
+        save_image_digests(digests)
+    return digests
+
+def pull_images(container_engine, images, settings, progress_bar, start, end, digests=None):
+    """Pull images concurrently, pinning them to the digests the cache node serves"""
+    cache_host = registry_cache_host(settings)
+    if digests is None:
+        digests = pin_image_digests(images, settings)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(images) or 1) as executor:
+        futures = {
+            executor.submit(pull_image, container_engine, ref, cache_host, digests.get(ref) if cache_host else None): ref
+            for ref in images
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            ref = futures[future]
+            try:
+                results[ref] = future.result()
+            except Exception as e:
+                print(f"Error pulling {ref}: {e}")
+                results[ref] = False
+            progress_bar.progress(start + (end - start) * done / len(futures), text=f"Pulled {ref}")
+    return results
+
 # Configuration functions
 def create_config(settings):
     """Create the configuration file"""
@@ -269,6 +627,8 @@ def create_config(settings):
         f.write("[Containers]\n")
         f.write(f"auto_start = {str(settings['auto_start']).lower()}\n")
         f.write(f"container_engine = {settings['container_engine']}\n")
+        f.write(f"registry_mode = {settings.get('registry_mode', 'none')}\n")
+        f.write(f"registry_cache_host = {settings.get('registry_cache_host', '')}\n")
         f.write("\n")
         
         f.write("[Hardware]\n")
@@ -277,6 +637,23 @@ def create_config(settings):
         f.write(f"acceleration = {str(settings['acceleration']).lower()}\n")
         f.write(f"platform = {settings['platform']}\n")
         f.write(f"power_mode = {settings['power_mode']}\n")
+        f.write("\n")
+        
+        f.write("[Power]\n")
+        f.write(f"policy = {settings.get('power_policy', 'manual')}\n")
+        f.write(f"schedule = {settings.get('power_schedule', '')}\n")
+        f.write("\n")
+        
+        f.write("[Fleet]\n")
+        f.write(f"peers = {settings.get('fleet_peers', '')}\n")
+        f.write("\n")
+        
+        f.write("[Providers]\n")
+        for provider in ("openai", "anthropic", "gemini"):
+            f.write(f"{provider}_rpm = 0\n")
+            f.write(f"{provider}_tpm = 0\n")
+        f.write(f"hedge_model = {settings.get('hedge_model', '')}\n")
+        f.write("hedge_after = 10\n")
     
     # Create .env file
     with open(ENV_FILE, "w") as f:
@@ -325,15 +702,52 @@ def install_containers(settings, progress_bar):
     except:
         pass
     
-    # Install the web UI container
-    progress_bar.progress(0.2, text="Installing web UI container...")
-    try:
-        if container_engine == "docker":
-            subprocess.run(["docker", "pull", "ghcr.io/open-webui/open-webui:main"], check=False)
-        elif container_engine == "podman":
-            subprocess.run(["podman", "pull", "ghcr.io/open-webui/open-webui:main"], check=False)
-    except:
-        pass
+    if container_engine in ("docker", "podman"):
+        # Set up the image cache
+        registry_mode = settings.get('registry_mode', 'none')
+        progress_bar.progress(0.12, text="Configuring image cache...")
+        try:
+            if registry_mode == "cache_node":
+                start_registry_cache(container_engine)
+                configure_registry_mirror(container_engine, "localhost")
+            elif registry_mode == "client" and settings.get('registry_cache_host'):
+                configure_registry_mirror(container_engine, settings['registry_cache_host'])
+
+        except Exception as e:
+            print(f"Warning: Image cache setup failed: {e}")
+
+        images = get_required_images(settings, platform_type)
+        digests = pin_image_digests(images, settings) if registry_mode != "none" else {}
+        try:
+            # Saved tarballs avoid the network entirely for images they contain
+            seeded = seed_images_from_tarballs(container_engine, images,
+                                               settings.get('image_tarball_dir') or IMAGE_TARBALL_DIR, digests)
+            if seeded:
+                print(f"Pre-seeded {seeded} image tarball(s)")
+        except Exception as e:
+            print(f"Warning: Loading image tarballs failed: {e}")
+
+        # Pull the web UI and service images
+        progress_bar.progress(0.15, text="Pulling container images...")
+        try:
+            results = pull_images(container_engine, images, settings, progress_bar, 0.15, 0.3, digests)
+            for ref, ok in results.items():
+                if not ok:
+                    print(f"Warning: Could not pull {ref}")
+        except Exception as e:
+            print(f"Warning: Pulling images failed: {e}")
+        
+        # The cache node exports what it pulled so new nodes can be pre-seeded
+        if registry_mode == "cache_node":
+            progress_bar.progress(0.3, text="Saving image tarballs for other nodes...")
+            try:
+                saved = save_image_tarballs(container_engine, images,
+                                            settings.get('image_tarball_dir') or IMAGE_TARBALL_DIR,
+                                            load_image_digests())
+                if saved:
+                    print(f"Saved {saved} image tarball(s)")
+            except Exception as e:
+                print(f"Warning: Saving image tarballs failed: {e}")
     
     # Install selected service containers
     progress_value = 0.3
@@ -350,19 +764,35 @@ def install_containers(settings, progress_bar):
                 # Copy the appropriate compose file
                 if service_id == "ollama":
                     # Map platform type to directory
-                    platform_dir = PLATFORM_DIR_MAPPING.get(platform_type, platform_type)
+                    platform_dir = get_platform_dir(platform_type)
                     
                     src_file = REPO_ROOT / "compose" / "platforms" / platform_dir / "ollama-compose.yaml"
                     dst_dir = REPO_ROOT / "data" / service_id
                     
                     if src_file.exists():
-                        shutil.copy(src_file, dst_dir / "docker-compose.yaml")
-                        print(f"Copied {src_file} to {dst_dir / 'docker-compose.yaml'}")
+                        # Digests are only pinned in the cache modes
+                        digests = load_image_digests() if settings.get('registry_mode', 'none') != "none" else {}
+                        pinned = pin_compose_images(src_file, dst_dir / "docker-compose.yaml", digests)
+                        print(f"Copied {src_file} to {dst_dir / 'docker-compose.yaml'}"
+                              + (f" with {pinned} image(s) pinned" if pinned else ""))
                     else:
                         print(f"Warning: Could not find compose file for platform {platform_type} at {src_file}")
                 
                 progress_value += progress_step
     
+    # Share identical model files (e.g. checkpoints used by both A1111 and
+    # ComfyUI) through the content-addressed model store
+    progress_bar.progress(0.98, text="Deduplicating model files...")
+    try:
+        store = ModelStore()
+        for service_id, enabled in settings['services'].items():
+            if enabled:
+                linked, reclaimed = store.dedupe_service(service_id)
+                if linked:
+                    print(f"Linked {linked} {service_id} model files into the shared store, reclaiming {reclaimed} bytes")
+    except Exception as e:
+        print(f"Warning: Model deduplication failed: {e}")
+    
     progress_bar.progress(1.0, text="Installation complete!")
     return True
 
@@ -419,6 +849,9 @@ def main():
             "power_mode": "balanced",
             "container_engine": container_engine,
             "auto_start": True,
+            "registry_mode": "none",
+            "registry_cache_host": "",
+            "image_tarball_dir": str(IMAGE_TARBALL_DIR),
             "theme": "dark",
             "save_sessions": True,
             "services": {service_id: service["default"] for service_type, services in AI_SERVICES.items() for service_id, service in services.items()}
@@ -570,6 +1003,28 @@ def main():
                 value=st.session_state.settings["auto_start"],
                 help="Automatically start containers when launching FusionLoom."
             )
+            
+            st.subheader("Image Cache")
+            
+            registry_mode = st.selectbox(
+                "Registry Cache Mode",
+                REGISTRY_MODES,
+                index=REGISTRY_MODES.index(st.session_state.settings.get("registry_mode", "none")),
+                help="cache_node runs a pull-through registry mirror for the fleet; client pulls images from a cache node over the LAN."
+            )
+            
+            registry_cache_host = st.text_input(
+                "Cache Node Address",
+                value=st.session_state.settings.get("registry_cache_host", ""),
+                disabled=registry_mode != "client",
+                help="Hostname or IP address of the node running the registry cache."
+            )
+            
+            image_tarball_dir = st.text_input(
+                "Image Tarball Directory",
+                value=st.session_state.settings.get("image_tarball_dir", str(IMAGE_TARBALL_DIR)),
+                help="Saved image tarballs in this directory are loaded before pulling anything."
+            )
         
         with col2:
             st.subheader("UI Settings")
@@ -591,6 +1046,9 @@ def main():
         st.session_state.settings.update({
             "container_engine": container_engine,
             "auto_start": auto_start,
+            "registry_mode": registry_mode,
+            "registry_cache_host": registry_cache_host.strip(),
+            "image_tarball_dir": image_tarball_dir.strip(),
             "theme": theme,
             "save_sessions": save_sessions
         })
@@ -664,6 +1122,7 @@ def main():
             st.markdown("**Container Settings**")
             st.markdown(f"Container Engine: {st.session_state.settings['container_engine']}")
             st.markdown(f"Auto-start Containers: {'Yes' if st.session_state.settings['auto_start'] else 'No'}")
+            st.markdown(f"Registry Cache: {st.session_state.settings.get('registry_mode', 'none')}")
             st.markdown(f"Theme: {st.session_state.settings['theme']}")
             st.markdown(f"Save Sessions: {'Yes' if st.session_state.settings['save_sessions'] else 'No'}")
         
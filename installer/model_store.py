@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import stat
+import errno
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# fcntl is only needed for reflinks, which are Linux-only anyway
+try:
+    import fcntl
+    REFLINK_AVAILABLE = sys.platform.startswith("linux")
+except ImportError:
+    REFLINK_AVAILABLE = False
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+DATA_DIR = Path(os.environ.get("DATA_DIR", REPO_ROOT / "data"))
+MODEL_STORE_DIR = DATA_DIR / "models"
+
+# Where each service keeps its model files, relative to DATA_DIR
+SERVICE_MODEL_DIRS = {
+    "ollama": "ollama/models/blobs",
+    "stable_diffusion": "stable_diffusion/models",
+    "comfyui": "comfyui/models",
+    "tts": "tts/models",
+    "stt": "stt/models"
+}
+
+# Only files at least this large are worth deduplicating
+MIN_MODEL_SIZE = 1024 * 1024
+HASH_BUFFER_SIZE = 8 * 1024 * 1024
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+def hash_file(path):
+    """Return the SHA-256 of a file, read in large blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BUFFER_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+def ollama_blob_hash(path):
+    """Return the digest encoded in an Ollama blob filename, if it is one"""
+    name = os.path.basename(path)
+    if name.startswith("sha256-") and len(name) == 71:
+        return name[7:]
+    return None
+
+def reflink(src, dst):
+    """Create dst as a copy-on-write clone of src"""
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+class ModelStore:
+    """Content-addressed store that services share model files through
+
+    Each blob is stored once under blobs/<hash[:2]>/<hash> and is read-only.
+    Services see blobs at their usual paths through reflinks (copy-on-write
+    clones, where the filesystem supports them) or hardlinks. index.json
+    records which service path uses which blob; blobs nothing refers to
+    are removed by gc().
+    """
+
+    def __init__(self, root=MODEL_STORE_DIR):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.index_file = self.root / "index.json"
+        self.lock = threading.Lock()
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("blobs", {})
+        index.setdefault("links", {})
+        return index
+
+    def save(self):
+        """Write the index atomically"""
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_file)
+
+    def blob_path(self, digest):
+        return self.blobs_dir / digest[:2] / digest
+
+    def _record_blob(self, digest):
+        blob = self.blob_path(digest)
+        st = blob.stat()
+        self.index["blobs"][digest] = {"size": st.st_size, "mtime": st.st_mtime, "inode": st.st_ino}
+
+    def add(self, path, digest=None):
+        """Put a file into the store, without copying when possible, and return its digest"""
+        path = Path(path)
+        digest = digest or ollama_blob_hash(path) or hash_file(path)
+        blob = self.blob_path(digest)
+
+        with self.lock:
+            if not blob.exists():
+                os.makedirs(blob.parent, exist_ok=True)
+                try:
+                    # A hardlink moves nothing and keeps the original in place
+                    os.link(path, blob)
+                except OSError:
+                    # Different filesystem: a real copy is unavoidable once
+                    tmp = blob.with_suffix(".partial")
+                    with open(path, "rb") as source, open(tmp, "wb") as target:
+                        while True:
+                            block = source.read(HASH_BUFFER_SIZE)
+                            if not block:
+                                break
+                            target.write(block)
+                    os.replace(tmp, blob)
+                os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                self._record_blob(digest)
+        return digest
+
+    def link(self, digest, service, relpath):
+        """Make a stored blob visible to a service at relpath inside its model directory"""
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            raise FileNotFoundError(f"Blob {digest} is not in the store")
+
+        target = DATA_DIR / SERVICE_MODEL_DIRS.get(service, service) / relpath
+        os.makedirs(target.parent, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.fusionloom-link")
+        if tmp.exists():
+            tmp.unlink()
+
+        method = "hardlink"
+        # The file add() hardlinked into the store already is the link; renaming
+        # another link to the same inode over it would be a no-op and leave tmp behind
+        if target.exists() and target.stat().st_ino == blob.stat().st_ino:
+            with self.lock:
+                self.index["links"].setdefault(service, {})[str(relpath)] = {"blob": digest, "method": method}
+            return method
+
+        if REFLINK_AVAILABLE:
+            try:
+                reflink(blob, tmp)
+                method = "reflink"
+            except OSError as e:
+                if tmp.exists():
+                    tmp.unlink()
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    raise
+        if method == "hardlink":
+            os.link(blob, tmp)
+        os.replace(tmp, target)
+        if tmp.exists():
+            tmp.unlink()
+
+        with self.lock:
+            self.index["links"].setdefault(service, {})[str(relpath)] = {"blob": digest, "method": method}
+        return method
+
+    def dedupe_service(self, service, min_size=MIN_MODEL_SIZE, workers=4):
+        """Move a service's existing model files into the store and link them back
+
+        Returns (files linked, bytes reclaimed). Files already linked to the
+        store are skipped without being hashed.
+        """
+        model_dir = DATA_DIR / SERVICE_MODEL_DIRS.get(service, service)
+        if not model_dir.is_dir():
+            return 0, 0
+
+        linked_inodes = {info["inode"] for info in self.index["blobs"].values()}
+        linked_paths = {relpath for users in self.references().values() for owner, relpath in users if owner == service}
+        candidates = []
+        for dirpath, dirnames, filenames in os.walk(model_dir):
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                if filename.startswith(".") or path.is_symlink():
+                    continue
+                st = path.stat()
+                if st.st_size < min_size or st.st_ino in linked_inodes:
+                    continue
+                if str(path.relative_to(model_dir)) in linked_paths:
+                    continue
+                candidates.append(path)
+
+        def digest_of(path):
+            return path, ollama_blob_hash(path) or hash_file(path)
+
+        linked = 0
+        reclaimed = 0
+        # Hashing is I/O-bound and hashlib releases the GIL on large blocks
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for path, digest in executor.map(digest_of, candidates):
+                existed = self.blob_path(digest).exists()
+                self.add(path, digest)
+                self.link(digest, service, path.relative_to(model_dir))
+                linked += 1
+                if existed:
+                    reclaimed += self.index["blobs"][digest]["size"]
+
+        self.save()
+        return linked, reclaimed
+
+    def references(self):
+        """Return {digest: [(service, relpath)]} for links that still point at their blob"""
+        refs = {}
+        for service, links in self.index["links"].items():
+            model_dir = DATA_DIR / SERVICE_MODEL_DIRS.get(service, service)
+            for relpath, link in links.items():
+                blob = self.index["blobs"].get(link["blob"])
+                try:
+                    st = (model_dir / relpath).stat()
+                except OSError:
+                    continue
+                # A replaced file no longer shares the blob's inode (hardlink) or size (reflink)
+                if blob is None or (link["method"] == "hardlink" and st.st_ino != blob["inode"]) or st.st_size != blob["size"]:
+                    continue
+                refs.setdefault(link["blob"], []).append((service, relpath))
+        return refs
+
+    def _freeable_bytes(self, digest):
+        """Return the disk space deleting a blob gives back
+
+        A blob some file outside the store still hardlinks to frees nothing.
+        """
+        try:
+            st = self.blob_path(digest).stat()
+        except OSError:
+            return 0
+        return st.st_size if st.st_nlink == 1 else 0
+
+    def gc(self, dry_run=False):
+        """Drop stale links and delete blobs no service refers to; returns (blobs, bytes) freed"""
+        refs = self.references()
+        live = {(service, relpath) for users in refs.values() for service, relpath in users}
+
+        freed_blobs = 0
+        freed_bytes = 0
+        for digest in list(self.index["blobs"]):
+            if digest in refs:
+                continue
+            freed_blobs += 1
+            freed_bytes += self._freeable_bytes(digest)
+            if not dry_run:
+                try:
+                    self.blob_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+                del self.index["blobs"][digest]
+
+        if not dry_run:
+            for service, links in self.index["links"].items():
+                for relpath in [r for r in links if (service, r) not in live]:
+                    del links[relpath]
+            # Temporary links left behind by an interrupted link()
+            for model_dir in SERVICE_MODEL_DIRS.values():
+                for tmp in (DATA_DIR / model_dir).rglob(".*.fusionloom-link"):
+                    tmp.unlink()
+            self.save()
+        return freed_blobs, freed_bytes
+
+    def verify(self, full=False, workers=4):
+        """Check blob integrity and return the digests that failed
+
+        The quick check compares size, mtime and inode with the index, which
+        catches truncation and replacement without reading any data. full
+        re-hashes every blob.
+        """
+        def check(item):
+            digest, info = item
+            blob = self.blob_path(digest)
+            try:
+                st = blob.stat()
+            except OSError:
+                return digest
+            if st.st_size != info["size"] or st.st_mtime != info["mtime"] or st.st_ino != info["inode"]:
+                return digest
+            if full and hash_file(blob) != digest:
+                return digest
+            return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return [digest for digest in executor.map(check, list(self.index["blobs"].items())) if digest]
+
+    def status(self):
+        """Summarize store usage and what deduplication saved"""
+        refs = self.references()
+        stored = sum(info["size"] for info in self.index["blobs"].values())
+        logical = sum(self.index["blobs"][digest]["size"] * len(users) for digest, users in refs.items())
+        # Each extra service path sharing a blob is a copy that was not made
+        saved = sum(self.index["blobs"][digest]["size"] * (len(users) - 1) for digest, users in refs.items())
+        reclaimable = sum(self._freeable_bytes(digest) for digest in self.index["blobs"] if digest not in refs)
+        return {
+            "blobs": len(self.index["blobs"]),
+            "stored_bytes": stored,
+            "logical_bytes": logical,
+            "saved_bytes": saved,
+            "reclaimable_bytes": reclaimable,
+            "services": {service: len(links) for service, links in self.index["links"].items()}
+        }
+
+def format_size(size):
+    """Format a byte count for humans"""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FusionLoom shared model store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    dedupe_parser = commands.add_parser("dedupe", help="Move service model files into the store and link them back")
+    dedupe_parser.add_argument("services", nargs="*", default=list(SERVICE_MODEL_DIRS), help="Services to process")
+
+    add_parser = commands.add_parser("add", help="Add a model file and link it into services")
+    add_parser.add_argument("path", help="Model file to add")
+    add_parser.add_argument("--link", action="append", default=[], metavar="SERVICE:RELPATH",
+                            help="Make the model visible to a service, e.g. comfyui:checkpoints/sdxl.safetensors")
+
+    gc_parser = commands.add_parser("gc", help="Delete blobs that no service uses")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Only report what would be freed")
+
+    verify_parser = commands.add_parser("verify", help="Check blob integrity")
+    verify_parser.add_argument("--full", action="store_true", help="Re-hash every blob instead of the quick stat check")
+
+    commands.add_parser("status", help="Show store usage")
+
+    args = parser.parse_args()
+    store = ModelStore()
+
+    if args.command == "dedupe":
+        for service in args.services:
+            linked, reclaimed = store.dedupe_service(service)
+            print(f"{service}: linked {linked} files, reclaimed {format_size(reclaimed)}")
+    elif args.command == "add":
+        digest = store.add(args.path)
+        for spec in args.link:
+            service, _, relpath = spec.partition(":")
+            method = store.link(digest, service, relpath or os.path.basename(args.path))
+            print(f"Linked {digest[:12]} into {service} ({method})")
+        store.save()
+        print(digest)
+    elif args.command == "gc":
+        blobs, size = store.gc(dry_run=args.dry_run)
+        print(f"{'Would free' if args.dry_run else 'Freed'} {blobs} blobs ({format_size(size)})")
+    elif args.command == "verify":
+        failed = store.verify(full=args.full)
+        for digest in failed:
+            print(f"Corrupt or missing: {digest}")
+        print(f"Checked {len(store.index['blobs'])} blobs, {len(failed)} failed")
+        sys.exit(1 if failed else 0)
+    elif args.command == "status":
+        status = store.status()
+        print(f"Blobs: {status['blobs']} ({format_size(status['stored_bytes'])} on disk)")
+        print(f"Used by services: {format_size(status['logical_bytes'])}, saved {format_size(status['saved_bytes'])}")
+        print(f"Reclaimable by gc: {format_size(status['reclaimable_bytes'])}")
+        for service, count in status["services"].items():
+            print(f"  {service}: {count} files")
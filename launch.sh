@@ -26,8 +26,10 @@ cd "${SCRIPT_DIR}/server"
 if ! command -v python3 &> /dev/null; then
     echo "Python 3 is not installed. Please install Python 3 to use the system information API."
 else
-    # Install Flask and flask-cors if not already installed
-    python3 -m pip install flask flask-cors &> /dev/null
+    # Install the API server dependencies if not already installed
+    python3 -m pip install -r requirements.txt &> /dev/null
+    # Bundle, hash and precompress the UI's static assets
+    python3 build_assets.py > "${SCRIPT_DIR}/logs/build_assets.log" 2>&1 || echo "Warning: static asset build failed, serving unbundled UI"
     # Start the API server in the background
     nohup python3 system_info.py --serve 5050 > "${SCRIPT_DIR}/logs/system_api.log" 2>&1 &
     echo "System information API started at http://localhost:5050/api/system-info"
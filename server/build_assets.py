@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import gzip
+import hashlib
+from pathlib import Path
+
+# Brotli is optional; without it only gzip variants are generated
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+UI_DIR = REPO_ROOT / "ui"
+STATIC_DIR = UI_DIR / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_FILE = DIST_DIR / "manifest.json"
+
+# Entry points that index.html loads
+CSS_ENTRY = "css/fusionloom.css"
+JS_ENTRY = "js/fusionloom.js"
+
+# Length of the content hash embedded in output filenames
+HASH_LENGTH = 10
+
+# Files smaller than this are not worth precompressing
+MIN_COMPRESS_SIZE = 256
+
+CSS_IMPORT_RE = re.compile(r"""@import\s+(?:url\()?\s*['"]([^'"]+)['"]\s*\)?\s*;""")
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+JS_STATIC_IMPORT_RE = re.compile(
+    r"""^[ \t]*import\s+(?:(?P<clause>[\w$*{}\s,]+?)\s+from\s+)?['"](?P<spec>[^'"]+)['"]\s*;?[ \t]*$""",
+    re.MULTILINE
+)
+JS_DYNAMIC_IMPORT_RE = re.compile(r"""\bimport\(\s*['"]([^'"]+)['"]\s*\)""")
+JS_EXPORT_DECL_RE = re.compile(
+    r"""^([ \t]*)export\s+((?:async\s+)?function\s*\*?\s*|class\s+|const\s+|let\s+|var\s+)([A-Za-z_$][\w$]*)""",
+    re.MULTILINE
+)
+JS_EXPORT_LIST_RE = re.compile(r"""^[ \t]*export\s*\{([^}]*)\}\s*;?[ \t]*$""", re.MULTILINE)
+
+class BuildError(Exception):
+    """Raised when the static assets cannot be bundled"""
+
+# CSS bundling
+def bundle_css(entry, seen=None):
+    """Inline @import rules recursively, rebasing url() references to the static root"""
+    if seen is None:
+        seen = set()
+
+    path = (STATIC_DIR / entry).resolve()
+    if path in seen:
+        return ""
+    seen.add(path)
+
+    if not path.exists():
+        raise BuildError(f"CSS file not found: {path}")
+
+    css = path.read_text(encoding="utf-8")
+    css = rebase_css_urls(css, path.parent)
+
+    def inline(match):
+        target = match.group(1)
+        if "://" in target or target.startswith("//"):
+            # Leave remote stylesheets for the browser to fetch
+            return match.group(0)
+        resolved = (path.parent / target).resolve().relative_to(STATIC_DIR.resolve())
+        return bundle_css(resolved.as_posix(), seen)
+
+    return CSS_IMPORT_RE.sub(inline, css)
+
+def rebase_css_urls(css, base_dir):
+    """Rewrite relative url() references so they still resolve from the dist directory"""
+    def rebase(match):
+        quote, target = match.group(1), match.group(2).strip()
+        if target.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        resolved = (base_dir / target).resolve()
+        rebased = os.path.relpath(resolved, DIST_DIR.resolve()).replace(os.sep, "/")
+        return f"url({quote}{rebased}{quote})"
+
+    return CSS_URL_RE.sub(rebase, css)
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from CSS, leaving strings untouched"""
+    out = []
+    pending_space = False
+    i = 0
+    length = len(css)
+
+    def emit(text):
+        nonlocal pending_space
+        # Whitespace next to these characters is never significant
+        if pending_space and out and out[-1][-1] not in "{};,>:" and text[0] not in "{};,>":
+            out.append(" ")
+        pending_space = False
+        out.append(text)
+
+    while i < length:
+        char = css[i]
+        if char in "\"'":
+            end = i + 1
+            while end < length and css[end] != char:
+                end += 2 if css[end] == "\\" else 1
+            emit(css[i:end + 1])
+            i = end + 1
+        elif css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            pending_space = True
+        elif char.isspace():
+            while i < length and css[i].isspace():
+                i += 1
+            pending_space = True
+        else:
+            if char == "}" and out and out[-1] == ";":
+                out.pop()
+            emit(char)
+            i += 1
+
+    return "".join(out)
+
+# JavaScript bundling
+def module_id(path):
+    """Return the bundle module ID for a JavaScript file"""
+    return path.resolve().relative_to((STATIC_DIR / "js").resolve()).as_posix()
+
+def resolve_specifier(spec, importer):
+    """Resolve a relative import specifier against the importing file"""
+    if not spec.startswith("."):
+        raise BuildError(f"Only relative imports can be bundled: '{spec}' in {importer}")
+    resolved = (importer.parent / spec).resolve()
+    if not resolved.exists():
+        raise BuildError(f"Cannot resolve '{spec}' imported from {importer}")
+    return resolved
+
+def import_clause_to_js(clause, require_expr):
+    """Turn an ES import clause into an equivalent variable declaration"""
+    clause = clause.strip()
+    if clause.startswith("*"):
+        name = clause.split("as", 1)[1].strip()
+        return f"const {name} = {require_expr};"
+
+    parts = []
+    default_name = None
+    named = re.search(r"\{([^}]*)\}", clause)
+    if named:
+        for item in named.group(1).split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if " as " in item:
+                original, alias = [p.strip() for p in item.split(" as ", 1)]
+                parts.append(f"{original}: {alias}")
+            else:
+                parts.append(item)
+        default_name = clause[:named.start()].strip().rstrip(",").strip() or None
+    else:
+        default_name = clause
+
+    statements = []
+    if default_name:
+        statements.append(f"const {default_name} = {require_expr}.default;")
+    if parts:
+        statements.append(f"const {{ {', '.join(parts)} }} = {require_expr};")
+    return " ".join(statements)
+
+def transform_module(path):
+    """Rewrite one ES module into a factory body for the bundle's module registry"""
+    source = path.read_text(encoding="utf-8")
+    dependencies = []
+    exports = {}
+
+    if re.search(r"^[ \t]*export\s+default\b", source, re.MULTILINE):
+        raise BuildError(f"Default exports are not supported by the bundler: {path}")
+
+    def static_import(match):
+        dep = resolve_specifier(match.group("spec"), path)
+        dependencies.append(dep)
+        require_expr = f"__fl_require({json.dumps(module_id(dep))})"
+        clause = match.group("clause")
+        if not clause:
+            return f"{require_expr};"
+        return import_clause_to_js(clause, require_expr)
+
+    def dynamic_import(match):
+        dep = resolve_specifier(match.group(1), path)
+        dependencies.append(dep)
+        return f"Promise.resolve().then(() => __fl_require({json.dumps(module_id(dep))}))"
+
+    def export_decl(match):
+        exports[match.group(3)] = match.group(3)
+        return f"{match.group(1)}{match.group(2)}{match.group(3)}"
+
+    def export_list(match):
+        for item in match.group(1).split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if " as " in item:
+                local, exported = [p.strip() for p in item.split(" as ", 1)]
+            else:
+                local = exported = item
+            exports[exported] = local
+        return ""
+
+    source = JS_STATIC_IMPORT_RE.sub(static_import, source)
+    source = JS_DYNAMIC_IMPORT_RE.sub(dynamic_import, source)
+    source = JS_EXPORT_DECL_RE.sub(export_decl, source)
+    source = JS_EXPORT_LIST_RE.sub(export_list, source)
+
+    # Exports are live getters defined before the body runs, so function
+    # declarations (which are hoisted) are reachable even across import cycles
+    prologue = "".join(
+        f"Object.defineProperty(exports, {json.dumps(exported)}, {{ enumerable: true, get: () => {local} }});\n"
+        for exported, local in exports.items()
+    )
+    return prologue + source, dependencies
+
+def bundle_js(entry):
+    """Bundle an ES module graph into a single script with a small module registry"""
+    entry_path = (STATIC_DIR / entry).resolve()
+    if not entry_path.exists():
+        raise BuildError(f"JavaScript entry point not found: {entry_path}")
+
+    factories = {}
+    pending = [entry_path]
+    while pending:
+        path = pending.pop()
+        mid = module_id(path)
+        if mid in factories:
+            continue
+        body, dependencies = transform_module(path)
+        factories[mid] = body
+        pending.extend(dependencies)
+
+    parts = [
+        "(function () {\n",
+        "\"use strict\";\n",
+        "const __fl_defs = {};\n",
+        "const __fl_cache = {};\n",
+        "function __fl_require(id) {\n",
+        "if (__fl_cache[id]) return __fl_cache[id];\n",
+        "const exports = __fl_cache[id] = {};\n",
+        "__fl_defs[id](exports, __fl_require);\n",
+        "return exports;\n",
+        "}\n",
+    ]
+    for mid in sorted(factories):
+        parts.append(f"__fl_defs[{json.dumps(mid)}] = function (exports, __fl_require) {{\n")
+        parts.append(factories[mid])
+        parts.append("\n};\n")
+    parts.append(f"__fl_require({json.dumps(module_id(entry_path))});\n")
+    parts.append("})();\n")
+    return "".join(parts)
+
+def minify_js(source):
+    """Strip comments and indentation from JavaScript without touching literals
+
+    Line breaks are kept (collapsed) so automatic semicolon insertion behaves
+    exactly as it does in the unbundled sources.
+    """
+    out = []
+    pending = ""
+    i = 0
+    length = len(source)
+    last_significant = ""
+
+    def emit(text):
+        nonlocal pending
+        if pending and out:
+            out.append(pending)
+        pending = ""
+        out.append(text)
+
+    def add_whitespace(text):
+        nonlocal pending
+        pending = "\n" if "\n" in text or pending == "\n" else " "
+
+    def regex_allowed():
+        # A slash starts a regex literal unless it follows a value
+        if last_significant == "" or last_significant in "(,=:[!&|?{};+-*%<>~^":
+            return True
+        return re.search(r"\b(return|typeof|case|do|else|in|of|new|delete|void|throw)$", "".join(out[-12:])) is not None
+
+    def read_string(start):
+        quote = source[start]
+        j = start + 1
+        while j < length and source[j] != quote:
+            j += 2 if source[j] == "\\" else 1
+        return j + 1
+
+    def read_template(start):
+        # Returns the index just past the closing backtick, honouring ${} nesting
+        j = start + 1
+        while j < length:
+            if source[j] == "\\":
+                j += 2
+            elif source[j] == "`":
+                return j + 1
+            elif source.startswith("${", j):
+                depth = 1
+                j += 2
+                while j < length and depth:
+                    if source[j] in "\"'":
+                        j = read_string(j)
+                        continue
+                    if source[j] == "`":
+                        j = read_template(j)
+                        continue
+                    if source[j] == "{":
+                        depth += 1
+                    elif source[j] == "}":
+                        depth -= 1
+                    j += 1
+            else:
+                j += 1
+        return j
+
+    def read_regex(start):
+        j = start + 1
+        in_class = False
+        while j < length and source[j] != "\n":
+            if source[j] == "\\":
+                j += 2
+                continue
+            if source[j] == "[":
+                in_class = True
+            elif source[j] == "]":
+                in_class = False
+            elif source[j] == "/" and not in_class:
+                break
+            j += 1
+        j += 1
+        while j < length and (source[j].isalnum() or source[j] == "_"):
+            j += 1
+        return j
+
+    while i < length:
+        char = source[i]
+        if char in "\"'`":
+            end = read_template(i) if char == "`" else read_string(i)
+            emit(source[i:end])
+            last_significant = char
+            i = end
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            add_whitespace(source[i:end] if end != -1 else "")
+            i = length if end == -1 else end + 2
+        elif char == "/" and regex_allowed():
+            end = read_regex(i)
+            emit(source[i:end])
+            last_significant = "/"
+            i = end
+        elif char.isspace():
+            start = i
+            while i < length and source[i].isspace():
+                i += 1
+            add_whitespace(source[start:i])
+        else:
+            emit(char)
+            last_significant = char
+            i += 1
+
+    return "".join(out) + "\n"
+
+# Output
+def content_hash(data):
+    """Return a short content hash for cache-busting filenames"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def write_precompressed(path, data):
+    """Write gzip and (when available) brotli variants next to an asset"""
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = []
+    # mtime=0 keeps the gzip output byte-for-byte reproducible
+    with open(f"{path}.gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    variants.append("gzip")
+
+    if BROTLI_AVAILABLE:
+        with open(f"{path}.br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        variants.append("br")
+
+    return variants
+
+def write_asset(logical_name, data):
+    """Write a content-hashed asset and its compressed variants, returning its manifest entry"""
+    stem, ext = os.path.splitext(os.path.basename(logical_name))
+    filename = f"{stem}.{content_hash(data)}{ext}"
+    path = DIST_DIR / filename
+    with open(path, "wb") as f:
+        f.write(data)
+
+    return {
+        "file": filename,
+        "size": len(data),
+        "encodings": write_precompressed(path, data)
+    }
+
+def rewrite_index(manifest):
+    """Write a copy of index.html that references the hashed bundles"""
+    html = (UI_DIR / "index.html").read_text(encoding="utf-8")
+    for logical_name, entry in manifest["assets"].items():
+        html = html.replace(f"static/{logical_name}", f"static/dist/{entry['file']}")
+
+    with open(DIST_DIR / "index.html", "w", encoding="utf-8") as f:
+        f.write(html)
+
+def clean_dist(keep):
+    """Remove hashed files left over from previous builds"""
+    for path in DIST_DIR.iterdir():
+        base = path.name
+        for suffix in (".gz", ".br"):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        if base not in keep and path.is_file():
+            path.unlink()
+
+def build(minify=True):
+    """Build the bundled, hashed and precompressed assets and return the manifest"""
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    css = bundle_css(CSS_ENTRY)
+    js = bundle_js(JS_ENTRY)
+    if minify:
+        css = minify_css(css)
+        js = minify_js(js)
+
+    manifest = {
+        "version": 1,
+        "assets": {
+            CSS_ENTRY: write_asset(CSS_ENTRY, css.encode("utf-8")),
+            JS_ENTRY: write_asset(JS_ENTRY, js.encode("utf-8"))
+        }
+    }
+
+    rewrite_index(manifest)
+    with open(MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    keep = {entry["file"] for entry in manifest["assets"].values()}
+    keep.update({"index.html", MANIFEST_FILE.name})
+    clean_dist(keep)
+
+    return manifest
+
+if __name__ == '__main__':
+    try:
+        manifest = build(minify="--no-minify" not in sys.argv)
+    except BuildError as e:
+        print(f"Error building static assets: {e}")
+        sys.exit(1)
+
+    for logical_name, entry in manifest["assets"].items():
+        encodings = ", ".join(entry["encodings"]) or "none"
+        print(f"{logical_name} -> dist/{entry['file']} ({entry['size']} bytes, precompressed: {encodings})")
+    if not BROTLI_AVAILABLE:
+        print("Note: install 'brotli' to also generate .br variants")
@@ -0,0 +1,311 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from flask import Blueprint, request, jsonify
+
+from embeddings import EMBEDDING_AVAILABLE, EMBEDDING_DIM, VECTOR_DB_DIR, EmbeddingCache, content_hash, embed_texts
+from vector_index import VectorIndex
+
+if EMBEDDING_AVAILABLE:
+    import numpy as np
+
+CHAT_INDEX_DIR = VECTOR_DB_DIR / "chat_history"
+CHAT_DB_FILE = CHAT_INDEX_DIR / "messages.sqlite3"
+
+# Messages are embedded together once this many are queued, or after the delay
+INDEX_BATCH_SIZE = 64
+INDEX_BATCH_DELAY = 0.25
+
+SNIPPET_LENGTH = 240
+
+chat_search = Blueprint('chat_search', __name__)
+
+class ChatHistoryIndex:
+    """Semantic index of chat messages, fed in the background as chats are saved"""
+
+    def __init__(self, path=CHAT_INDEX_DIR):
+        os.makedirs(path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.cache = EmbeddingCache()
+        self.index = VectorIndex(path, EMBEDDING_DIM)
+
+        self.conn = sqlite3.connect(str(CHAT_DB_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                position INTEGER PRIMARY KEY,
+                message_key TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                chat_name TEXT,
+                message_index INTEGER NOT NULL,
+                role TEXT,
+                content TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS messages_key ON messages (message_key, deleted)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS messages_chat ON messages (provider, chat_id, deleted)")
+        self.conn.commit()
+
+        # Per-position filters kept in memory so searches never scan SQLite:
+        # live[p] is False once a message is deleted or superseded, and
+        # provider_of[p] holds a small code for the message's provider
+        self.live = np.zeros(0, dtype=bool)
+        self.provider_of = np.zeros(0, dtype=np.int16)
+        self.provider_codes = {}
+        # Chats deleted while some of their messages were still queued
+        self.deleted_chats = set()
+        self._ensure_capacity(max(1024, self.index.count))
+        rows = self.conn.execute("SELECT position, provider FROM messages WHERE deleted = 0").fetchall()
+        for position, provider in rows:
+            if position < self.index.count:
+                self.live[position] = True
+                self.provider_of[position] = self._provider_code(provider)
+
+        self.pending = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name="chat-history-indexer", daemon=True)
+        self.worker.start()
+
+    def _ensure_capacity(self, size):
+        """Grow the per-position filters to cover size positions"""
+        if size <= len(self.live):
+            return
+        capacity = max(size, len(self.live) * 2)
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self.live)] = self.live
+        provider_of = np.zeros(capacity, dtype=np.int16)
+        provider_of[:len(self.provider_of)] = self.provider_of
+        self.live, self.provider_of = live, provider_of
+
+    def _provider_code(self, provider):
+        return self.provider_codes.setdefault(provider, len(self.provider_codes) + 1)
+
+    def enqueue_chat(self, provider, chat_id, chat_name, messages):
+        """Queue a saved chat for indexing and drop messages it no longer has"""
+        with self.lock:
+            self.deleted_chats.discard((provider, chat_id))
+            self._tombstone(
+                "SELECT position FROM messages WHERE provider = ? AND chat_id = ? AND message_index >= ? AND deleted = 0",
+                (provider, chat_id, len(messages))
+            )
+            self.conn.execute(
+                "UPDATE messages SET chat_name = ? WHERE provider = ? AND chat_id = ?",
+                (chat_name, provider, chat_id)
+            )
+            self.conn.commit()
+
+        queued = 0
+        for i, message in enumerate(messages):
+            content = (message.get('content') or '').strip()
+            if not content:
+                continue
+            self.pending.put({
+                'key': f"{provider}:{chat_id}:{i}",
+                'provider': provider,
+                'chat_id': chat_id,
+                'chat_name': chat_name,
+                'index': i,
+                'role': message.get('role'),
+                'content': content,
+                'hash': content_hash(content)
+            })
+            queued += 1
+        return queued
+
+    def delete_chat(self, provider, chat_id):
+        """Remove every message of a chat from search results"""
+        with self.lock:
+            self.deleted_chats.add((provider, chat_id))
+            removed = self._tombstone(
+                "SELECT position FROM messages WHERE provider = ? AND chat_id = ? AND deleted = 0",
+                (provider, chat_id)
+            )
+            self.conn.commit()
+        return removed
+
+    def _tombstone(self, select_sql, params):
+        """Mark the selected positions as deleted; caller holds the lock and commits"""
+        positions = [row[0] for row in self.conn.execute(select_sql, params).fetchall()]
+        if positions:
+            self.conn.executemany("UPDATE messages SET deleted = 1 WHERE position = ?", [(p,) for p in positions])
+            self.live[[p for p in positions if p < len(self.live)]] = False
+        return len(positions)
+
+    def _run(self):
+        """Collect queued messages into batches and index them"""
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + INDEX_BATCH_DELAY
+            while len(batch) < INDEX_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._index_batch(batch)
+            except Exception as e:
+                print(f"Error indexing chat messages: {e}")
+
+    def _index_batch(self, batch):
+        """Embed and store the messages in a batch that are new or changed"""
+        # Later saves of the same message supersede earlier ones in the batch
+        latest = {}
+        for item in batch:
+            latest[item['key']] = item
+
+        with self.lock:
+            changed = []
+            for item in latest.values():
+                if (item['provider'], item['chat_id']) in self.deleted_chats:
+                    continue
+                row = self.conn.execute(
+                    "SELECT hash FROM messages WHERE message_key = ? AND deleted = 0", (item['key'],)
+                ).fetchone()
+                if row is None or row[0] != item['hash']:
+                    changed.append(item)
+
+        if not changed:
+            return
+
+        vectors = embed_texts([item['content'] for item in changed], cache=self.cache)
+
+        with self.lock:
+            # A chat deleted while the batch was being embedded stays deleted
+            keep = [i for i, item in enumerate(changed)
+                    if (item['provider'], item['chat_id']) not in self.deleted_chats]
+            if not keep:
+                return
+            changed = [changed[i] for i in keep]
+            vectors = vectors[keep]
+            positions = self.index.add(vectors)
+            for item, position in zip(changed, positions):
+                self._tombstone(
+                    "SELECT position FROM messages WHERE message_key = ? AND deleted = 0", (item['key'],)
+                )
+                self.conn.execute(
+                    "INSERT INTO messages (position, message_key, provider, chat_id, chat_name, message_index, role, content, hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (position, item['key'], item['provider'], item['chat_id'], item['chat_name'],
+                     item['index'], item['role'], item['content'], item['hash'])
+                )
+            self.conn.commit()
+
+            self._ensure_capacity(self.index.count)
+            self.live[positions] = True
+            self.provider_of[positions] = [self._provider_code(item['provider']) for item in changed]
+
+    def search(self, query, k=10, provider=None):
+        """Return the k messages closest in meaning to the query"""
+        vector = embed_texts([query], cache=self.cache)[0]
+
+        with self.lock:
+            allowed = self.live[:self.index.count]
+            if provider:
+                allowed = allowed & (self.provider_of[:self.index.count] == self.provider_codes.get(provider, -1))
+
+            hits = self.index.search(vector, k=k, allowed=allowed)
+            if not hits:
+                return []
+
+            scores = dict(hits)
+            placeholders = ",".join("?" * len(scores))
+            rows = self.conn.execute(
+                f"SELECT position, provider, chat_id, chat_name, message_index, role, content "
+                f"FROM messages WHERE position IN ({placeholders})",
+                list(scores)
+            ).fetchall()
+
+        results = []
+        for position, provider_name, chat_id, chat_name, message_index, role, content in rows:
+            results.append({
+                'provider': provider_name,
+                'chat_id': chat_id,
+                'chat_name': chat_name,
+                'message_index': message_index,
+                'role': role,
+                'snippet': content[:SNIPPET_LENGTH],
+                'score': round(scores[position], 4)
+            })
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results
+
+    def stats(self):
+        """Return indexing progress and index state"""
+        with self.lock:
+            indexed = self.conn.execute("SELECT COUNT(*) FROM messages WHERE deleted = 0").fetchone()[0]
+        stats = self.index.stats()
+        stats.update({'messages': indexed, 'pending': self.pending.qsize()})
+        return stats
+
+_history_index = None
+_history_index_lock = threading.Lock()
+
+def get_history_index():
+    """Open the chat history index on first use"""
+    global _history_index
+    with _history_index_lock:
+        if _history_index is None:
+            _history_index = ChatHistoryIndex()
+        return _history_index
+
+def unavailable():
+    """Response for servers without the optional embedding dependencies"""
+    return jsonify({'error': "Semantic search requires 'numpy' and 'sentence-transformers' on the server"}), 503
+
+@chat_search.route('/api/history/index', methods=['POST'])
+def index_chat():
+    """Queue a saved chat's messages for embedding"""
+    if not EMBEDDING_AVAILABLE:
+        return unavailable()
+
+    data = request.get_json(silent=True) or {}
+    provider = data.get('provider')
+    chat_id = data.get('chat_id')
+    messages = data.get('messages')
+    if not provider or not chat_id or not isinstance(messages, list):
+        return jsonify({'error': "'provider', 'chat_id' and 'messages' are required"}), 400
+
+    queued = get_history_index().enqueue_chat(provider, chat_id, data.get('chat_name'), messages)
+    return jsonify({'queued': queued}), 202
+
+@chat_search.route('/api/history/index/<provider>/<chat_id>', methods=['DELETE'])
+def delete_chat_index(provider, chat_id):
+    """Drop a deleted chat from the index"""
+    if not EMBEDDING_AVAILABLE:
+        return unavailable()
+    return jsonify({'removed': get_history_index().delete_chat(provider, chat_id)})
+
+@chat_search.route('/api/history/search')
+def search_history():
+    """Find messages by meaning rather than exact words"""
+    if not EMBEDDING_AVAILABLE:
+        return unavailable()
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': "Query parameter 'q' is required"}), 400
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+
+    start = time.perf_counter()
+    results = get_history_index().search(query, k=k, provider=request.args.get('provider'))
+    return jsonify({
+        'query': query,
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@chat_search.route('/api/history/index/status')
+def index_status():
+    """Report how much of the chat history has been indexed"""
+    if not EMBEDDING_AVAILABLE:
+        return jsonify({'available': False})
+    stats = get_history_index().stats()
+    stats['available'] = True
+    return jsonify(stats)
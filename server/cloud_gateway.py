@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+"""Rate-aware proxy for the cloud LLM providers
+
+The ChatGPT, Claude and Gemini modules send their requests through
+/api/providers/<provider>/... instead of calling the provider directly.
+Each provider has its own queue. Its concurrency limit grows by one
+request per round of successes and halves on a 429 (AIMD). Requests are
+also paced to stay under the provider's requests and tokens per minute.
+Those limits come from config.ini or are learned from the provider's
+rate-limit headers. When a request waits longer than hedge_after seconds,
+it can be answered by a local Ollama model instead.
+
+`python3 cloud_gateway.py standin` runs a local stand-in provider that
+enforces configurable limits, for testing without API keys.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import configparser
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from llm_gateway import stream_chat, GatewayBusy
+from gpu_arbiter import LeaseTimeout
+from tracing import span, start_span
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+CONFIG_FILE = REPO_ROOT / "cfg" / "config.ini"
+
+# Upstream base URLs, overridable with FUSIONLOOM_<PROVIDER>_URL or
+# <provider>_url under [Providers], e.g. to point at the stand-in
+PROVIDERS = {
+    "openai": "https://api.openai.com",
+    "anthropic": "https://api.anthropic.com",
+    "gemini": "https://generativelanguage.googleapis.com"
+}
+
+# Request headers passed through to the provider (credentials stay per request)
+FORWARD_HEADERS = ("Authorization", "OpenAI-Organization", "OpenAI-Project", "x-api-key",
+                   "anthropic-version", "anthropic-beta", "x-goog-api-key", "Content-Type", "Accept")
+# Response headers passed back to the browser
+RELAY_HEADER_PREFIXES = ("x-ratelimit-", "anthropic-ratelimit-", "retry-after", "request-id",
+                         "x-request-id", "openai-processing-ms")
+
+UPSTREAM_TIMEOUT = 300
+# Requests that cannot start within QUEUE_TIMEOUT seconds fail with a 429
+QUEUE_TIMEOUT = 120
+
+# AIMD concurrency: start at INITIAL_LIMIT, add one per limit successes,
+# halve on throttling (at most once per DECREASE_INTERVAL, since a burst of
+# 429s reports the same overload)
+INITIAL_LIMIT = 4
+MIN_LIMIT = 1
+MAX_LIMIT = 64
+DECREASE_INTERVAL = 1.0
+# Cool-down after a 429 that carries no Retry-After or reset header
+DEFAULT_RETRY_AFTER = 2.0
+# A throttled request goes back to the front of the queue this many times
+# before the 429 is passed on
+MAX_RETRIES = 2
+THROTTLE_STATUSES = (429, 503, 529)
+
+# Tokens a request is charged before the provider reports its usage:
+# about four characters per token, plus the requested output
+CHARS_PER_TOKEN = 4
+DEFAULT_OUTPUT_TOKENS = 256
+
+WINDOW_SECONDS = 60.0
+
+cloud_gateway = Blueprint('cloud_gateway', __name__)
+
+class QueueTimeout(Exception):
+    """Raised when a request does not get its turn in time"""
+
+def load_provider_settings():
+    """Read the [Providers] section of config.ini, with environment overrides for URLs"""
+    config = configparser.ConfigParser()
+    if CONFIG_FILE.exists():
+        try:
+            config.read(CONFIG_FILE)
+        except configparser.Error as e:
+            print(f"Error reading provider settings from {CONFIG_FILE}: {e}")
+    section = config['Providers'] if config.has_section('Providers') else {}
+
+    def number(key, default=0.0):
+        try:
+            return float(section.get(key) or default)
+        except ValueError:
+            print(f"Ignoring invalid [Providers] {key} in {CONFIG_FILE}")
+            return default
+
+    settings = {
+        "hedge_model": (section.get('hedge_model') or '').strip(),
+        "hedge_after": number('hedge_after', 10.0),
+        "providers": {}
+    }
+    for name, default_url in PROVIDERS.items():
+        url = os.environ.get(f"FUSIONLOOM_{name.upper()}_URL") or section.get(f"{name}_url") or default_url
+        settings["providers"][name] = {
+            "url": url.rstrip('/'),
+            "rpm": number(f"{name}_rpm"),
+            "tpm": number(f"{name}_tpm")
+        }
+    return settings
+
+def parse_reset(value, now):
+    """Turn a rate-limit reset header into an absolute time
+
+    Accepts OpenAI durations ("1s", "6m0s", "250ms"), RFC 3339 timestamps
+    (Anthropic), HTTP dates and plain seconds. Returns None if unparseable.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return now + float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if parts and ''.join(number + unit for number, unit in parts) == value:
+        scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        return now + sum(float(number) * scale[unit] for number, unit in parts)
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def read_rate_headers(headers, now):
+    """Extract request and token limits from OpenAI or Anthropic response headers
+
+    Returns {"requests": (limit, remaining, reset_at), "tokens": (...),
+    "retry_at": time or None}; missing values are None.
+    """
+    def first(*names):
+        for name in names:
+            value = headers.get(name)
+            if value not in (None, ''):
+                return value
+        return None
+
+    def integer(value):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+    limits = {}
+    for kind, anthropic_kinds in (("requests", ("requests",)), ("tokens", ("tokens", "input-tokens"))):
+        limits[kind] = (
+            integer(first(f"x-ratelimit-limit-{kind}", *(f"anthropic-ratelimit-{k}-limit" for k in anthropic_kinds))),
+            integer(first(f"x-ratelimit-remaining-{kind}",
+                          *(f"anthropic-ratelimit-{k}-remaining" for k in anthropic_kinds))),
+            parse_reset(first(f"x-ratelimit-reset-{kind}", *(f"anthropic-ratelimit-{k}-reset" for k in anthropic_kinds)),
+                        now)
+        )
+    limits["retry_at"] = parse_reset(headers.get("retry-after"), now)
+    return limits
+
+class RateBudget:
+    """Requests or tokens a provider allows per minute
+
+    Spending is tracked over a sliding minute. When the provider reports
+    what remains of its own window, that count is honoured until its reset.
+    """
+
+    def __init__(self, per_minute=0):
+        self.configured = per_minute
+        self.per_minute = per_minute
+        self.sent = deque()
+        self.total = 0
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def _prune(self, now):
+        while self.sent and self.sent[0][0] <= now - WINDOW_SECONDS:
+            self.total -= self.sent.popleft()[1]
+
+    def wait_time(self, amount, now):
+        """Seconds until amount fits in the budget, 0 if it fits now"""
+        wait = 0.0
+        if self.per_minute:
+            self._prune(now)
+            # A request larger than the whole budget goes once the window is empty
+            excess = self.total + min(amount, self.per_minute) - self.per_minute
+            freed = 0
+            for sent_at, spent in self.sent:
+                if excess <= 0:
+                    break
+                freed += spent
+                if freed >= excess:
+                    wait = max(wait, sent_at + WINDOW_SECONDS - now)
+                    break
+        if self.remaining is not None and now < self.reset_at and self.remaining < amount:
+            wait = max(wait, self.reset_at - now)
+        return wait
+
+    def spend(self, amount, now):
+        """Charge amount now; returns the entry so it can be corrected later"""
+        entry = [now, amount]
+        self.sent.append(entry)
+        self.total += amount
+        if self.remaining is not None:
+            self.remaining -= amount
+        return entry
+
+    def correct(self, entry, amount):
+        """Replace an estimate with the amount the provider reported"""
+        if entry in self.sent:
+            self.total += amount - entry[1]
+        entry[1] = amount
+
+    def update(self, limit, remaining, reset_at):
+        if limit and not self.configured:
+            self.per_minute = limit
+        if remaining is not None and reset_at is not None:
+            self.remaining = remaining
+            self.reset_at = reset_at
+
+    def to_dict(self, now):
+        self._prune(now)
+        return {
+            "per_minute": self.per_minute,
+            "used": self.total,
+            "remaining": self.remaining if self.remaining is not None and now < self.reset_at else None,
+            "reset_in": round(self.reset_at - now, 3) if now < self.reset_at else None
+        }
+
+class Permit:
+    """A queued or running request against one provider"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.queued_at = time.time()
+        self.started = None
+        self.entries = None
+
+class ProviderLimiter:
+    """FIFO queue and AIMD concurrency limit for one provider"""
+
+    def __init__(self, name, rpm=0, tpm=0):
+        self.name = name
+        self.limit = float(INITIAL_LIMIT)
+        self.inflight = 0
+        self.requests = RateBudget(rpm)
+        self.tokens = RateBudget(tpm)
+        self.cooldown_until = 0.0
+        self.last_decrease = 0.0
+        self.last_start = 0.0
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.stats = {"completed": 0, "throttled": 0, "retried": 0, "hedged": 0, "timed_out": 0, "errors": 0}
+        self.wait_ms = deque(maxlen=200)
+
+    def _start_delay(self, permit, now):
+        """Seconds until permit may start, or None to wait for a running request to finish"""
+        if self.queue[0] is not permit or self.inflight >= int(self.limit):
+            return None
+        delay = max(self.cooldown_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(permit.tokens, now))
+        # Spread requests over the minute instead of bursting the whole budget
+        if self.requests.per_minute:
+            delay = max(delay, self.last_start + WINDOW_SECONDS / self.requests.per_minute - now)
+        return max(delay, 0.0)
+
+    def acquire(self, tokens, timeout, permit=None):
+        """Wait for a turn; a retried permit goes back to the front of the queue"""
+        deadline = time.time() + timeout
+        with self.cond:
+            if permit is None:
+                permit = Permit(tokens)
+                self.queue.append(permit)
+            else:
+                self.queue.appendleft(permit)
+            try:
+                while True:
+                    now = time.time()
+                    delay = self._start_delay(permit, now)
+                    if delay == 0:
+                        break
+                    if now >= deadline:
+                        self.stats["timed_out"] += 1
+                        raise QueueTimeout(f"{self.name} did not accept the request within {timeout:.0f} seconds")
+                    self.cond.wait(deadline - now if delay is None else min(delay, deadline - now))
+            finally:
+                self.queue.remove(permit)
+                # The next request in line may be able to start as well
+                self.cond.notify_all()
+            permit.started = self.last_start = now
+            permit.entries = (self.requests.spend(1, now), self.tokens.spend(permit.tokens, now))
+            self.inflight += 1
+            self.wait_ms.append((now - permit.queued_at) * 1000)
+            return permit
+
+    def release(self, permit, status, headers=None, used_tokens=None):
+        """Finish a request, adapting the limit to how the provider answered"""
+        now = time.time()
+        with self.cond:
+            self.inflight -= 1
+            if used_tokens is not None:
+                self.tokens.correct(permit.entries[1], used_tokens)
+            limits = read_rate_headers(headers, now) if headers is not None else None
+            if limits:
+                self.requests.update(*limits["requests"])
+                self.tokens.update(*limits["tokens"])
+            if status in THROTTLE_STATUSES:
+                self.stats["throttled"] += 1
+                retry_at = (limits or {}).get("retry_at") or now + DEFAULT_RETRY_AFTER
+                self.cooldown_until = max(self.cooldown_until, retry_at)
+                if now - self.last_decrease >= DECREASE_INTERVAL:
+                    self.limit = max(MIN_LIMIT, self.limit / 2)
+                    self.last_decrease = now
+            elif status is not None and status < 400:
+                self.stats["completed"] += 1
+                self.limit = min(MAX_LIMIT, self.limit + 1 / self.limit)
+            else:
+                self.stats["errors"] += 1
+            self.cond.notify_all()
+
+    def status(self):
+        now = time.time()
+        with self.cond:
+            waits = sorted(self.wait_ms)
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "queued": len(self.queue),
+                "cooldown": round(max(0.0, self.cooldown_until - now), 3),
+                "requests": self.requests.to_dict(now),
+                "tokens": self.tokens.to_dict(now),
+                "queue_wait_ms": {
+                    "p50": round(waits[len(waits) // 2], 1) if waits else None,
+                    "max": round(waits[-1], 1) if waits else None
+                },
+                **self.stats
+            }
+
+_settings = None
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_settings():
+    global _settings
+    with _limiters_lock:
+        if _settings is None:
+            _settings = load_provider_settings()
+        return _settings
+
+def get_limiter(provider):
+    """Return the shared limiter for a provider, creating it on first use"""
+    settings = get_settings()["providers"][provider]
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(provider, rpm=settings["rpm"], tpm=settings["tpm"])
+        return _limiters[provider]
+
+def text_of(content):
+    """Flatten string or content-block message content to text"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(text_of(part.get('text') if isinstance(part, dict) else part) for part in content
+                         if part is not None)
+    return ''
+
+def estimate_tokens(body):
+    """Tokens a request is likely to use: its prompt plus the requested output"""
+    prompt = body.get('messages') or body.get('contents') or []
+    prompt_tokens = (len(json.dumps(prompt)) + len(json.dumps(body.get('system') or ''))) // CHARS_PER_TOKEN
+    output = (body.get('max_tokens') or body.get('max_completion_tokens')
+              or (body.get('generationConfig') or {}).get('maxOutputTokens') or DEFAULT_OUTPUT_TOKENS)
+    try:
+        return prompt_tokens + int(output)
+    except (TypeError, ValueError):
+        return prompt_tokens + DEFAULT_OUTPUT_TOKENS
+
+def reported_tokens(data):
+    """Total tokens from an OpenAI, Anthropic or Gemini response body, if present"""
+    if not isinstance(data, dict):
+        return None
+    usage = data.get('usage') or {}
+    if usage.get('total_tokens') is not None:
+        return usage['total_tokens']
+    if usage.get('input_tokens') is not None:
+        return usage['input_tokens'] + usage.get('output_tokens', 0)
+    return (data.get('usageMetadata') or {}).get('totalTokenCount')
+
+def ollama_messages(provider, path, body):
+    """Translate a provider chat request into Ollama messages, or None if it is not a chat"""
+    if provider == 'openai' and path.endswith('chat/completions'):
+        return [{'role': message.get('role', 'user'), 'content': text_of(message.get('content'))}
+                for message in body.get('messages', [])]
+    if provider == 'anthropic' and path.endswith('messages'):
+        messages = [{'role': 'system', 'content': text_of(body['system'])}] if body.get('system') else []
+        return messages + [{'role': message.get('role', 'user'), 'content': text_of(message.get('content'))}
+                           for message in body.get('messages', [])]
+    if provider == 'gemini' and path.endswith(':generateContent'):
+        instruction = body.get('systemInstruction') or {}
+        messages = [{'role': 'system', 'content': text_of(instruction.get('parts'))}] if instruction else []
+        return messages + [{'role': 'assistant' if item.get('role') == 'model' else 'user',
+                            'content': text_of(item.get('parts'))}
+                           for item in body.get('contents', [])]
+    return None
+
+def provider_reply(provider, model, text):
+    """Shape a local reply like the provider's own response"""
+    if provider == 'openai':
+        return {
+            'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}]
+        }
+    if provider == 'anthropic':
+        return {
+            'type': 'message', 'role': 'assistant', 'model': model, 'stop_reason': 'end_turn',
+            'content': [{'type': 'text', 'text': text}]
+        }
+    return {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP'}]}
+
+def provider_error(status, message, retry_after=None):
+    response = jsonify({'error': {'message': message, 'type': 'fusionloom_gateway'}})
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+def hedge(provider, messages, model):
+    """Answer from the local Ollama model in the provider's response format"""
+    limiter = get_limiter(provider)
+    with limiter.cond:
+        limiter.stats["hedged"] += 1
+    try:
+        with span('provider.hedge', provider=provider, model=model):
+            text = ''.join(stream_chat(messages, model))
+    except (GatewayBusy, LeaseTimeout) as e:
+        return provider_error(503, f"The cloud queue is long and the local model is busy: {e}")
+    except (urllib.error.URLError, RuntimeError, ValueError) as e:
+        return provider_error(502, f"The local fallback model failed: {e}")
+    response = jsonify(provider_reply(provider, model, text))
+    response.headers['X-FusionLoom-Hedged'] = f"ollama/{model}"
+    return response
+
+def upstream_call(provider, path, data):
+    """Send the request to the provider; returns (status, headers, response or body bytes)"""
+    url = f"{get_settings()['providers'][provider]['url']}/{path}"
+    if request.query_string:
+        url += f"?{request.query_string.decode('latin-1')}"
+    headers = {name: request.headers[name] for name in FORWARD_HEADERS if name in request.headers}
+    upstream = urllib.request.Request(url, data=data, headers=headers, method=request.method)
+    try:
+        response = urllib.request.urlopen(upstream, timeout=UPSTREAM_TIMEOUT)
+        return response.status, response.headers, response
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def relay_headers(headers, permit):
+    relayed = {name: value for name, value in headers.items()
+               if name.lower().startswith(RELAY_HEADER_PREFIXES)}
+    relayed['X-FusionLoom-Queue-Ms'] = str(round((permit.started - permit.queued_at) * 1000, 1))
+    return relayed
+
+@cloud_gateway.route('/api/providers')
+def providers_status():
+    """Report each provider's queue, concurrency limit and rate budgets"""
+    settings = get_settings()
+    return jsonify({
+        'hedge_model': settings['hedge_model'] or None,
+        'hedge_after': settings['hedge_after'],
+        'providers': {name: dict(get_limiter(name).status(), url=settings['providers'][name]['url'])
+                      for name in PROVIDERS}
+    })
+
+@cloud_gateway.route('/api/providers/<provider>/<path:path>', methods=['GET', 'POST'])
+def proxy(provider, path):
+    """Forward a request to a cloud provider once its limits allow"""
+    if provider not in PROVIDERS:
+        return provider_error(404, f"Unknown provider {provider}")
+    data = request.get_data() if request.method == 'POST' else None
+    try:
+        body = json.loads(data) if data else {}
+    except ValueError:
+        return provider_error(400, "The request body is not valid JSON")
+    if not isinstance(body, dict):
+        body = {}
+
+    settings = get_settings()
+    limiter = get_limiter(provider)
+    streaming = bool(body.get('stream')) or 'streamGenerateContent' in path
+    # Only complete chat replies can come from the local model instead
+    messages = None if streaming else ollama_messages(provider, path, body)
+    can_hedge = bool(settings['hedge_model'] and messages)
+    tokens = estimate_tokens(body) if data else 0
+
+    permit = None
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with span('provider.queue_wait', provider=provider, attempt=attempt):
+                permit = limiter.acquire(tokens, settings['hedge_after'] if can_hedge else QUEUE_TIMEOUT, permit)
+        except QueueTimeout as e:
+            if can_hedge:
+                return hedge(provider, messages, settings['hedge_model'])
+            return provider_error(429, str(e), retry_after=limiter.status()['cooldown'] or DEFAULT_RETRY_AFTER)
+
+        upstream_span = start_span('provider.request', provider=provider, path=path, attempt=attempt)
+        try:
+            status, headers, upstream = upstream_call(provider, path, data)
+        except (urllib.error.URLError, OSError) as e:
+            limiter.release(permit, None)
+            upstream_span.end(status='error')
+            return provider_error(502, f"Could not reach {provider}: {getattr(e, 'reason', e)}")
+        upstream_span.set(**{'http.status': status})
+
+        if status in THROTTLE_STATUSES and attempt < MAX_RETRIES:
+            limiter.release(permit, status, headers)
+            upstream_span.end(status='error')
+            with limiter.cond:
+                limiter.stats["retried"] += 1
+            # Wait out the cool-down at the front of the queue rather than in the browser
+            permit.queued_at = time.time()
+            continue
+        break
+
+    if isinstance(upstream, bytes) or not streaming:
+        content = upstream if isinstance(upstream, bytes) else upstream.read()
+        if not isinstance(upstream, bytes):
+            upstream.close()
+        try:
+            used = reported_tokens(json.loads(content)) if status < 400 else None
+        except ValueError:
+            used = None
+        limiter.release(permit, status, headers, used)
+        upstream_span.end(status='error' if status >= 400 else 'ok')
+        return Response(content, status=status, headers=relay_headers(headers, permit),
+                        content_type=headers.get('Content-Type', 'application/json'))
+
+    def relay():
+        # The permit is held until the stream ends, so it counts toward concurrency
+        failed = False
+        try:
+            with upstream:
+                while True:
+                    chunk = upstream.read1(65536)
+                    if not chunk:
+                        break
+                    yield chunk
+        except OSError:
+            failed = True
+            raise
+        finally:
+            limiter.release(permit, None if failed else status, headers)
+            upstream_span.end(status='error' if failed else 'ok')
+
+    return Response(stream_with_context(relay()), status=status, headers=relay_headers(headers, permit),
+                    content_type=headers.get('Content-Type', 'text/event-stream'))
+
+class StandInProvider:
+    """Local stand-in for the OpenAI, Anthropic and Gemini chat endpoints
+
+    It allows rpm requests and tpm tokens per sliding minute and at most
+    `concurrency` requests at once. Over a limit it answers 429 the way
+    the provider does. OpenAI and Anthropic paths also get that provider's
+    rate-limit headers.
+    """
+
+    def __init__(self, port=8099, rpm=60, tpm=40000, concurrency=8, latency=0.5, reply_tokens=50):
+        self.requests = RateBudget(rpm)
+        self.tokens = RateBudget(tpm)
+        self.concurrency = concurrency
+        self.latency = latency
+        self.reply_tokens = reply_tokens
+        self.active = 0
+        self.lock = threading.Lock()
+        self.counts = {"ok": 0, "throttled": 0}
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, data, status=200, headers=None):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                path = urllib.parse.urlsplit(self.path).path
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return self.send_json({'error': {'message': 'invalid JSON'}}, 400)
+                flavor = ('anthropic' if path.endswith('/messages') else
+                          'gemini' if ':generateContent' in path else 'openai')
+                status, data, headers = standin.handle(flavor, body)
+                self.send_json(data, status, headers)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def rate_headers(self, flavor, now):
+        """Headers describing the remaining budget, in the provider's own style"""
+        budgets = {"requests": self.requests, "tokens": self.tokens}
+        headers = {}
+        for kind, budget in budgets.items():
+            budget._prune(now)
+            remaining = max(0, int(budget.per_minute - budget.total))
+            reset = budget.sent[0][0] + WINDOW_SECONDS - now if budget.sent else 0.0
+            if flavor == 'openai':
+                headers[f"x-ratelimit-limit-{kind}"] = str(int(budget.per_minute))
+                headers[f"x-ratelimit-remaining-{kind}"] = str(remaining)
+                headers[f"x-ratelimit-reset-{kind}"] = f"{reset:.3f}s"
+            elif flavor == 'anthropic':
+                headers[f"anthropic-ratelimit-{kind}-limit"] = str(int(budget.per_minute))
+                headers[f"anthropic-ratelimit-{kind}-remaining"] = str(remaining)
+                headers[f"anthropic-ratelimit-{kind}-reset"] = datetime.fromtimestamp(
+                    now + reset, timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+        return headers
+
+    def handle(self, flavor, body):
+        now = time.time()
+        tokens = estimate_tokens(body)
+        with self.lock:
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0 or self.active >= self.concurrency:
+                self.counts["throttled"] += 1
+                headers = dict(self.rate_headers(flavor, now), **{'retry-after': str(max(1, int(wait + 0.999)))})
+                message = {'message': 'Rate limit exceeded (stand-in)', 'type': 'rate_limit_error'}
+                if flavor == 'gemini':
+                    return 429, {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED', 'message': message['message']}}, headers
+                return 429, {'error': message, 'type': 'error'}, headers
+            self.requests.spend(1, now)
+            entry = self.tokens.spend(tokens, now)
+            self.active += 1
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self.lock:
+                self.active -= 1
+                prompt_tokens = max(1, tokens - int(body.get('max_tokens') or DEFAULT_OUTPUT_TOKENS))
+                self.tokens.correct(entry, prompt_tokens + self.reply_tokens)
+                self.counts["ok"] += 1
+                headers = self.rate_headers(flavor, time.time())
+        text = f"Stand-in reply ({self.reply_tokens} tokens)"
+        model = body.get('model', 'stand-in')
+        data = provider_reply(flavor, model, text)
+        if flavor == 'openai':
+            data['usage'] = {'prompt_tokens': prompt_tokens, 'completion_tokens': self.reply_tokens,
+                             'total_tokens': prompt_tokens + self.reply_tokens}
+        elif flavor == 'anthropic':
+            data['usage'] = {'input_tokens': prompt_tokens, 'output_tokens': self.reply_tokens}
+        else:
+            data['usageMetadata'] = {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': self.reply_tokens,
+                                     'totalTokenCount': prompt_tokens + self.reply_tokens}
+        return 200, data, headers
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cloud provider gateway tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    standin_parser = commands.add_parser("standin", help="Run a local provider that enforces rate limits")
+    standin_parser.add_argument("--port", type=int, default=8099)
+    standin_parser.add_argument("--rpm", type=float, default=60, help="Requests per minute")
+    standin_parser.add_argument("--tpm", type=float, default=40000, help="Tokens per minute")
+    standin_parser.add_argument("--concurrency", type=int, default=8, help="Requests at once")
+    standin_parser.add_argument("--latency", type=float, default=0.5, help="Seconds per reply")
+    commands.add_parser("status", help="Show the configured providers and limits")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(load_provider_settings(), indent=2))
+        sys.exit(0)
+
+    standin = StandInProvider(port=args.port, rpm=args.rpm, tpm=args.tpm,
+                              concurrency=args.concurrency, latency=args.latency)
+    print(f"Stand-in provider at {standin.url} ({args.rpm:g} RPM, {args.tpm:g} TPM). Point the gateway at it with:")
+    print(f"  FUSIONLOOM_OPENAI_URL={standin.url} FUSIONLOOM_ANTHROPIC_URL={standin.url} "
+          f"FUSIONLOOM_GEMINI_URL={standin.url} python3 {SCRIPT_DIR / 'system_info.py'} --serve 5050")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(standin.counts))
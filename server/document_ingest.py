@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from flask import Blueprint, request, jsonify
+
+from embeddings import EMBEDDING_AVAILABLE, EMBEDDING_DIM, VECTOR_DB_DIR, EmbeddingCache, embed_texts
+from document_parsing import is_supported
+from vector_index import VectorIndex
+
+if EMBEDDING_AVAILABLE:
+    import numpy as np
+
+# Parser processes are started from this small entry module
+PARSE_WORKER = Path(__file__).parent.absolute() / "parse_worker.py"
+
+DOCUMENT_INDEX_DIR = VECTOR_DB_DIR / "documents"
+DOCUMENT_DB_FILE = DOCUMENT_INDEX_DIR / "documents.sqlite3"
+
+# Chunks are embedded and written together once this many are ready
+INGEST_BATCH_SIZE = 512
+# Batch size for the model itself; larger batches only add memory pressure
+MODEL_BATCH_SIZE = 128
+# Files handed to a worker process at a time
+PARSE_CHUNKSIZE = 16
+
+document_ingest = Blueprint('document_ingest', __name__)
+
+class DocumentIndex:
+    """Chunked documents with their embeddings, kept in sync with the files on disk"""
+
+    def __init__(self, path=DOCUMENT_INDEX_DIR):
+        os.makedirs(path, exist_ok=True)
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.cache = EmbeddingCache()
+
+        self.conn = sqlite3.connect(str(DOCUMENT_DB_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                chunks INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                position INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path, deleted)")
+        self.conn.commit()
+        self._open_vectors()
+
+    def _open_vectors(self):
+        """Load the vector index and the mask of positions that are still current"""
+        self.index = VectorIndex(self.path, EMBEDDING_DIM)
+        self.live = np.zeros(max(1024, self.index.count), dtype=bool)
+        rows = self.conn.execute("SELECT position FROM chunks WHERE deleted = 0").fetchall()
+        self.live[[row[0] for row in rows if row[0] < self.index.count]] = True
+        self.vectors_size = self._vectors_file_size()
+
+    def _vectors_file_size(self):
+        try:
+            return os.path.getsize(self.index.vectors_file)
+        except OSError:
+            return 0
+
+    def refresh(self):
+        """Reload if another process (e.g. the ingest CLI) has appended vectors"""
+        with self.lock:
+            self._refresh()
+
+    def _refresh(self):
+        """refresh() for callers that already hold the lock"""
+        if self._vectors_file_size() != self.vectors_size:
+            self._open_vectors()
+
+    def known_files(self, root):
+        """Return {path: (mtime, size, hash)} for indexed files under root"""
+        prefix = os.path.join(os.path.abspath(root), "")
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, mtime, size, hash FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return {path: (mtime, size, digest) for path, mtime, size, digest in rows}
+
+    def _tombstone_paths(self, paths):
+        """Mark every chunk of the given files as deleted; caller holds the lock and commits"""
+        for path in paths:
+            rows = self.conn.execute("SELECT position FROM chunks WHERE path = ? AND deleted = 0", (path,)).fetchall()
+            positions = [row[0] for row in rows]
+            if positions:
+                self.conn.execute("UPDATE chunks SET deleted = 1 WHERE path = ? AND deleted = 0", (path,))
+                self.live[[p for p in positions if p < len(self.live)]] = False
+
+    def remove_files(self, paths):
+        """Drop files that no longer exist"""
+        with self.lock:
+            self._tombstone_paths(paths)
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in paths])
+            self.conn.commit()
+
+    def touch_files(self, results):
+        """Record new mtimes for files whose content did not change"""
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                [(r["mtime"], r["size"], r["path"]) for r in results]
+            )
+            self.conn.commit()
+
+    def write_files(self, results):
+        """Embed the chunks of changed files and replace their previous chunks in one transaction"""
+        texts = [chunk for r in results for chunk in r["chunks"]]
+        vectors = embed_texts(texts, cache=self.cache, batch_size=MODEL_BATCH_SIZE)
+
+        with self.lock:
+            # Append after any vectors another process added, not over them
+            self._refresh()
+            positions = self.index.add(vectors) if texts else []
+            self._tombstone_paths([r["path"] for r in results])
+
+            rows = []
+            offset = 0
+            for r in results:
+                for i, chunk in enumerate(r["chunks"]):
+                    rows.append((positions[offset], r["path"], i, chunk))
+                    offset += 1
+            self.conn.executemany("INSERT INTO chunks (position, path, chunk_index, text) VALUES (?, ?, ?, ?)", rows)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, hash, size, mtime, chunks) VALUES (?, ?, ?, ?, ?)",
+                [(r["path"], r["hash"], r["size"], r["mtime"], len(r["chunks"])) for r in results]
+            )
+            self.conn.commit()
+
+            if self.index.count > len(self.live):
+                live = np.zeros(self.index.count * 2, dtype=bool)
+                live[:len(self.live)] = self.live
+                self.live = live
+            self.live[positions] = True
+            self.vectors_size = self._vectors_file_size()
+
+        return len(texts)
+
+    def search(self, query, k=5):
+        """Return the k chunks closest in meaning to the query"""
+        self.refresh()
+        vector = embed_texts([query], cache=self.cache)[0]
+
+        with self.lock:
+            hits = self.index.search(vector, k=k, allowed=self.live[:self.index.count])
+            if not hits:
+                return []
+            scores = dict(hits)
+            placeholders = ",".join("?" * len(scores))
+            rows = self.conn.execute(
+                f"SELECT position, path, chunk_index, text FROM chunks WHERE deleted = 0 AND position IN ({placeholders})",
+                list(scores)
+            ).fetchall()
+
+        results = [
+            {'path': path, 'chunk_index': chunk_index, 'text': text, 'score': round(scores[position], 4)}
+            for position, path, chunk_index, text in rows
+        ]
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results
+
+    def stats(self):
+        """Return the number of indexed files and chunks"""
+        with self.lock:
+            files = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            chunks = self.conn.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 0").fetchone()[0]
+        stats = self.index.stats()
+        stats.update({'files': files, 'chunks': chunks})
+        return stats
+
+def scan_directory(root, known):
+    """Walk root and return (jobs for new or modified files, paths that disappeared)
+
+    Files whose mtime and size match the index are skipped without being read.
+    """
+    jobs = []
+    seen = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Skip hidden directories such as .git
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename.startswith(".") or not is_supported(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            previous = known.get(path)
+            if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                continue
+            jobs.append((path, previous[2] if previous else None))
+
+    removed = [path for path in known if path not in seen]
+    return jobs, removed
+
+def parse_in_workers(jobs, workers=None):
+    """Yield the parse results of jobs as worker processes finish them
+
+    The pool runs under parse_worker.py, so its spawned workers do not
+    re-import the server that started the ingestion.
+    """
+    process = subprocess.Popen(
+        [sys.executable, str(PARSE_WORKER), str(workers or 0), str(PARSE_CHUNKSIZE)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=str(PARSE_WORKER.parent), text=True
+    )
+    finished = False
+    try:
+        process.stdin.write("".join(json.dumps(list(job)) + "\n" for job in jobs))
+        process.stdin.close()
+        for line in process.stdout:
+            yield json.loads(line)
+        finished = True
+    finally:
+        if not finished:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+    if process.returncode:
+        raise RuntimeError(f"The document parser exited with code {process.returncode}")
+
+def ingest_directory(index, root, workers=None, batch_size=INGEST_BATCH_SIZE, progress=None):
+    """Incrementally index every supported document under root
+
+    Files are parsed and chunked in a process pool while the parent embeds
+    finished files in large batches, so parsing and embedding overlap.
+    progress, if given, is a dict updated in place as the run advances.
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise ValueError(f"Not a directory: {root}")
+
+    progress = progress if progress is not None else {}
+    progress.update({
+        'root': root, 'files_scanned': 0, 'files_changed': 0, 'files_removed': 0,
+        'files_indexed': 0, 'files_unchanged': 0, 'chunks_indexed': 0, 'errors': []
+    })
+
+    jobs, removed = scan_directory(root, index.known_files(root))
+    progress['files_changed'] = len(jobs)
+    if removed:
+        index.remove_files(removed)
+        progress['files_removed'] = len(removed)
+    if not jobs:
+        return progress
+
+    pending = []
+    pending_chunks = 0
+    unchanged = []
+    failed = []
+
+    def flush():
+        nonlocal pending, pending_chunks, unchanged, failed
+        if pending:
+            progress['chunks_indexed'] += index.write_files(pending)
+            progress['files_indexed'] += len(pending)
+        if unchanged:
+            index.touch_files(unchanged)
+            progress['files_unchanged'] += len(unchanged)
+        if failed:
+            # A file that no longer parses must not keep serving its old chunks
+            index.remove_files(failed)
+        pending, pending_chunks, unchanged, failed = [], 0, [], []
+
+    for result in parse_in_workers(jobs, workers=workers or os.cpu_count()):
+        progress['files_scanned'] += 1
+        if "error" in result:
+            progress['errors'].append(f"{result['path']}: {result['error']}")
+            failed.append(result['path'])
+        elif result["chunks"] is None:
+            unchanged.append(result)
+        else:
+            pending.append(result)
+            pending_chunks += len(result["chunks"])
+
+        if pending_chunks >= batch_size or len(unchanged) >= batch_size:
+            flush()
+    flush()
+
+    return progress
+
+_document_index = None
+_document_index_lock = threading.Lock()
+_ingest_status = {'running': False}
+
+def get_document_index():
+    """Open the document index on first use"""
+    global _document_index
+    with _document_index_lock:
+        if _document_index is None:
+            _document_index = DocumentIndex()
+        return _document_index
+
+def retrieve(query, k=5):
+    """Return the document chunks most relevant to query, or [] if RAG is unavailable"""
+    if not EMBEDDING_AVAILABLE:
+        return []
+    return get_document_index().search(query, k=k)
+
+def _run_ingest(root, workers):
+    """Background thread body for an ingestion started from the API"""
+    started = time.time()
+    try:
+        ingest_directory(get_document_index(), root, workers=workers, progress=_ingest_status)
+    except Exception as e:
+        _ingest_status['error'] = str(e)
+        print(f"Error ingesting documents from {root}: {e}")
+    finally:
+        _ingest_status['running'] = False
+        _ingest_status['seconds'] = round(time.time() - started, 2)
+
+@document_ingest.route('/api/rag/ingest', methods=['POST'])
+def start_ingest():
+    """Start indexing a directory of documents in the background"""
+    if not EMBEDDING_AVAILABLE:
+        return jsonify({'error': "Document ingestion requires 'numpy' and 'sentence-transformers' on the server"}), 503
+
+    data = request.get_json(silent=True) or {}
+    root = data.get('path')
+    if not root or not os.path.isdir(root):
+        return jsonify({'error': "'path' must be an existing directory"}), 400
+
+    with _document_index_lock:
+        if _ingest_status.get('running'):
+            return jsonify({'error': 'An ingestion is already running', 'status': _ingest_status}), 409
+        _ingest_status.clear()
+        _ingest_status.update({'running': True, 'root': os.path.abspath(root)})
+
+    threading.Thread(target=_run_ingest, args=(root, data.get('workers')), daemon=True).start()
+    return jsonify(_ingest_status), 202
+
+@document_ingest.route('/api/rag/ingest/status')
+def ingest_status():
+    """Report progress of the current or last ingestion"""
+    status = dict(_ingest_status)
+    if EMBEDDING_AVAILABLE:
+        status['index'] = get_document_index().stats()
+    return jsonify(status)
+
+@document_ingest.route('/api/rag/search')
+def search_documents():
+    """Find document chunks relevant to a query"""
+    if not EMBEDDING_AVAILABLE:
+        return jsonify({'error': "Document search requires 'numpy' and 'sentence-transformers' on the server"}), 503
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': "Query parameter 'q' is required"}), 400
+    k = min(max(request.args.get('k', 5, type=int), 1), 50)
+
+    start = time.perf_counter()
+    results = retrieve(query, k=k)
+    return jsonify({'query': query, 'results': results, 'took_ms': round((time.perf_counter() - start) * 1000, 2)})
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Index a directory of documents for FusionLoom RAG")
+    parser.add_argument("path", help="Directory to index (re-runs only process changed files)")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Chunks embedded per write")
+    args = parser.parse_args()
+
+    if not EMBEDDING_AVAILABLE:
+        print("Error: document ingestion requires 'numpy' and 'sentence-transformers'")
+        sys.exit(1)
+
+    started = time.time()
+    progress = ingest_directory(DocumentIndex(), args.path, workers=args.workers, batch_size=args.batch_size)
+    print(f"Indexed {progress['files_indexed']} changed files ({progress['chunks_indexed']} chunks), "
+          f"{progress['files_unchanged']} unchanged, {progress['files_removed']} removed "
+          f"in {time.time() - started:.1f}s")
+    for error in progress['errors']:
+        print(f"Warning: skipped {error}")
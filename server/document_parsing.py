@@ -0,0 +1,127 @@
+import os
+import re
+import hashlib
+from html.parser import HTMLParser
+
+# This module only uses the standard library: it runs inside the ingestion
+# worker processes, which should start quickly and stay small.
+
+# PDF text extraction is optional
+try:
+    import pypdf
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+TEXT_EXTENSIONS = {
+    ".txt", ".md", ".markdown", ".rst", ".csv", ".tsv", ".json", ".yaml", ".yml",
+    ".ini", ".cfg", ".toml", ".log", ".py", ".js", ".ts", ".sh", ".c", ".h",
+    ".cpp", ".java", ".go", ".rs", ".sql", ".xml", ".tex"
+}
+HTML_EXTENSIONS = {".html", ".htm"}
+PDF_EXTENSIONS = {".pdf"}
+
+# Chunks aim for CHUNK_SIZE characters and repeat CHUNK_OVERLAP characters of
+# the previous chunk so that a passage split at a boundary is still retrievable
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Larger files are almost always data dumps rather than documents
+MAX_FILE_SIZE = 20 * 1024 * 1024
+
+def is_supported(path):
+    """Return True if the file type can be parsed"""
+    ext = os.path.splitext(path)[1].lower()
+    return ext in TEXT_EXTENSIONS or ext in HTML_EXTENSIONS or (ext in PDF_EXTENSIONS and PDF_AVAILABLE)
+
+class _TextExtractor(HTMLParser):
+    """Collect the visible text of an HTML document"""
+
+    SKIPPED_TAGS = {"script", "style", "head", "noscript"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+def extract_text(path, data):
+    """Return the text content of a file given its raw bytes"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PDF_EXTENSIONS:
+        import io
+        reader = pypdf.PdfReader(io.BytesIO(data))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+    text = data.decode("utf-8", errors="replace")
+    if ext in HTML_EXTENSIONS:
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        text = "".join(extractor.parts)
+    return text
+
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping chunks, preferring paragraph and sentence breaks"""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    if not text:
+        return []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Break at the last paragraph, line or sentence end in the back half
+            window = text[start + size // 2:end]
+            for separator in ("\n\n", "\n", ". ", " "):
+                cut = window.rfind(separator)
+                if cut != -1:
+                    end = start + size // 2 + cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+def parse_file(job):
+    """Read, hash and chunk one file; runs in a worker process
+
+    job is (path, known_hash). When the file's content hash equals known_hash
+    the text is not chunked, since the indexed chunks are still current.
+    Returns a dict with the path, hash, size, mtime and chunks (None when
+    unchanged), or an error message.
+    """
+    path, known_hash = job
+    try:
+        stat = os.stat(path)
+        if stat.st_size > MAX_FILE_SIZE:
+            return {"path": path, "error": f"larger than {MAX_FILE_SIZE // (1024 * 1024)} MB"}
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        digest = hashlib.sha256(data).hexdigest()
+        result = {"path": path, "hash": digest, "size": stat.st_size, "mtime": stat.st_mtime, "chunks": None}
+        if digest != known_hash:
+            result["chunks"] = chunk_text(extract_text(path, data))
+        return result
+    except Exception as e:
+        return {"path": path, "error": str(e)}
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import importlib.util
+from pathlib import Path
+
+# numpy and sentence-transformers are optional; semantic features report
+# themselves as unavailable without them. sentence-transformers pulls in
+# torch, so it is only imported when the model is first needed - this keeps
+# processes that never embed anything (e.g. ingestion workers) light.
+EMBEDDING_AVAILABLE = (
+    importlib.util.find_spec("numpy") is not None
+    and importlib.util.find_spec("sentence_transformers") is not None
+)
+
+if EMBEDDING_AVAILABLE:
+    import numpy as np
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+DATA_DIR = Path(os.environ.get("DATA_DIR", REPO_ROOT / "data"))
+VECTOR_DB_DIR = DATA_DIR / "vector_db"
+EMBEDDING_CACHE_FILE = VECTOR_DB_DIR / "embedding_cache.sqlite3"
+
+# The model bundled with the Open WebUI data volume
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_MODEL_DIR = Path(os.environ.get(
+    "FUSIONLOOM_EMBEDDING_MODEL_DIR",
+    REPO_ROOT / "compose" / "podman" / "data" / "cache" / "embedding" / "models"
+))
+EMBEDDING_DIM = 384
+EMBEDDING_BATCH_SIZE = 64
+
+_model = None
+_model_lock = threading.Lock()
+
+def content_hash(text):
+    """Return the cache key for a piece of text"""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\0{text}".encode("utf-8")).hexdigest()
+
+def get_model():
+    """Load the embedding model once, from the bundled cache when present"""
+    global _model
+    if not EMBEDDING_AVAILABLE:
+        raise RuntimeError("Semantic search requires 'numpy' and 'sentence-transformers'")
+
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(EMBEDDING_MODEL, cache_folder=str(EMBEDDING_MODEL_DIR))
+        return _model
+
+class EmbeddingCache:
+    """Embeddings stored by content hash, so identical text is never embedded twice"""
+
+    def __init__(self, path=EMBEDDING_CACHE_FILE):
+        os.makedirs(Path(path).parent, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.conn.commit()
+
+    def get_many(self, hashes):
+        """Return {hash: vector} for the hashes already in the cache"""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        """Store (hash, vector) pairs"""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self.conn.commit()
+
+def embed_texts(texts, cache=None, batch_size=EMBEDDING_BATCH_SIZE):
+    """Embed texts as unit-length float32 rows, reusing cached embeddings
+
+    Only texts missing from the cache are sent to the model, and those are
+    encoded in batches of batch_size.
+    """
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    hashes = [content_hash(text) for text in texts]
+    known = cache.get_many(hashes) if cache is not None else {}
+
+    missing = {}
+    for text, key in zip(texts, hashes):
+        if key not in known and key not in missing:
+            missing[key] = text
+
+    if missing:
+        vectors = get_model().encode(
+            list(missing.values()),
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32)
+        fresh = list(zip(missing.keys(), vectors))
+        if cache is not None:
+            cache.put_many(fresh)
+        known.update(fresh)
+
+    return np.vstack([known[key] for key in hashes])
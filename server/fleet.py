@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import threading
+import http.client
+import configparser
+import urllib.parse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+CONFIG_FILE = REPO_ROOT / "cfg" / "config.ini"
+
+# Peers are "host:port" or "http://host:port", comma separated, from the
+# environment or the [Fleet] section of config.ini
+FLEET_PEERS_ENV = "FUSIONLOOM_FLEET_PEERS"
+DEFAULT_PEER_PORT = 5050
+
+# Each peer gets PEER_TIMEOUT seconds per request; a slow or down node only
+# marks itself as failed instead of holding up the snapshot. A failed peer
+# is not contacted again for PEER_RETRY_AFTER seconds.
+PEER_TIMEOUT = 2.0
+PEER_RETRY_AFTER = 15.0
+MAX_WORKERS = 32
+
+# Snapshots younger than SNAPSHOT_TTL are served from cache. A node whose
+# last successful fetch is older than STALE_AFTER is reported as stale.
+SNAPSHOT_TTL = 5.0
+STALE_AFTER = 30.0
+
+fleet = Blueprint('fleet', __name__)
+
+def normalize_peer(peer):
+    """Return a peer as http://host:port, or None if it cannot be parsed"""
+    peer = peer.strip().rstrip('/')
+    if not peer:
+        return None
+    if '://' not in peer:
+        peer = f"http://{peer}"
+    parsed = urllib.parse.urlsplit(peer)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return None
+    try:
+        port = parsed.port or DEFAULT_PEER_PORT
+    except ValueError:
+        return None
+    return f"{parsed.scheme}://{parsed.hostname}:{port}"
+
+def load_configured_peers():
+    """Read the peer list from the environment, falling back to config.ini"""
+    value = os.environ.get(FLEET_PEERS_ENV)
+    if value is None and CONFIG_FILE.exists():
+        config = configparser.ConfigParser()
+        try:
+            config.read(CONFIG_FILE)
+            value = config.get('Fleet', 'peers', fallback='')
+        except configparser.Error as e:
+            print(f"Error reading fleet peers from {CONFIG_FILE}: {e}")
+    peers = []
+    for entry in (value or '').split(','):
+        peer = normalize_peer(entry)
+        if peer:
+            peers.append(peer)
+        elif entry.strip():
+            print(f"Warning: ignoring invalid fleet peer '{entry.strip()}'")
+    return peers
+
+class PeerClient:
+    """Keep-alive HTTP connection to one peer
+
+    Requests to a peer are serialized on its connection, so each refresh
+    reuses the socket opened by the previous one. After a failed request
+    the peer is marked down and fails fast until PEER_RETRY_AFTER passes.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        parsed = urllib.parse.urlsplit(base_url)
+        self.https = parsed.scheme == 'https'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.conn = None
+        self.down_until = 0.0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=PEER_TIMEOUT)
+
+    def get_json(self, path):
+        """GET path and decode the JSON body
+
+        Only a kept-alive socket the peer closed since the last refresh is
+        retried, on a fresh connection. Timeouts are never retried, so an
+        unreachable peer costs at most one PEER_TIMEOUT.
+        """
+        with self.lock:
+            if time.monotonic() < self.down_until:
+                raise ConnectionError("peer is down")
+            reused = self.conn is not None
+            try:
+                try:
+                    return self._request(path)
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    if not reused:
+                        raise
+                    return self._request(path)
+            except (http.client.HTTPException, OSError):
+                self.down_until = time.monotonic() + PEER_RETRY_AFTER
+                raise
+
+    def _request(self, path):
+        if self.conn is None:
+            self.conn = self._connect()
+        try:
+            self.conn.request('GET', path, headers={'Accept': 'application/json'})
+            response = self.conn.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"{path} returned HTTP {response.status}")
+        return json.loads(body)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class Fleet:
+    """Aggregated view of this node and its peers
+
+    A snapshot is rebuilt at most once per SNAPSHOT_TTL; concurrent callers
+    during a rebuild wait for it instead of starting their own.
+    """
+
+    def __init__(self, peers=None):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='fleet')
+        self.clients = {}
+        self.registered = set()
+        self.configured = list(peers) if peers is not None else load_configured_peers()
+        self.last_good = {}
+        self.snapshot = None
+        self.local_system_info = None
+        self.local_metrics = None
+
+    def peers(self):
+        with self.lock:
+            return list(dict.fromkeys(self.configured + sorted(self.registered)))
+
+    def add_peer(self, peer):
+        """Register a peer at runtime; returns its normalized URL"""
+        url = normalize_peer(peer)
+        if url is None:
+            raise ValueError(f"Invalid peer address: {peer}")
+        with self.lock:
+            self.registered.add(url)
+            self.snapshot = None
+        return url
+
+    def remove_peer(self, peer):
+        """Forget a runtime-registered peer; returns False if it was not registered"""
+        url = normalize_peer(peer)
+        with self.lock:
+            if url not in self.registered:
+                return False
+            self.registered.discard(url)
+            self.last_good.pop(url, None)
+            client = self.clients.pop(url, None)
+            self.snapshot = None
+        if client is not None:
+            client.close()
+        return True
+
+    def _client(self, url):
+        with self.lock:
+            client = self.clients.get(url)
+            if client is None:
+                client = self.clients[url] = PeerClient(url)
+            return client
+
+    def _fetch_peer(self, url):
+        """Fetch one peer's system info and metrics"""
+        client = self._client(url)
+        started = time.time()
+        try:
+            system_info = client.get_json('/api/system-info')
+            try:
+                metrics = client.get_json('/api/metrics')
+            except RuntimeError:
+                # Older nodes only serve system info
+                metrics = None
+            node = {
+                'url': url,
+                'system_info': system_info,
+                'metrics': metrics,
+                'fetched_at': time.time(),
+                'latency_ms': round((time.time() - started) * 1000, 1),
+                'error': None
+            }
+            with self.lock:
+                self.last_good[url] = node
+            return node
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            with self.lock:
+                previous = self.last_good.get(url)
+            if previous is None:
+                return {'url': url, 'system_info': None, 'metrics': None, 'fetched_at': None,
+                        'latency_ms': None, 'error': error}
+            # Serve the last successful result, marked with the current error
+            return dict(previous, error=error)
+
+    def _local_node(self):
+        node = {'url': 'local', 'system_info': None, 'metrics': None, 'fetched_at': time.time(),
+                'latency_ms': 0.0, 'error': None}
+        try:
+            if self.local_system_info:
+                node['system_info'] = self.local_system_info()
+            if self.local_metrics:
+                node['metrics'] = self.local_metrics()
+        except Exception as e:
+            node['error'] = str(e)
+        return node
+
+    def _build(self):
+        started = time.time()
+        peers = self.peers()
+        nodes = [self._local_node()] + list(self.executor.map(self._fetch_peer, peers))
+        return {
+            'generated_at': time.time(),
+            'took_ms': round((time.time() - started) * 1000, 1),
+            'nodes': nodes
+        }
+
+    def get_snapshot(self, max_age=SNAPSHOT_TTL):
+        """Return the aggregated snapshot, rebuilding it if older than max_age"""
+        with self.refresh_lock:
+            with self.lock:
+                snapshot = self.snapshot
+            if snapshot is None or time.time() - snapshot['generated_at'] > max_age:
+                snapshot = self._build()
+                with self.lock:
+                    self.snapshot = snapshot
+        return self._annotate(snapshot)
+
+    def _annotate(self, snapshot):
+        """Add ages and staleness relative to now"""
+        now = time.time()
+        nodes = []
+        for node in snapshot['nodes']:
+            age = None if node['fetched_at'] is None else round(now - node['fetched_at'], 1)
+            nodes.append(dict(
+                node,
+                age_seconds=age,
+                stale=age is None or age > STALE_AFTER,
+                online=node['error'] is None
+            ))
+        return {
+            'generated_at': snapshot['generated_at'],
+            'age_seconds': round(now - snapshot['generated_at'], 1),
+            'took_ms': snapshot['took_ms'],
+            'node_count': len(nodes),
+            'online_count': sum(1 for node in nodes if node['online']),
+            'nodes': nodes
+        }
+
+_fleet = None
+_fleet_lock = threading.Lock()
+
+def get_fleet():
+    """Return the shared Fleet, creating it on first use"""
+    global _fleet
+    with _fleet_lock:
+        if _fleet is None:
+            _fleet = Fleet()
+        return _fleet
+
+def register_local_node(system_info_fn, metrics_fn):
+    """Report this node in the snapshot by calling these functions directly"""
+    fleet_view = get_fleet()
+    fleet_view.local_system_info = system_info_fn
+    fleet_view.local_metrics = metrics_fn
+
+@fleet.route('/api/fleet')
+def get_fleet_snapshot():
+    """Return system info and metrics for this node and every peer
+
+    ?max_age=<seconds> bounds how old the cached snapshot may be;
+    ?max_age=0 forces a refresh.
+    """
+    try:
+        max_age = float(request.args.get('max_age', SNAPSHOT_TTL))
+    except ValueError:
+        return jsonify({'error': "'max_age' must be a number"}), 400
+    return jsonify(get_fleet().get_snapshot(max_age=max(0.0, max_age)))
+
+@fleet.route('/api/fleet/peers', methods=['GET'])
+def list_peers():
+    fleet_view = get_fleet()
+    return jsonify({'configured': fleet_view.configured, 'registered': sorted(fleet_view.registered)})
+
+@fleet.route('/api/fleet/peers', methods=['POST'])
+def add_peer():
+    """Register a peer; nodes can announce themselves with {"url": "host:port"}"""
+    body = request.get_json(silent=True) or {}
+    if not body.get('url'):
+        return jsonify({'error': "'url' is required"}), 400
+    try:
+        url = get_fleet().add_peer(body['url'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'url': url}), 201
+
+@fleet.route('/api/fleet/peers', methods=['DELETE'])
+def remove_peer():
+    body = request.get_json(silent=True) or {}
+    if not body.get('url') or not get_fleet().remove_peer(body['url']):
+        return jsonify({'error': 'Peer is not registered'}), 404
+    return jsonify({'url': normalize_peer(body['url'])})
@@ -0,0 +1,589 @@
+import os
+import re
+import json
+import time
+import uuid
+import itertools
+import threading
+import subprocess
+import configparser
+import urllib.request
+import urllib.error
+from pathlib import Path
+from contextlib import contextmanager
+from flask import Blueprint, request, jsonify
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+CONFIG_FILE = REPO_ROOT / "cfg" / "config.ini"
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_TIMEOUT = 10
+
+# The VRAM budget in MiB comes from FUSIONLOOM_GPU_BUDGET_MB, or from the
+# detected GPU memory less a reserve for the desktop and CUDA contexts,
+# capped by gpu_memory_limit in config.ini
+GPU_BUDGET_ENV = "FUSIONLOOM_GPU_BUDGET_MB"
+GPU_RESERVE_MB = 512
+
+# Lower values are served first; within a priority, leases are granted in
+# request order so a large diffusion batch is not starved by small jobs
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+# Granted leases expire unless released or renewed within their TTL, so a
+# crashed client cannot hold VRAM forever
+DEFAULT_LEASE_TTL = 600
+MAX_LEASE_TTL = 3600
+
+# Ollama models count as idle, and may be unloaded for a queued lease, once
+# no chat request has used them for this many seconds
+OLLAMA_IDLE_SECONDS = 30
+# Loaded models are re-read from Ollama this often while leases are queued
+OLLAMA_POLL_INTERVAL = 2.0
+# A model that is not loaded yet needs roughly its file size plus KV cache
+OLLAMA_LOAD_OVERHEAD = 1.2
+
+# How long a chat request waits for VRAM before the gateway gives up
+LLM_LEASE_WAIT = 60
+
+gpu_arbiter = Blueprint('gpu_arbiter', __name__)
+
+class LeaseTimeout(Exception):
+    """Raised when a lease is not granted within the requested time"""
+
+class Lease:
+    """A claim on part of the VRAM budget"""
+
+    def __init__(self, workload, service, vram_mb, priority, ttl, model=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.workload = workload
+        self.service = service
+        self.vram_mb = int(vram_mb)
+        self.priority = priority
+        self.ttl = ttl
+        # Set for LLM leases, so a resident model is not counted twice
+        self.model = model
+        self.state = "queued"
+        self.created_at = time.time()
+        self.granted_at = None
+        self.expires_at = None
+        self.granted = threading.Event()
+
+    def to_dict(self, position=None):
+        info = {
+            "id": self.id,
+            "workload": self.workload,
+            "service": self.service,
+            "vram_mb": self.vram_mb,
+            "priority": self.priority,
+            "state": self.state,
+            "created_at": self.created_at,
+            "granted_at": self.granted_at,
+            "expires_at": self.expires_at
+        }
+        if self.model:
+            info["model"] = self.model
+        if position is not None:
+            info["position"] = position
+        return info
+
+def parse_memory_limit(value):
+    """Convert a config value such as '8G' or '8192M' to MiB"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([GgMm]?)[Bb]?\s*", value or "")
+    if not match:
+        return None
+    amount = float(match.group(1))
+    return int(amount * 1024) if match.group(2).upper() in ("G", "") else int(amount)
+
+def detect_gpu_memory():
+    """Return the total memory of the first NVIDIA GPU in MiB, or None"""
+    try:
+        output = subprocess.check_output(
+            ['nvidia-smi', '--query-gpu=memory.total', '--format=csv,noheader,nounits'],
+            stderr=subprocess.DEVNULL, timeout=5
+        ).decode().strip()
+        return int(float(output.split('\n')[0]))
+    except Exception:
+        return None
+
+def detect_budget():
+    """Work out the VRAM budget in MiB, or None if it cannot be determined"""
+    if os.environ.get(GPU_BUDGET_ENV):
+        return int(os.environ[GPU_BUDGET_ENV])
+
+    limits = []
+    detected = detect_gpu_memory()
+    if detected:
+        limits.append(detected - GPU_RESERVE_MB)
+    if CONFIG_FILE.exists():
+        config = configparser.ConfigParser()
+        try:
+            config.read(CONFIG_FILE)
+            configured = parse_memory_limit(config.get('Hardware', 'gpu_memory_limit', fallback=''))
+            if configured:
+                limits.append(configured)
+        except configparser.Error as e:
+            print(f"Error reading GPU memory limit from {CONFIG_FILE}: {e}")
+    return min(limits) if limits else None
+
+def ollama_request(path, body=None):
+    """Call the Ollama API and decode its JSON response"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(
+        f"{OLLAMA_BASE_URL}{path}",
+        data=data,
+        headers={'Content-Type': 'application/json'},
+        method='POST' if data is not None else 'GET'
+    )
+    with urllib.request.urlopen(req, timeout=OLLAMA_TIMEOUT) as response:
+        return json.loads(response.read() or b'{}')
+
+def ollama_model_name(name):
+    """Return a model name as Ollama lists it: 'llama3' is 'llama3:latest'"""
+    if name and ":" not in name.rsplit("/", 1)[-1]:
+        return f"{name}:latest"
+    return name
+
+class GpuArbiter:
+    """Shares one GPU between Ollama and the image-generation services
+
+    Workloads lease VRAM before using the GPU. Leases that do not fit the
+    budget wait in a priority queue; models Ollama keeps loaded count
+    against the budget, and idle ones are unloaded (keep_alive=0) when that
+    lets the head of the queue start.
+    """
+
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb if budget_mb is not None else detect_budget()
+        self.lock = threading.Lock()
+        self.sequence = itertools.count()
+        self.queue = []
+        self.active = {}
+        self.leases = {}
+
+        # Models Ollama reports as loaded: {name: size_vram in MiB}
+        self.ollama_models = {}
+        self.ollama_checked = 0.0
+        self.ollama_error = None
+        # Chat requests running on Ollama, in total and per model; a request
+        # still waiting for its load lease is not counted
+        self.ollama_inflight = 0
+        self.ollama_last_used = 0.0
+        self.model_inflight = {}
+        self.model_last_used = {}
+        # Pending load leases, shared by concurrent first requests for a model:
+        # {name: {"lease": Lease, "users": count}}
+        self.ollama_loads = {}
+        self.ollama_unloads = 0
+        self.model_sizes = {}
+
+        self.wakeup = threading.Event()
+        self.worker = threading.Thread(target=self._run, name="gpu-arbiter", daemon=True)
+        self.worker.start()
+
+    # Accounting
+
+    def _leased_mb(self):
+        return sum(lease.vram_mb for lease in self.active.values())
+
+    def _ollama_unleased_mb(self):
+        """VRAM held by loaded Ollama models that no active lease already covers"""
+        leased_models = {lease.model for lease in self.active.values() if lease.model}
+        return sum(size for name, size in self.ollama_models.items() if name not in leased_models)
+
+    def _free_mb(self):
+        return self.budget_mb - self._leased_mb() - self._ollama_unleased_mb()
+
+    def _schedule(self):
+        """Grant queued leases in order while they fit; call with the lock held"""
+        now = time.time()
+        while self.queue:
+            lease = self.queue[0][2]
+            if self.budget_mb is not None and lease.vram_mb > self._free_mb():
+                break
+            self.queue.pop(0)
+            lease.state = "granted"
+            lease.granted_at = now
+            lease.expires_at = now + lease.ttl
+            self.active[lease.id] = lease
+            lease.granted.set()
+
+    # Leases
+
+    def request(self, workload, service, vram_mb, priority="normal", ttl=DEFAULT_LEASE_TTL, model=None):
+        """Queue a lease and return it; it may already be granted"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'; expected one of {', '.join(PRIORITIES)}")
+        if vram_mb < 0:
+            raise ValueError("vram_mb must not be negative")
+        if self.budget_mb is not None and vram_mb > self.budget_mb:
+            raise ValueError(f"{vram_mb} MiB exceeds the GPU budget of {self.budget_mb} MiB")
+
+        lease = Lease(workload, service, vram_mb, priority, min(ttl, MAX_LEASE_TTL), model=model)
+        with self.lock:
+            self._enqueue(lease)
+        if lease.state == "queued":
+            # Let the worker check whether idle Ollama models can make room
+            self.wakeup.set()
+        return lease
+
+    def _enqueue(self, lease):
+        """Add a lease to the queue and grant what fits; call with the lock held"""
+        self.leases[lease.id] = lease
+        self.queue.append((PRIORITIES[lease.priority], next(self.sequence), lease))
+        self.queue.sort(key=lambda entry: entry[:2])
+        self._schedule()
+
+    def acquire(self, workload, service, vram_mb, priority="normal", ttl=DEFAULT_LEASE_TTL, timeout=None, model=None):
+        """Request a lease and wait until it is granted
+
+        Raises LeaseTimeout, withdrawing the request, if it is not granted
+        within timeout seconds.
+        """
+        lease = self.request(workload, service, vram_mb, priority=priority, ttl=ttl, model=model)
+        if not lease.granted.wait(timeout) and self.cancel(lease.id):
+            raise LeaseTimeout(f"No VRAM for {vram_mb} MiB within {timeout} seconds")
+        return lease
+
+    @contextmanager
+    def leased(self, workload, service, vram_mb, **kwargs):
+        """Hold a lease for the duration of a with block"""
+        lease = self.acquire(workload, service, vram_mb, **kwargs)
+        try:
+            yield lease
+        finally:
+            self.release(lease.id)
+
+    def renew(self, lease_id, ttl=None):
+        """Extend a granted lease; returns the lease, or None if it is gone"""
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease is None or lease.state not in ("queued", "granted"):
+                return None
+            if ttl is not None:
+                lease.ttl = min(ttl, MAX_LEASE_TTL)
+            if lease.state == "granted":
+                lease.expires_at = time.time() + lease.ttl
+            return lease
+
+    def release(self, lease_id):
+        """Return a lease's VRAM, or withdraw it from the queue"""
+        with self.lock:
+            lease = self.leases.pop(lease_id, None)
+            if lease is None:
+                return None
+            if lease.state == "granted":
+                self.active.pop(lease_id, None)
+                lease.state = "released"
+            else:
+                self.queue = [entry for entry in self.queue if entry[2] is not lease]
+                lease.state = "cancelled"
+            self._schedule()
+        return lease
+
+    def cancel(self, lease_id):
+        """Withdraw a lease that is still queued; returns False if it was granted"""
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease is None or lease.state != "queued":
+                return False
+            self.leases.pop(lease_id)
+            self.queue = [entry for entry in self.queue if entry[2] is not lease]
+            lease.state = "cancelled"
+            self._schedule()
+        return True
+
+    def get(self, lease_id):
+        """Return (lease, queue position) for a known lease"""
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return None, None
+            positions = [entry[2] for entry in self.queue]
+            return lease, positions.index(lease) if lease in positions else None
+
+    # Ollama
+
+    def refresh_ollama(self):
+        """Re-read the models Ollama has loaded"""
+        try:
+            loaded = ollama_request('/api/ps').get('models', [])
+            models = {ollama_model_name(model['name']): int(model.get('size_vram', 0)) // (1024 * 1024)
+                      for model in loaded}
+            error = None
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            models, error = {}, str(getattr(e, 'reason', e))
+        with self.lock:
+            self.ollama_models = models
+            self.ollama_checked = time.time()
+            self.ollama_error = error
+            self._schedule()
+
+    def ollama_idle(self, model=None, idle_seconds=OLLAMA_IDLE_SECONDS):
+        """Whether no chat request is using Ollama, or one model, or has for idle_seconds"""
+        if model is None:
+            inflight, last_used = self.ollama_inflight, self.ollama_last_used
+        else:
+            inflight, last_used = self.model_inflight.get(model, 0), self.model_last_used.get(model, 0.0)
+        return inflight == 0 and time.time() - last_used >= idle_seconds
+
+    def unload_ollama(self, force=False, needed_mb=None, idle_seconds=OLLAMA_IDLE_SECONDS):
+        """Ask Ollama to unload its models; unless forced, only the idle ones
+
+        With needed_mb, only the largest models needed to free that much
+        are unloaded. Returns the names of the models unloaded.
+        """
+        with self.lock:
+            leased_models = {lease.model for lease in self.active.values() if lease.model}
+            candidates = sorted(
+                ((size, name) for name, size in self.ollama_models.items()
+                 if name not in leased_models and (force or self.ollama_idle(name, idle_seconds))),
+                reverse=True
+            )
+            if not candidates:
+                return []
+        models = []
+        for size, name in candidates:
+            if needed_mb is not None and needed_mb <= 0:
+                break
+            models.append(name)
+            if needed_mb is not None:
+                needed_mb -= size
+        unloaded = []
+        for name in models:
+            try:
+                # An empty prompt with keep_alive=0 unloads the model at once
+                ollama_request('/api/generate', {'model': name, 'keep_alive': 0})
+                unloaded.append(name)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                print(f"Error unloading Ollama model {name}: {e}")
+        with self.lock:
+            self.ollama_unloads += len(unloaded)
+        self.refresh_ollama()
+        return unloaded
+
+    def model_size_mb(self, model):
+        """Estimate the VRAM an Ollama model needs once loaded, or None if it is unknown"""
+        model = ollama_model_name(model)
+        if not self.model_sizes.get(model):
+            try:
+                for entry in ollama_request('/api/tags').get('models', []):
+                    self.model_sizes[ollama_model_name(entry['name'])] = entry.get('size', 0) // (1024 * 1024)
+            except (urllib.error.URLError, OSError, ValueError):
+                pass
+        size = self.model_sizes.get(model)
+        return int(size * OLLAMA_LOAD_OVERHEAD) if size else None
+
+    def _join_load(self, model):
+        """Return the lease for loading a model, shared by every request waiting for it"""
+        size = self.model_size_mb(model)
+        # A model Ollama cannot size yet (not pulled, or Ollama unreachable)
+        # may still be large, so it claims the whole GPU rather than nothing
+        size = self.budget_mb if size is None else min(size, self.budget_mb)
+        with self.lock:
+            load = self.ollama_loads.get(model)
+            if load is None:
+                lease = Lease("llm", "ollama", size, "interactive", DEFAULT_LEASE_TTL, model=model)
+                self._enqueue(lease)
+                load = self.ollama_loads[model] = {"lease": lease, "users": 0}
+            load["users"] += 1
+            lease = load["lease"]
+        if lease.state == "queued":
+            self.wakeup.set()
+        return lease
+
+    def _leave_load(self, model):
+        """Drop one user of a model's load lease, releasing it after the last"""
+        with self.lock:
+            load = self.ollama_loads.get(model)
+            load["users"] -= 1
+            if load["users"]:
+                return
+            del self.ollama_loads[model]
+        self.release(load["lease"].id)
+
+    def _track_ollama(self, model, delta):
+        with self.lock:
+            now = time.time()
+            self.ollama_inflight += delta
+            self.ollama_last_used = now
+            self.model_inflight[model] = self.model_inflight.get(model, 0) + delta
+            self.model_last_used[model] = now
+
+    @contextmanager
+    def ollama_session(self, model):
+        """Bracket one chat request to Ollama
+
+        A model that is already loaded runs without a lease. Loading one
+        leases its estimated size first, so the load waits for running image
+        jobs instead of running out of memory alongside them. Concurrent
+        first requests for the same model share that lease, and a request
+        only counts as using Ollama once it is granted, so idle resident
+        models can be unloaded to make room for it.
+        """
+        model = ollama_model_name(model)
+        with self.lock:
+            resident = model in self.ollama_models
+        lease = None
+        if self.budget_mb is not None and model and not resident:
+            lease = self._join_load(model)
+            if not lease.granted.wait(LLM_LEASE_WAIT) and lease.state == "queued":
+                self._leave_load(model)
+                raise LeaseTimeout(f"No VRAM for {lease.vram_mb} MiB within {LLM_LEASE_WAIT} seconds")
+
+        self._track_ollama(model, 1)
+        try:
+            yield lease
+        finally:
+            self._track_ollama(model, -1)
+            if lease is not None:
+                # Read the now resident model from /api/ps before the lease
+                # stops covering its VRAM, so no other lease is granted on top
+                self.refresh_ollama()
+                self._leave_load(model)
+
+    # Background work
+
+    def _expire_leases(self):
+        now = time.time()
+        with self.lock:
+            for lease in list(self.active.values()):
+                if lease.expires_at < now:
+                    print(f"GPU lease {lease.id} ({lease.service}) expired")
+                    self.active.pop(lease.id)
+                    self.leases.pop(lease.id, None)
+                    lease.state = "expired"
+            self._schedule()
+
+    def _blocked(self):
+        """Return (VRAM the head of the queue is short by, the head lease)
+
+        The shortfall is 0 unless unloading Ollama models could make it up.
+        """
+        with self.lock:
+            if self.budget_mb is None or not self.queue or not self._ollama_unleased_mb():
+                return 0, None
+            head = self.queue[0][2]
+            return max(0, head.vram_mb - self._free_mb()), head
+
+    def _run(self):
+        """Expire leases, track Ollama and unload it when the queue is blocked"""
+        while True:
+            self.wakeup.wait(OLLAMA_POLL_INTERVAL)
+            self.wakeup.clear()
+            try:
+                self._expire_leases()
+                with self.lock:
+                    queued = bool(self.queue)
+                # Poll Ollama often only while something is waiting for VRAM
+                interval = OLLAMA_POLL_INTERVAL if queued else OLLAMA_POLL_INTERVAL * 5
+                if time.time() - self.ollama_checked >= interval:
+                    self.refresh_ollama()
+                needed, head = self._blocked()
+                if needed:
+                    # A chat switching models waits on a person, so models
+                    # nobody is using make way for it without a grace period
+                    idle_seconds = 0 if head.model else OLLAMA_IDLE_SECONDS
+                    self.unload_ollama(needed_mb=needed, idle_seconds=idle_seconds)
+            except Exception as e:
+                print(f"Error in GPU arbiter: {e}")
+
+    def state(self):
+        with self.lock:
+            leased = self._leased_mb()
+            ollama = self._ollama_unleased_mb()
+            return {
+                "budget_mb": self.budget_mb,
+                "leased_mb": leased,
+                "ollama_mb": ollama,
+                "free_mb": None if self.budget_mb is None else self.budget_mb - leased - ollama,
+                "leases": [lease.to_dict() for lease in self.active.values()],
+                "queue": [entry[2].to_dict(position) for position, entry in enumerate(self.queue)],
+                "ollama": {
+                    "models": self.ollama_models,
+                    "inflight": self.ollama_inflight,
+                    "loading": {name: load["users"] for name, load in self.ollama_loads.items()},
+                    "idle": self.ollama_idle(),
+                    "last_used": self.ollama_last_used or None,
+                    "checked_at": self.ollama_checked or None,
+                    "unloads": self.ollama_unloads,
+                    "error": self.ollama_error
+                }
+            }
+
+_arbiter = None
+_arbiter_lock = threading.Lock()
+
+def get_arbiter():
+    """Return the shared GpuArbiter, creating it on first use"""
+    global _arbiter
+    with _arbiter_lock:
+        if _arbiter is None:
+            _arbiter = GpuArbiter()
+        return _arbiter
+
+def lease_response(lease, position=None):
+    return jsonify(lease.to_dict(position)), 201 if lease.state == "granted" else 202
+
+@gpu_arbiter.route('/api/gpu/state')
+def gpu_state():
+    """Return the budget, granted leases, queued leases and Ollama's loaded models"""
+    return jsonify(get_arbiter().state())
+
+@gpu_arbiter.route('/api/gpu/leases', methods=['POST'])
+def create_lease():
+    """Request VRAM for a workload
+
+    Body: {"service": "comfyui", "vram_mb": 9000, "workload": "image",
+    "priority": "normal", "ttl": 600, "wait": 0}. Responds 201 once granted,
+    or 202 if the lease is still queued after waiting up to "wait" seconds;
+    poll GET /api/gpu/leases/<id> until it is granted.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        vram_mb = int(body['vram_mb'])
+        ttl = float(body.get('ttl', DEFAULT_LEASE_TTL))
+        wait = min(float(body.get('wait', 0)), 60.0)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': "'vram_mb' is required and 'ttl' and 'wait' must be numbers"}), 400
+
+    arbiter = get_arbiter()
+    try:
+        lease = arbiter.request(body.get('workload', 'image'), body.get('service', 'unknown'), vram_mb,
+                                priority=body.get('priority', 'normal'), ttl=ttl)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if wait > 0:
+        lease.granted.wait(wait)
+    lease, position = arbiter.get(lease.id)
+    return lease_response(lease, position)
+
+@gpu_arbiter.route('/api/gpu/leases/<lease_id>')
+def get_lease(lease_id):
+    lease, position = get_arbiter().get(lease_id)
+    if lease is None:
+        return jsonify({'error': 'Unknown or expired lease'}), 404
+    return lease_response(lease, position)
+
+@gpu_arbiter.route('/api/gpu/leases/<lease_id>/renew', methods=['POST'])
+def renew_lease(lease_id):
+    body = request.get_json(silent=True) or {}
+    lease = get_arbiter().renew(lease_id, ttl=body.get('ttl'))
+    if lease is None:
+        return jsonify({'error': 'Unknown or expired lease'}), 404
+    return jsonify(lease.to_dict())
+
+@gpu_arbiter.route('/api/gpu/leases/<lease_id>', methods=['DELETE'])
+def release_lease(lease_id):
+    lease = get_arbiter().release(lease_id)
+    if lease is None:
+        return jsonify({'error': 'Unknown or expired lease'}), 404
+    return jsonify(lease.to_dict())
+
+@gpu_arbiter.route('/api/gpu/ollama/unload', methods=['POST'])
+def unload_ollama():
+    """Unload Ollama's models now; {"force": true} unloads them even if in use"""
+    body = request.get_json(silent=True) or {}
+    unloaded = get_arbiter().unload_ollama(force=bool(body.get('force')))
+    return jsonify({'unloaded': unloaded})
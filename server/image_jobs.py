@@ -0,0 +1,630 @@
+import os
+import json
+import time
+import uuid
+import base64
+import random
+import sqlite3
+import threading
+import configparser
+import collections
+import importlib.util
+import urllib.request
+import urllib.parse
+import urllib.error
+from pathlib import Path
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+
+from gpu_arbiter import get_arbiter
+from power_governor import get_governor
+
+# websocket-client is optional; without it ComfyUI jobs are tracked by
+# polling /history and report no progress until they finish
+WEBSOCKET_AVAILABLE = importlib.util.find_spec("websocket") is not None
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+DATA_DIR = Path(os.environ.get("DATA_DIR", REPO_ROOT / "data"))
+CONFIG_FILE = REPO_ROOT / "cfg" / "config.ini"
+IMAGE_JOBS_DIR = DATA_DIR / "image_jobs"
+IMAGE_JOBS_DB_FILE = IMAGE_JOBS_DIR / "jobs.sqlite3"
+IMAGE_OUTPUT_DIR = IMAGE_JOBS_DIR / "images"
+
+# Backend URLs come from the environment, then the [Endpoints] section the
+# installer writes to config.ini
+BACKENDS = {
+    "a1111": {
+        "env": "FUSIONLOOM_A1111_URL",
+        "config_key": "stable_diffusion_api",
+        "default_url": "http://localhost:7860",
+        "default_sampler": "Euler a"
+    },
+    "comfyui": {
+        "env": "FUSIONLOOM_COMFYUI_URL",
+        "config_key": "comfyui_api",
+        "default_url": "http://localhost:8188",
+        "default_sampler": "euler"
+    }
+}
+
+# Jobs with the same checkpoint, resolution and sampler are submitted together,
+# up to this many images per submission
+MAX_BATCH_IMAGES = 8
+# A lone job waits this long for compatible jobs to batch with
+BATCH_WINDOW = 0.5
+PROGRESS_INTERVAL = 1.0
+BACKEND_TIMEOUT = 30
+GENERATION_TIMEOUT = 1800
+THROUGHPUT_WINDOW = 600
+
+# VRAM leased from the GPU arbiter per batch: the model plus activations
+# that grow with the number of pixels generated
+SD_BASE_VRAM_MB = 3500
+SDXL_BASE_VRAM_MB = 7500
+VRAM_PER_MEGAPIXEL_MB = 1200
+
+FINAL_STATES = ("done", "failed", "cancelled")
+
+image_jobs = Blueprint('image_jobs', __name__)
+
+def backend_url(backend):
+    """Return the base URL of an image-generation backend"""
+    settings = BACKENDS[backend]
+    url = os.environ.get(settings["env"])
+    if not url and CONFIG_FILE.exists():
+        config = configparser.ConfigParser()
+        try:
+            config.read(CONFIG_FILE)
+            url = config.get('Endpoints', settings["config_key"], fallback=None)
+        except configparser.Error as e:
+            print(f"Error reading {settings['config_key']} from {CONFIG_FILE}: {e}")
+    return (url or settings["default_url"]).rstrip('/')
+
+def http_json(url, body=None, timeout=BACKEND_TIMEOUT):
+    """GET or POST JSON and decode the JSON response"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'},
+                                 method='POST' if data is not None else 'GET')
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read() or b'null')
+
+def validate_params(backend, body):
+    """Return normalized txt2img parameters, raising ValueError for bad input"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'; expected one of {', '.join(BACKENDS)}")
+    if not body.get('prompt'):
+        raise ValueError("'prompt' is required")
+    try:
+        params = {
+            "prompt": str(body['prompt']),
+            "negative_prompt": str(body.get('negative_prompt', '')),
+            "checkpoint": body.get('checkpoint') or None,
+            "width": int(body.get('width', 512)),
+            "height": int(body.get('height', 512)),
+            "sampler": body.get('sampler') or BACKENDS[backend]["default_sampler"],
+            "scheduler": body.get('scheduler', 'normal'),
+            "steps": int(body.get('steps', 20)),
+            "cfg_scale": float(body.get('cfg_scale', 7.0)),
+            "seed": int(body.get('seed', -1)),
+            "n": int(body.get('n', 1))
+        }
+    except (TypeError, ValueError):
+        raise ValueError("width, height, steps, seed and n must be integers and cfg_scale a number")
+    if backend == "comfyui" and not params["checkpoint"]:
+        raise ValueError("'checkpoint' is required for ComfyUI")
+    for key in ("width", "height"):
+        if not 64 <= params[key] <= 2048 or params[key] % 8:
+            raise ValueError(f"'{key}' must be a multiple of 8 between 64 and 2048")
+    if not 1 <= params["steps"] <= 150:
+        raise ValueError("'steps' must be between 1 and 150")
+    if not 1 <= params["n"] <= MAX_BATCH_IMAGES:
+        raise ValueError(f"'n' must be between 1 and {MAX_BATCH_IMAGES}")
+    return params
+
+def group_key(job):
+    """Jobs with equal keys can share one submission"""
+    params = job["params"]
+    return (job["backend"], params["checkpoint"], params["width"], params["height"], params["sampler"])
+
+def estimate_vram_mb(batch):
+    params = batch[0]["params"]
+    base = SDXL_BASE_VRAM_MB if "xl" in (params["checkpoint"] or "").lower() else SD_BASE_VRAM_MB
+    images = sum(job["params"]["n"] for job in batch)
+    return int(base + VRAM_PER_MEGAPIXEL_MB * images * params["width"] * params["height"] / 1e6)
+
+def split_images(batch, images):
+    """Hand out a submission's images to its jobs in order"""
+    results = []
+    for job in batch:
+        n = job["params"]["n"]
+        results.append(images[:n])
+        images = images[n:]
+    return results
+
+def run_a1111(batch, progress):
+    """Generate a batch on AUTOMATIC1111; returns PNG bytes per job
+
+    The web UI takes one prompt per call, so jobs that only differ in
+    checkpoint-independent settings run as consecutive calls. The checkpoint
+    is switched once, by the first call, and stays loaded for the rest.
+    """
+    url = backend_url("a1111")
+    params = batch[0]["params"]
+
+    # Jobs with identical prompts and settings, and no fixed seed, become
+    # one call with a larger batch_size
+    calls = collections.OrderedDict()
+    for index, job in enumerate(batch):
+        p = job["params"]
+        # A fixed seed would be shared by the whole call, so those jobs run alone
+        seed = -1 if p["seed"] == -1 else job["id"]
+        key = (p["prompt"], p["negative_prompt"], p["steps"], p["cfg_scale"], seed)
+        calls.setdefault(key, []).append(index)
+
+    results = [None] * len(batch)
+    for call_number, indexes in enumerate(calls.values()):
+        jobs = [batch[index] for index in indexes]
+        first = jobs[0]["params"]
+        total = sum(job["params"]["n"] for job in jobs)
+        payload = {
+            "prompt": first["prompt"],
+            "negative_prompt": first["negative_prompt"],
+            "width": params["width"],
+            "height": params["height"],
+            "sampler_name": params["sampler"],
+            "steps": first["steps"],
+            "cfg_scale": first["cfg_scale"],
+            "seed": first["seed"],
+            "batch_size": total,
+            "n_iter": 1,
+            "send_images": True,
+            "save_images": False,
+            "override_settings_restore_afterwards": False
+        }
+        if params["checkpoint"]:
+            payload["override_settings"] = {"sd_model_checkpoint": params["checkpoint"]}
+
+        finished = threading.Event()
+
+        def poll_progress(done_calls=call_number):
+            while not finished.wait(PROGRESS_INTERVAL):
+                try:
+                    state = http_json(f"{url}/sdapi/v1/progress?skip_current_image=true")
+                    fraction = float(state.get("progress") or 0.0)
+                    for job in batch:
+                        progress(job, (done_calls + fraction) / len(calls))
+                except Exception:
+                    pass
+
+        poller = threading.Thread(target=poll_progress, name="a1111-progress", daemon=True)
+        poller.start()
+        try:
+            response = http_json(f"{url}/sdapi/v1/txt2img", payload, timeout=GENERATION_TIMEOUT)
+        finally:
+            finished.set()
+            poller.join()
+
+        images = [base64.b64decode(image.split(",", 1)[-1]) for image in response.get("images", [])]
+        # A grid of the whole batch may come first
+        if len(images) == total + 1:
+            images = images[1:]
+        if len(images) < total:
+            raise RuntimeError(f"A1111 returned {len(images)} images for a batch of {total}")
+        for index, job_images in zip(indexes, split_images(jobs, images)):
+            results[index] = job_images
+    return results
+
+def comfyui_workflow(batch):
+    """Build one ComfyUI prompt generating every job in the batch
+
+    All jobs share a single checkpoint loader, so the model is loaded once;
+    each job gets its own sampler branch with a latent batch of n images.
+    """
+    params = batch[0]["params"]
+    graph = {"ckpt": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": params["checkpoint"]}}}
+    for index, job in enumerate(batch):
+        p = job["params"]
+        seed = p["seed"] if p["seed"] != -1 else random.randrange(2 ** 32)
+        graph.update({
+            f"{index}_latent": {"class_type": "EmptyLatentImage",
+                                "inputs": {"width": p["width"], "height": p["height"], "batch_size": p["n"]}},
+            f"{index}_positive": {"class_type": "CLIPTextEncode",
+                                  "inputs": {"text": p["prompt"], "clip": ["ckpt", 1]}},
+            f"{index}_negative": {"class_type": "CLIPTextEncode",
+                                  "inputs": {"text": p["negative_prompt"], "clip": ["ckpt", 1]}},
+            f"{index}_sampler": {"class_type": "KSampler", "inputs": {
+                "model": ["ckpt", 0], "seed": seed, "steps": p["steps"], "cfg": p["cfg_scale"],
+                "sampler_name": p["sampler"], "scheduler": p["scheduler"], "denoise": 1.0,
+                "positive": [f"{index}_positive", 0], "negative": [f"{index}_negative", 0],
+                "latent_image": [f"{index}_latent", 0]
+            }},
+            f"{index}_decode": {"class_type": "VAEDecode",
+                                "inputs": {"samples": [f"{index}_sampler", 0], "vae": ["ckpt", 2]}},
+            f"{index}_save": {"class_type": "SaveImage",
+                              "inputs": {"images": [f"{index}_decode", 0], "filename_prefix": f"fusionloom_{job['id']}"}}
+        })
+    return graph
+
+def run_comfyui(batch, progress):
+    """Generate a batch on ComfyUI; returns PNG bytes per job"""
+    url = backend_url("comfyui")
+    client_id = uuid.uuid4().hex
+    ws = None
+    if WEBSOCKET_AVAILABLE:
+        import websocket
+        parsed = urllib.parse.urlsplit(url)
+        scheme = "wss" if parsed.scheme == "https" else "ws"
+        try:
+            # Connect before queueing so no progress message is missed
+            ws = websocket.create_connection(f"{scheme}://{parsed.netloc}/ws?clientId={client_id}",
+                                             timeout=BACKEND_TIMEOUT)
+        except Exception as e:
+            print(f"ComfyUI websocket unavailable, polling instead: {e}")
+
+    try:
+        queued = http_json(f"{url}/prompt", {"prompt": comfyui_workflow(batch), "client_id": client_id})
+        prompt_id = queued["prompt_id"]
+        deadline = time.time() + GENERATION_TIMEOUT
+        if ws is not None:
+            wait_comfyui_websocket(ws, prompt_id, batch, progress, deadline)
+        history = None
+        while history is None:
+            history = (http_json(f"{url}/history/{prompt_id}") or {}).get(prompt_id)
+            if history is None:
+                if time.time() > deadline:
+                    raise RuntimeError(f"ComfyUI did not finish within {GENERATION_TIMEOUT} seconds")
+                time.sleep(PROGRESS_INTERVAL)
+    finally:
+        if ws is not None:
+            ws.close()
+
+    status = history.get("status", {})
+    if status.get("status_str") == "error":
+        raise RuntimeError(f"ComfyUI reported an error: {status.get('messages')}")
+
+    results = []
+    for index, job in enumerate(batch):
+        images = []
+        for image in history.get("outputs", {}).get(f"{index}_save", {}).get("images", []):
+            query = urllib.parse.urlencode({key: image.get(key, "") for key in ("filename", "subfolder", "type")})
+            with urllib.request.urlopen(f"{url}/view?{query}", timeout=BACKEND_TIMEOUT) as response:
+                images.append(response.read())
+        if len(images) < job["params"]["n"]:
+            raise RuntimeError(f"ComfyUI returned {len(images)} images for job {job['id']}")
+        results.append(images)
+    return results
+
+def wait_comfyui_websocket(ws, prompt_id, batch, progress, deadline):
+    """Follow ComfyUI's progress messages until the prompt has executed"""
+    jobs_by_node = {f"{index}_sampler": job for index, job in enumerate(batch)}
+    while time.time() < deadline:
+        try:
+            message = ws.recv()
+        except Exception as e:
+            if type(e).__name__ == "WebSocketTimeoutException":
+                continue
+            raise
+        # Binary frames carry preview images
+        if not isinstance(message, str):
+            continue
+        event = json.loads(message)
+        data = event.get("data", {})
+        if data.get("prompt_id") not in (None, prompt_id):
+            continue
+        if event.get("type") == "progress" and data.get("node") in jobs_by_node and data.get("max"):
+            progress(jobs_by_node[data["node"]], data["value"] / data["max"])
+        elif event.get("type") == "execution_error":
+            raise RuntimeError(f"ComfyUI reported an error: {data.get('exception_message')}")
+        elif event.get("type") == "executing" and data.get("node") is None and data.get("prompt_id") == prompt_id:
+            return
+
+RUNNERS = {"a1111": run_a1111, "comfyui": run_comfyui}
+
+class ImageJobQueue:
+    """txt2img jobs, batched per backend and persisted across restarts
+
+    Queued and running jobs live in memory and in SQLite; finished jobs are
+    read back from SQLite. One worker per backend takes the oldest job
+    together with every compatible queued job and submits them at once.
+    """
+
+    def __init__(self, path=IMAGE_JOBS_DB_FILE):
+        os.makedirs(IMAGE_OUTPUT_DIR, exist_ok=True)
+        self.cond = threading.Condition(threading.RLock())
+        # Bumped on every change so subscribers know when to look again
+        self.version = 0
+        self.active = {}
+        self.pending = []
+        self.completed = collections.deque()
+        self.batches = 0
+
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                backend TEXT NOT NULL,
+                state TEXT NOT NULL,
+                params TEXT NOT NULL,
+                batch_id TEXT,
+                images TEXT NOT NULL DEFAULT '[]',
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+        # Jobs interrupted by a restart are generated again
+        self.conn.execute("UPDATE jobs SET state = 'queued', batch_id = NULL, started_at = NULL WHERE state = 'running'")
+        self.conn.commit()
+        for row in self.conn.execute("SELECT * FROM jobs WHERE state = 'queued' ORDER BY created_at"):
+            job = self._row_to_job(row)
+            self.active[job["id"]] = job
+            self.pending.append(job)
+
+        self.workers = []
+        for backend in BACKENDS:
+            worker = threading.Thread(target=self._run, args=(backend,), name=f"image-jobs-{backend}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def _row_to_job(self, row):
+        job_id, backend, state, params, batch_id, images, error, created_at, started_at, finished_at = row
+        return {
+            "id": job_id, "backend": backend, "state": state, "params": json.loads(params),
+            "batch_id": batch_id, "images": json.loads(images), "error": error,
+            "progress": 1.0 if state == "done" else None,
+            "created_at": created_at, "started_at": started_at, "finished_at": finished_at
+        }
+
+    def _save(self, job):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job["id"], job["backend"], job["state"], json.dumps(job["params"]), job["batch_id"],
+             json.dumps(job["images"]), job["error"], job["created_at"], job["started_at"], job["finished_at"])
+        )
+        self.conn.commit()
+
+    def _changed(self):
+        self.version += 1
+        self.cond.notify_all()
+
+    def submit(self, backend, params):
+        job = {
+            "id": uuid.uuid4().hex[:12], "backend": backend, "state": "queued", "params": params,
+            "batch_id": None, "images": [], "error": None, "progress": None,
+            "created_at": time.time(), "started_at": None, "finished_at": None
+        }
+        with self.cond:
+            self._save(job)
+            self.active[job["id"]] = job
+            self.pending.append(job)
+            self._changed()
+        return dict(job)
+
+    def get(self, job_id):
+        with self.cond:
+            job = self.active.get(job_id)
+            if job is not None:
+                return dict(job, position=self._position(job))
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def _position(self, job):
+        if job["state"] != "queued":
+            return None
+        return sum(1 for other in self.pending if other["backend"] == job["backend"] and other["created_at"] < job["created_at"])
+
+    def list(self, state=None, limit=50):
+        with self.cond:
+            if state:
+                rows = self.conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?", (state, limit)
+                ).fetchall()
+            else:
+                rows = self.conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            # In-memory copies carry the current progress
+            return [dict(self.active[row[0]]) if row[0] in self.active else self._row_to_job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """Cancel a queued job; returns the job, or None if it is not queued"""
+        with self.cond:
+            job = self.active.get(job_id)
+            if job is None or job["state"] != "queued":
+                return None
+            self.pending.remove(job)
+            del self.active[job_id]
+            job.update(state="cancelled", finished_at=time.time())
+            self._save(job)
+            self._changed()
+            return dict(job)
+
+    def wait_for_change(self, version, timeout):
+        """Block until the queue changes after version; returns the new version"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def next_batch(self, backend):
+        """Wait for queued jobs and take the oldest one with its compatible jobs"""
+        with self.cond:
+            while True:
+                queued = [job for job in self.pending if job["backend"] == backend]
+                if queued:
+                    waited = time.time() - queued[0]["created_at"]
+                    if len(queued) == 1 and waited < BATCH_WINDOW:
+                        self.cond.wait(BATCH_WINDOW - waited)
+                        continue
+                    key = group_key(queued[0])
+                    batch, images = [], 0
+                    for job in queued:
+                        if group_key(job) == key and images + job["params"]["n"] <= MAX_BATCH_IMAGES:
+                            batch.append(job)
+                            images += job["params"]["n"]
+                    batch_id = uuid.uuid4().hex[:12]
+                    for job in batch:
+                        self.pending.remove(job)
+                        job.update(state="running", batch_id=batch_id, started_at=time.time(), progress=0.0)
+                        self._save(job)
+                    self._changed()
+                    return batch
+                self.cond.wait()
+
+    def progress(self, job, fraction):
+        with self.cond:
+            if job["state"] == "running":
+                job["progress"] = round(min(max(fraction, 0.0), 1.0), 3)
+                self._changed()
+
+    def _finish(self, batch, results=None, error=None):
+        now = time.time()
+        with self.cond:
+            for index, job in enumerate(batch):
+                if error is None:
+                    names = []
+                    for number, data in enumerate(results[index]):
+                        name = f"{job['id']}_{number}.png"
+                        with open(IMAGE_OUTPUT_DIR / name, "wb") as f:
+                            f.write(data)
+                        names.append(name)
+                    job.update(state="done", images=names, progress=1.0)
+                    self.completed.append((now, len(names)))
+                    get_governor().record_work("images", len(names))
+                else:
+                    job.update(state="failed", error=error)
+                job["finished_at"] = now
+                self._save(job)
+                self.active.pop(job["id"], None)
+            self.batches += 1
+            self._changed()
+
+    def _run(self, backend):
+        while True:
+            batch = self.next_batch(backend)
+            try:
+                arbiter = get_arbiter()
+                vram_mb = estimate_vram_mb(batch)
+                if arbiter.budget_mb is not None:
+                    vram_mb = min(vram_mb, arbiter.budget_mb)
+                with arbiter.leased("image", backend, vram_mb, priority="batch", ttl=GENERATION_TIMEOUT):
+                    results = RUNNERS[backend](batch, self.progress)
+                self._finish(batch, results=results)
+            except Exception as e:
+                error = str(getattr(e, 'reason', e)) or type(e).__name__
+                print(f"Image batch on {backend} failed: {error}")
+                self._finish(batch, error=error)
+
+    def stats(self):
+        now = time.time()
+        with self.cond:
+            while self.completed and now - self.completed[0][0] > THROUGHPUT_WINDOW:
+                self.completed.popleft()
+            backends = {}
+            for backend in BACKENDS:
+                jobs = [job for job in self.active.values() if job["backend"] == backend]
+                backends[backend] = {
+                    "url": backend_url(backend),
+                    "queued": sum(1 for job in jobs if job["state"] == "queued"),
+                    "running": sum(1 for job in jobs if job["state"] == "running")
+                }
+            return {
+                "backends": backends,
+                "batches": self.batches,
+                "images_per_minute": round(sum(count for _, count in self.completed) * 60 / THROUGHPUT_WINDOW, 2),
+                "progress_events": WEBSOCKET_AVAILABLE
+            }
+
+_image_queue = None
+_image_queue_lock = threading.Lock()
+
+def get_image_queue():
+    """Return the shared ImageJobQueue, creating it on first use"""
+    global _image_queue
+    with _image_queue_lock:
+        if _image_queue is None:
+            os.makedirs(IMAGE_JOBS_DIR, exist_ok=True)
+            _image_queue = ImageJobQueue()
+        return _image_queue
+
+@image_jobs.route('/api/images/jobs', methods=['POST'])
+def submit_job():
+    """Queue a txt2img job
+
+    Body: {"backend": "a1111" | "comfyui", "prompt": "...", "checkpoint": "...",
+    "width": 512, "height": 512, "sampler": "...", "steps": 20, "n": 1, ...}.
+    Responds 202 with the job; follow it with GET /api/images/jobs/<id> or
+    the event stream at /api/images/jobs/<id>/events.
+    """
+    body = request.get_json(silent=True) or {}
+    backend = body.get('backend', 'a1111')
+    try:
+        params = validate_params(backend, body)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(get_image_queue().submit(backend, params)), 202
+
+@image_jobs.route('/api/images/jobs')
+def list_jobs():
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+    except ValueError:
+        return jsonify({'error': "'limit' must be an integer"}), 400
+    return jsonify({'jobs': get_image_queue().list(state=request.args.get('state'), limit=limit)})
+
+@image_jobs.route('/api/images/jobs/<job_id>')
+def get_job(job_id):
+    job = get_image_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@image_jobs.route('/api/images/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    queue = get_image_queue()
+    job = queue.cancel(job_id)
+    if job is None:
+        if queue.get(job_id) is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        return jsonify({'error': 'Only queued jobs can be cancelled'}), 409
+    return jsonify(job)
+
+@image_jobs.route('/api/images/jobs/<job_id>/images/<int:number>')
+def get_job_image(job_id, number):
+    job = get_image_queue().get(job_id)
+    if job is None or not 0 <= number < len(job['images']):
+        return jsonify({'error': 'Unknown image'}), 404
+    return send_file(IMAGE_OUTPUT_DIR / job['images'][number], mimetype='image/png', max_age=31536000)
+
+@image_jobs.route('/api/images/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events with the job's state whenever it changes, until it finishes"""
+    queue = get_image_queue()
+    if queue.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def stream():
+        version = queue.version
+        last = None
+        while True:
+            job = queue.get(job_id)
+            snapshot = json.dumps(job)
+            if snapshot != last:
+                yield f"data: {snapshot}\n\n"
+                last = snapshot
+            if job["state"] in FINAL_STATES:
+                return
+            changed = queue.wait_for_change(version, 15)
+            if changed == version:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+            version = changed
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@image_jobs.route('/api/images/queue')
+def queue_status():
+    return jsonify(get_image_queue().stats())
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import threading
+import urllib.request
+import urllib.error
+from contextlib import ExitStack, contextmanager
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from document_ingest import retrieve
+from gpu_arbiter import get_arbiter, LeaseTimeout
+from power_governor import get_governor
+from tracing import span, start_span, inject_headers, record_ollama_timings
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+UPSTREAM_TIMEOUT = 300
+
+# Retrieval settings for prompts that ask for document context
+RAG_TOP_K = 4
+RAG_MIN_SCORE = 0.25
+RAG_MAX_CONTEXT_CHARS = 6000
+
+llm_gateway = Blueprint('llm_gateway', __name__)
+
+# Requests in flight to Ollama, capped by the power mode's num_parallel
+_slots = threading.Condition()
+_active_requests = 0
+
+class GatewayBusy(Exception):
+    """Raised when no request slot frees up in time"""
+
+@contextmanager
+def ollama_slot():
+    """Hold one of the concurrent Ollama requests the power mode allows"""
+    global _active_requests
+    with _slots:
+        if not _slots.wait_for(lambda: _active_requests < get_governor().ollama_settings()['num_parallel'],
+                               timeout=UPSTREAM_TIMEOUT):
+            raise GatewayBusy(f"No request slot within {UPSTREAM_TIMEOUT} seconds")
+        _active_requests += 1
+    try:
+        yield
+    finally:
+        with _slots:
+            _active_requests -= 1
+            _slots.notify_all()
+
+def _power_mode_changed(mode):
+    # A higher limit lets waiting requests through
+    with _slots:
+        _slots.notify_all()
+
+get_governor().add_listener(_power_mode_changed)
+
+def apply_power_options(body):
+    """Use the power mode's num_batch unless the request sets its own"""
+    options = body.get('options') or {}
+    options.setdefault('num_batch', get_governor().ollama_settings()['num_batch'])
+    body['options'] = options
+
+def record_completion(chunk):
+    """Count the tokens of a finished generation toward performance per watt"""
+    if chunk.get('done') and chunk.get('eval_count'):
+        get_governor().record_work('tokens', chunk['eval_count'])
+
+def last_user_message(messages):
+    """Return the content of the most recent user message"""
+    for message in reversed(messages):
+        if message.get('role') == 'user' and message.get('content'):
+            return message['content']
+    return None
+
+def assemble_prompt(messages, rag=False):
+    """Build the message list sent upstream, adding retrieved context when rag is set
+
+    Returns (messages, sources) where sources lists the documents used.
+    """
+    if not rag:
+        return messages, []
+
+    query = last_user_message(messages)
+    if not query:
+        return messages, []
+
+    context = []
+    sources = []
+    used = 0
+    for hit in retrieve(query, k=RAG_TOP_K):
+        if hit['score'] < RAG_MIN_SCORE or used + len(hit['text']) > RAG_MAX_CONTEXT_CHARS:
+            continue
+        context.append(f"[{len(context) + 1}] {os.path.basename(hit['path'])}:\n{hit['text']}")
+        sources.append({'path': hit['path'], 'chunk_index': hit['chunk_index'], 'score': hit['score']})
+        used += len(hit['text'])
+
+    if not context:
+        return messages, []
+
+    system = {
+        'role': 'system',
+        'content': "Answer using the following excerpts from the user's documents when they are relevant, "
+                   "and cite them by number.\n\n" + "\n\n".join(context)
+    }
+    return [system] + list(messages), sources
+
+def upstream_request(body, trace_span=None):
+    """Build the request that forwards a chat body to Ollama, carrying the trace context"""
+    return urllib.request.Request(
+        f"{OLLAMA_BASE_URL}/api/chat",
+        data=json.dumps(body).encode('utf-8'),
+        headers=inject_headers({'Content-Type': 'application/json'}, trace_span),
+        method='POST'
+    )
+
+def stream_chat(messages, model, rag=False, options=None):
+    """Yield the assistant's reply piece by piece as Ollama generates it
+
+    For in-process consumers such as the voice pipeline; errors are raised
+    rather than returned as responses.
+    """
+    messages, _ = assemble_prompt(messages, rag=rag)
+    body = {'model': model, 'messages': messages, 'stream': True, 'options': dict(options or {})}
+    apply_power_options(body)
+    with ollama_slot(), get_arbiter().ollama_session(model):
+        upstream_span = start_span('ollama.chat', model=model)
+        sent = time.time()
+        try:
+            with urllib.request.urlopen(upstream_request(body, upstream_span), timeout=UPSTREAM_TIMEOUT) as upstream:
+                for line in upstream:
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise RuntimeError(chunk['error'])
+                    if 'ttft_ms' not in upstream_span.attributes:
+                        upstream_span.set(ttft_ms=round((time.time() - sent) * 1000, 3))
+                    content = chunk.get('message', {}).get('content')
+                    if content:
+                        yield content
+                    if chunk.get('done'):
+                        record_completion(chunk)
+                        record_ollama_timings(upstream_span, chunk, sent)
+                        return
+        except Exception:
+            upstream_span.end(status='error')
+            raise
+        finally:
+            upstream_span.end()
+
+@llm_gateway.route('/api/chat', methods=['POST'])
+def chat():
+    """Forward a chat request to Ollama, optionally grounded in indexed documents
+
+    The body is Ollama's /api/chat request plus an optional "rag": true.
+    Ollama's response (streamed NDJSON by default) is passed through as is;
+    the documents used are listed in the X-FusionLoom-Sources header.
+    """
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body.get('messages'), list):
+        return jsonify({'error': "'messages' is required"}), 400
+
+    rag = bool(body.pop('rag', False))
+    with span('gateway.assemble_prompt', rag=rag) as prompt_span:
+        messages, sources = assemble_prompt(body['messages'], rag=rag)
+        prompt_span.set(sources=len(sources))
+    body['messages'] = messages
+    apply_power_options(body)
+
+    # Requests wait for a slot under the power mode's parallelism, and
+    # loading a model waits for VRAM held by image jobs; both are held
+    # until the response has been streamed
+    session = ExitStack()
+    try:
+        with span('gateway.slot_wait'):
+            session.enter_context(ollama_slot())
+        with span('gpu.lease_wait', model=body.get('model')):
+            session.enter_context(get_arbiter().ollama_session(body.get('model')))
+    except (GatewayBusy, LeaseTimeout) as e:
+        session.close()
+        return jsonify({'error': f"The GPU is busy: {e}"}), 503
+
+    upstream_span = start_span('ollama.chat', model=body.get('model'), stream=body.get('stream', True))
+    sent = time.time()
+    try:
+        upstream = urllib.request.urlopen(upstream_request(body, upstream_span), timeout=UPSTREAM_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        session.close()
+        upstream_span.set(**{'http.status': e.code})
+        upstream_span.end(status='error')
+        return Response(e.read(), status=e.code, mimetype='application/json')
+    except urllib.error.URLError as e:
+        session.close()
+        upstream_span.set(error=str(e.reason))
+        upstream_span.end(status='error')
+        return jsonify({'error': f"Ollama is not reachable at {OLLAMA_BASE_URL}: {e.reason}"}), 502
+
+    def relay():
+        try:
+            with upstream:
+                # Ollama streams one JSON object per line; the last has the stats
+                for line in upstream:
+                    if 'ttft_ms' not in upstream_span.attributes:
+                        upstream_span.set(ttft_ms=round((time.time() - sent) * 1000, 3))
+                    if b'"done":true' in line:
+                        try:
+                            chunk = json.loads(line)
+                            record_completion(chunk)
+                            record_ollama_timings(upstream_span, chunk, sent)
+                        except ValueError:
+                            pass
+                    yield line
+        finally:
+            upstream_span.end()
+
+    response = Response(stream_with_context(relay()), mimetype=upstream.headers.get('Content-Type', 'application/x-ndjson'))
+    response.headers['X-FusionLoom-Sources'] = json.dumps(sources)
+    response.call_on_close(session.close)
+    return response
@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+"""Load-test a FusionLoom node with simulated dashboards and chat users
+
+Each simulated dashboard behaves like a browser tab running main.js. It
+loads /api/system-info once, polls the gauges every 2 seconds and polls the
+container status every 5 seconds. Chat users stream completions through
+the gateway and pause to think between turns. Pull users pull a model from
+Ollama now and then. The load grows one step at a time until p99 latency
+or the error rate passes its limit. The report lists the percentiles for
+every step and for each 5-second window.
+
+With --mock the test starts a stand-in Ollama and container API. It also
+starts its own FusionLoom server pointed at the stand-in, so the node's
+own overhead can be measured without a GPU.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+import urllib.parse
+from pathlib import Path
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+DATA_DIR = Path(os.environ.get("DATA_DIR", REPO_ROOT / "data"))
+REPORT_DIR = DATA_DIR / "load_tests"
+
+# Poll intervals used by ui/static/js/main.js
+GAUGE_INTERVAL = 2.0
+CONTAINER_INTERVAL = 5.0
+
+DEFAULT_TARGET = "http://localhost:5050"
+DEFAULT_OLLAMA = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# The UI fetches /api/host/containers relative to the page, so it is served
+# by the web UI's origin rather than the backend
+DEFAULT_CONTAINERS_URL = "http://localhost:8080/api/host/containers"
+DEFAULT_MODEL = "llama3.2"
+
+REQUEST_TIMEOUT = 30.0
+STREAM_TIMEOUT = 300.0
+SERVER_START_TIMEOUT = 60.0
+
+# Timeline windows and how many slow requests each step keeps for lookup
+BUCKET_SECONDS = 5
+SLOWEST_PER_STEP = 5
+
+POLL_KINDS = ("system-info", "metrics", "containers")
+
+CHAT_PROMPTS = [
+    "Summarize the difference between TCP and UDP in two sentences.",
+    "Write a haiku about a GPU fan spinning up.",
+    "What does a container runtime do?",
+    "Give me three ideas for a weekend electronics project.",
+    "Explain what a vector index is to a new developer.",
+    "How do I check which process is using a port on Linux?"
+]
+MAX_HISTORY_TURNS = 6
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list, or None if it is empty"""
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return round(values[rank], 3)
+
+class HttpClient:
+    """Keep-alive HTTP connection for one simulated user, like a browser tab
+
+    A request that fails on a kept-alive socket before any response arrives
+    is retried once on a fresh connection.
+    """
+
+    def __init__(self, base_url, timeout=REQUEST_TIMEOUT):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.https = parsed.scheme == 'https'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def call(self, method, path, body=None, on_line=None):
+        """Send a request and read the whole response
+
+        on_line is called with each line of a streamed body. Returns
+        (status, headers, body bytes or None when streamed).
+        """
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Accept': 'application/json'}
+        if data is not None:
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request(method, self.prefix + path, body=data, headers=headers)
+                response = self.conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+                continue
+            try:
+                if on_line is None or response.status != 200:
+                    return response.status, response.headers, response.read()
+                for line in response:
+                    if line.strip():
+                        on_line(line)
+                return response.status, response.headers, None
+            except Exception:
+                # A half-read response leaves the connection unusable
+                self.close()
+                raise
+            finally:
+                if response.will_close:
+                    self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class Recorder:
+    """Thread-safe log of every request the simulated users make"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.samples = []
+        self.step = 0
+
+    def record(self, kind, started, latency_ms, ok, ttft_ms=None, error=None, trace_id=None):
+        with self.lock:
+            self.samples.append({
+                "t": started - self.started,
+                "step": self.step,
+                "kind": kind,
+                "latency_ms": round(latency_ms, 3),
+                "ttft_ms": round(ttft_ms, 3) if ttft_ms is not None else None,
+                "ok": ok,
+                "error": error,
+                "trace_id": trace_id
+            })
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.samples)
+
+def summarize(samples):
+    """Latency percentiles and error rates for each kind of request"""
+    kinds = {}
+    for kind in sorted({sample["kind"] for sample in samples}):
+        matching = [sample for sample in samples if sample["kind"] == kind]
+        latencies = sorted(sample["latency_ms"] for sample in matching if sample["ok"])
+        ttfts = sorted(sample["ttft_ms"] for sample in matching if sample["ok"] and sample["ttft_ms"] is not None)
+        errors = sum(1 for sample in matching if not sample["ok"])
+        kinds[kind] = {
+            "count": len(matching),
+            "errors": errors,
+            "error_rate": round(errors / len(matching), 4),
+            "p50_ms": percentile(latencies, 50),
+            "p90_ms": percentile(latencies, 90),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": round(latencies[-1], 3) if latencies else None
+        }
+        if ttfts:
+            kinds[kind]["ttft_p50_ms"] = percentile(ttfts, 50)
+            kinds[kind]["ttft_p99_ms"] = percentile(ttfts, 99)
+    return kinds
+
+class LoadTest:
+    """Ramp simulated users against a node until it saturates
+
+    Step n runs n times the per-step number of dashboards, chat users and
+    pull users. A step is saturated when the p99 of any poll exceeds
+    poll_p99_ms, or the chat p99 time to first token exceeds ttft_p99_ms,
+    or the overall error rate exceeds max_error_rate.
+    """
+
+    def __init__(self, target, ollama_url, containers_url, model, dashboards=10, chats=2, pulls=0,
+                 step_seconds=30, max_steps=10, poll_p99_ms=1000, ttft_p99_ms=5000,
+                 max_error_rate=0.01, think_time=(5, 15), pull_interval=120, stop_on_saturation=True):
+        self.target = target.rstrip('/')
+        self.ollama_url = ollama_url.rstrip('/')
+        self.containers_url = containers_url
+        self.model = model
+        self.per_step = {"dashboards": dashboards, "chats": chats, "pulls": pulls}
+        self.step_seconds = step_seconds
+        self.max_steps = max_steps
+        self.poll_p99_ms = poll_p99_ms
+        self.ttft_p99_ms = ttft_p99_ms
+        self.max_error_rate = max_error_rate
+        self.think_time = think_time
+        self.pull_interval = pull_interval
+        self.stop_on_saturation = stop_on_saturation
+        self.recorder = Recorder()
+        self.stop = threading.Event()
+        self.users = {"dashboards": 0, "chats": 0, "pulls": 0}
+        self.threads = []
+
+    def timed(self, client, kind, method, path, body=None, stream=False):
+        """Make one request and record its latency, plus time to first line when streamed"""
+        started = time.time()
+        first_line = []
+
+        def on_line(line):
+            if not first_line:
+                first_line.append(time.time())
+            if b'"error"' in line:
+                error = json.loads(line).get('error')
+                if error:
+                    raise RuntimeError(str(error))
+
+        try:
+            status, headers, _ = client.call(method, path, body, on_line=on_line if stream else None)
+            ok = status == 200
+            error = None if ok else f"HTTP {status}"
+            trace_id = headers.get('X-Trace-Id')
+        except (http.client.HTTPException, OSError, RuntimeError, ValueError) as e:
+            ok, error, trace_id = False, f"{type(e).__name__}: {e}", None
+        latency_ms = (time.time() - started) * 1000
+        ttft_ms = (first_line[0] - started) * 1000 if first_line else None
+        self.recorder.record(kind, started, latency_ms, ok, ttft_ms=ttft_ms, error=error, trace_id=trace_id)
+        return ok
+
+    def dashboard_user(self):
+        """Poll like an open dashboard tab: system info once, then gauges and containers"""
+        api = HttpClient(self.target)
+        containers = urllib.parse.urlsplit(self.containers_url)
+        ui = HttpClient(f"{containers.scheme}://{containers.netloc}")
+        self.timed(api, "system-info", 'GET', '/api/system-info')
+        # Tabs are not opened in lockstep, so spread their first polls
+        now = time.monotonic()
+        next_gauges = now + random.uniform(0, GAUGE_INTERVAL)
+        next_containers = now + random.uniform(0, CONTAINER_INTERVAL)
+        while not self.stop.is_set():
+            now = time.monotonic()
+            if now >= next_gauges:
+                self.timed(api, "metrics", 'GET', '/api/metrics')
+                # setInterval keeps its schedule however long a fetch takes
+                next_gauges += GAUGE_INTERVAL
+            if now >= next_containers:
+                self.timed(ui, "containers", 'GET', containers.path or '/')
+                next_containers += CONTAINER_INTERVAL
+            self.stop.wait(max(0, min(next_gauges, next_containers) - time.monotonic()))
+        api.close()
+        ui.close()
+
+    def chat_user(self):
+        """Stream chats through the gateway with think time between turns"""
+        api = HttpClient(self.target, timeout=STREAM_TIMEOUT)
+        messages = []
+        # Spread the first messages over the think time like arriving users
+        self.stop.wait(random.uniform(0, self.think_time[0]))
+        while not self.stop.is_set():
+            if len(messages) >= MAX_HISTORY_TURNS * 2:
+                messages = []
+            messages.append({'role': 'user', 'content': random.choice(CHAT_PROMPTS)})
+            body = {'model': self.model, 'messages': messages, 'stream': True}
+            if self.timed(api, "chat", 'POST', '/api/chat', body, stream=True):
+                messages.append({'role': 'assistant', 'content': "(reply)"})
+            else:
+                messages.pop()
+            self.stop.wait(random.uniform(*self.think_time))
+        api.close()
+
+    def pull_user(self):
+        """Pull the model from Ollama at random intervals averaging pull_interval"""
+        ollama = HttpClient(self.ollama_url, timeout=STREAM_TIMEOUT)
+        while not self.stop.wait(random.expovariate(1 / self.pull_interval)):
+            self.timed(ollama, "pull", 'POST', '/api/pull', {'name': self.model, 'stream': True}, stream=True)
+        ollama.close()
+
+    def add_users(self, kind, count):
+        target = {"dashboards": self.dashboard_user, "chats": self.chat_user, "pulls": self.pull_user}[kind]
+        for _ in range(count):
+            index = self.users[kind]
+            thread = threading.Thread(target=target, name=f"load-{kind}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+            self.users[kind] += 1
+
+    def evaluate(self, samples):
+        """Return the reasons a step counts as saturated, or an empty list"""
+        kinds = summarize(samples)
+        reasons = []
+        for kind in POLL_KINDS:
+            p99 = kinds.get(kind, {}).get("p99_ms")
+            if p99 is not None and p99 > self.poll_p99_ms:
+                reasons.append(f"{kind} p99 {p99:.0f} ms > {self.poll_p99_ms} ms")
+        ttft = kinds.get("chat", {}).get("ttft_p99_ms")
+        if ttft is not None and ttft > self.ttft_p99_ms:
+            reasons.append(f"chat time to first token p99 {ttft:.0f} ms > {self.ttft_p99_ms} ms")
+        errors = sum(summary["errors"] for summary in kinds.values())
+        if samples and errors / len(samples) > self.max_error_rate:
+            reasons.append(f"error rate {errors / len(samples):.1%} > {self.max_error_rate:.1%}")
+        return kinds, reasons
+
+    def run(self, progress=print):
+        """Ramp the load step by step and return the report"""
+        steps = []
+        saturation = None
+        try:
+            for step in range(1, self.max_steps + 1):
+                self.recorder.step = step
+                for kind, count in self.per_step.items():
+                    self.add_users(kind, count)
+                step_started = time.time()
+                self.stop.wait(self.step_seconds)
+                duration = time.time() - step_started
+                samples = [sample for sample in self.recorder.snapshot() if sample["step"] == step]
+                kinds, reasons = self.evaluate(samples)
+                errors = sum(summary["errors"] for summary in kinds.values())
+                slowest = sorted(samples, key=lambda sample: sample["latency_ms"], reverse=True)[:SLOWEST_PER_STEP]
+                result = dict(self.users, step=step, duration_s=round(duration, 1), requests=len(samples),
+                              requests_per_second=round(len(samples) / duration, 2),
+                              error_rate=round(errors / len(samples), 4) if samples else 0.0,
+                              kinds=kinds, saturated=bool(reasons), reasons=reasons,
+                              slowest=[{key: sample[key] for key in ("kind", "latency_ms", "error", "trace_id")}
+                                       for sample in slowest])
+                steps.append(result)
+                progress(format_step(result))
+                if reasons and saturation is None:
+                    saturation = {"step": step, "reasons": reasons, **self.users}
+                    if self.stop_on_saturation:
+                        break
+        finally:
+            self.stop.set()
+            for thread in self.threads:
+                # Streams finish on their own; do not wait for a slow one
+                thread.join(timeout=1)
+
+        samples = self.recorder.snapshot()
+        sustained = next((step for step in reversed(steps) if not step["saturated"]), None)
+        return {
+            "started": datetime.fromtimestamp(self.recorder.started).isoformat(timespec='seconds'),
+            "target": self.target,
+            "config": {
+                "ollama_url": self.ollama_url,
+                "containers_url": self.containers_url,
+                "model": self.model,
+                "per_step": self.per_step,
+                "step_seconds": self.step_seconds,
+                "poll_p99_ms": self.poll_p99_ms,
+                "ttft_p99_ms": self.ttft_p99_ms,
+                "max_error_rate": self.max_error_rate,
+                "think_time": list(self.think_time),
+                "pull_interval": self.pull_interval
+            },
+            "saturation": saturation,
+            "max_sustained": {key: sustained[key] for key in self.per_step} if sustained else None,
+            "steps": steps,
+            "timeline": build_timeline(samples),
+            "errors": count_errors(samples)
+        }
+
+def build_timeline(samples):
+    """Percentiles and error rates for each BUCKET_SECONDS window"""
+    buckets = {}
+    for sample in samples:
+        buckets.setdefault(int(sample["t"] // BUCKET_SECONDS), []).append(sample)
+    timeline = []
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        timeline.append({
+            "t": index * BUCKET_SECONDS,
+            "step": max(sample["step"] for sample in bucket),
+            "kinds": {kind: {key: summary[key] for key in ("count", "error_rate", "p50_ms", "p99_ms")}
+                      for kind, summary in summarize(bucket).items()}
+        })
+    return timeline
+
+def count_errors(samples, limit=10):
+    """The most frequent error messages with their counts"""
+    counts = {}
+    for sample in samples:
+        if not sample["ok"]:
+            key = f"{sample['kind']}: {sample['error']}"
+            counts[key] = counts.get(key, 0) + 1
+    return [{"error": error, "count": count}
+            for error, count in sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]]
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.0f}"
+
+def format_step(step):
+    """One console line per step"""
+    parts = [f"step {step['step']}: {step['dashboards']} dashboards, {step['chats']} chats, {step['pulls']} pulls",
+             f"{step['requests_per_second']} req/s", f"errors {step['error_rate']:.1%}"]
+    for kind, summary in step["kinds"].items():
+        text = f"{kind} p50/p99 {format_ms(summary['p50_ms'])}/{format_ms(summary['p99_ms'])} ms"
+        if "ttft_p99_ms" in summary:
+            text += f" (first chunk p99 {format_ms(summary['ttft_p99_ms'])} ms)"
+        parts.append(text)
+    line = " | ".join(parts)
+    if step["reasons"]:
+        line += "\n  saturated: " + "; ".join(step["reasons"])
+    return line
+
+class MockBackend:
+    """Stand-in for Ollama and the UI's container API
+
+    Chats stream tokens_per_second tokens after a short prompt delay. At most
+    `parallel` chats are generated at once and the rest queue, like Ollama
+    on one GPU. Pulls stream progress for pull_seconds.
+    """
+
+    CONTAINERS = ["fusionloom-webui", "ollama", "open-webui", "automatic1111"]
+
+    def __init__(self, port=0, tokens_per_second=30.0, reply_tokens=60, parallel=2,
+                 prompt_ms=150, pull_seconds=3.0, model=DEFAULT_MODEL):
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.prompt_ms = prompt_ms
+        self.pull_seconds = pull_seconds
+        self.model = model
+        self.generation = threading.Semaphore(parallel)
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The server under test hung up mid-stream, e.g. while shutting down
+                    pass
+
+            def send_json(self, data, status=200):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return {}
+
+            def stream(self, lines):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for line in lines:
+                    data = json.dumps(line).encode('utf-8') + b'\n'
+                    self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+
+            def do_GET(self):
+                path = urllib.parse.urlsplit(self.path).path
+                if path == '/api/tags':
+                    self.send_json({'models': [{'name': backend.model, 'size': 2 * 1024 ** 3}]})
+                elif path == '/api/ps':
+                    self.send_json({'models': []})
+                elif path == '/api/host/containers':
+                    self.send_json({'containers': [{'name': name, 'status': 'running'}
+                                                   for name in backend.CONTAINERS]})
+                else:
+                    self.send_json({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                path = urllib.parse.urlsplit(self.path).path
+                body = self.read_json()
+                if path == '/api/chat':
+                    lines = backend.chat(body.get('model') or backend.model)
+                    if body.get('stream', True):
+                        self.stream(lines)
+                    else:
+                        lines = list(lines)
+                        content = ''.join(line.get('message', {}).get('content', '') for line in lines)
+                        self.send_json(dict(lines[-1], message={'role': 'assistant', 'content': content}))
+                elif path == '/api/pull':
+                    self.stream(backend.pull())
+                elif path == '/api/generate':
+                    # Only used to unload models with keep_alive 0
+                    self.send_json({'model': body.get('model'), 'response': '', 'done': True})
+                else:
+                    self.send_json({'error': 'not found'}, 404)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def chat(self, model):
+        """Yield Ollama chat chunks, waiting for a free generation slot first"""
+        started = time.time()
+        with self.generation:
+            loaded = time.time()
+            time.sleep(self.prompt_ms / 1000)
+            prompt_done = time.time()
+            for index in range(self.reply_tokens):
+                yield {'model': model, 'message': {'role': 'assistant', 'content': f"token{index} "}, 'done': False}
+                time.sleep(1 / self.tokens_per_second)
+            finished = time.time()
+        yield {
+            'model': model, 'message': {'role': 'assistant', 'content': ''}, 'done': True,
+            'total_duration': int((finished - started) * 1e9),
+            'load_duration': int((loaded - started) * 1e9),
+            'prompt_eval_count': 24,
+            'prompt_eval_duration': int((prompt_done - loaded) * 1e9),
+            'eval_count': self.reply_tokens,
+            'eval_duration': int((finished - prompt_done) * 1e9)
+        }
+
+    def pull(self):
+        total = 2 * 1024 ** 3
+        yield {'status': 'pulling manifest'}
+        ticks = max(1, int(self.pull_seconds * 4))
+        for tick in range(1, ticks + 1):
+            time.sleep(self.pull_seconds / ticks)
+            yield {'status': 'pulling layer', 'digest': 'sha256:mock', 'total': total, 'completed': total * tick // ticks}
+        yield {'status': 'success'}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="load-test-mock", daemon=True).start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(ollama_url, log_path):
+    """Start a FusionLoom server pointed at ollama_url and wait until it answers
+
+    Power settings are not applied to the host while it runs.
+    """
+    port = free_port()
+    env = dict(os.environ, OLLAMA_BASE_URL=ollama_url, FUSIONLOOM_POWER_DRY_RUN="1")
+    log = open(log_path, 'w')
+    process = subprocess.Popen([sys.executable, str(SCRIPT_DIR / "system_info.py"), "--serve", str(port)],
+                               cwd=str(SCRIPT_DIR), env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    client = HttpClient(url, timeout=2)
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}; see {log_path}")
+        try:
+            if client.call('GET', '/api/metrics')[0] == 200:
+                client.close()
+                return process, url
+        except (http.client.HTTPException, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"The server did not start within {SERVER_START_TIMEOUT:.0f} s; see {log_path}")
+
+def parse_range(value):
+    """Parse "5,15" into (5.0, 15.0)"""
+    low, _, high = value.partition(',')
+    low = float(low)
+    return low, float(high) if high else low
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test a FusionLoom node with simulated users")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Ramp simulated users until the node saturates")
+    run_parser.add_argument("--mock", action="store_true",
+                            help="Start a stand-in Ollama and a FusionLoom server that uses it")
+    run_parser.add_argument("--target", default=DEFAULT_TARGET, help="FusionLoom backend URL")
+    run_parser.add_argument("--ollama", default=DEFAULT_OLLAMA, help="Ollama URL for model pulls")
+    run_parser.add_argument("--containers-url", default=DEFAULT_CONTAINERS_URL,
+                            help="URL the dashboards poll for container status")
+    run_parser.add_argument("--model", default=DEFAULT_MODEL)
+    run_parser.add_argument("--dashboards", type=int, default=10, help="Dashboards added per step")
+    run_parser.add_argument("--chats", type=int, default=2, help="Chat users added per step")
+    run_parser.add_argument("--pulls", type=int, default=0, help="Model-pull users added per step")
+    run_parser.add_argument("--step-seconds", type=float, default=30)
+    run_parser.add_argument("--max-steps", type=int, default=10)
+    run_parser.add_argument("--poll-p99-ms", type=float, default=1000)
+    run_parser.add_argument("--ttft-p99-ms", type=float, default=5000)
+    run_parser.add_argument("--max-error-rate", type=float, default=0.01)
+    run_parser.add_argument("--think-time", type=parse_range, default=(5, 15),
+                            help="Seconds between a chat user's messages, as min,max")
+    run_parser.add_argument("--pull-interval", type=float, default=120, help="Mean seconds between pulls")
+    run_parser.add_argument("--keep-going", action="store_true", help="Run every step even after saturation")
+    run_parser.add_argument("--mock-tokens-per-second", type=float, default=30)
+    run_parser.add_argument("--mock-parallel", type=int, default=2)
+    run_parser.add_argument("--output", help="Report path (default: data/load_tests/)")
+
+    mock_parser = commands.add_parser("mock-backends", help="Run the stand-in Ollama and container API")
+    mock_parser.add_argument("--port", type=int, default=11435)
+    mock_parser.add_argument("--tokens-per-second", type=float, default=30)
+    mock_parser.add_argument("--parallel", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.command == "mock-backends":
+        backend = MockBackend(port=args.port, tokens_per_second=args.tokens_per_second, parallel=args.parallel)
+        print(f"Mock Ollama and container API at {backend.url}. Start the backend with:")
+        print(f"  OLLAMA_BASE_URL={backend.url} python3 {SCRIPT_DIR / 'system_info.py'} --serve 5050")
+        try:
+            backend.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    backend = process = None
+    target, ollama_url, containers_url = args.target, args.ollama, args.containers_url
+    if args.mock:
+        backend = MockBackend(tokens_per_second=args.mock_tokens_per_second, parallel=args.mock_parallel,
+                              model=args.model).start()
+        log_path = REPORT_DIR / f"server-{stamp}.log"
+        print(f"Mock backends at {backend.url}; starting a FusionLoom server (log: {log_path})")
+        process, target = start_server(backend.url, log_path)
+        ollama_url, containers_url = backend.url, f"{backend.url}/api/host/containers"
+
+    test = LoadTest(target, ollama_url, containers_url, args.model, dashboards=args.dashboards,
+                    chats=args.chats, pulls=args.pulls, step_seconds=args.step_seconds,
+                    max_steps=args.max_steps, poll_p99_ms=args.poll_p99_ms, ttft_p99_ms=args.ttft_p99_ms,
+                    max_error_rate=args.max_error_rate, think_time=args.think_time,
+                    pull_interval=args.pull_interval, stop_on_saturation=not args.keep_going)
+    print(f"Load-testing {target}: {args.step_seconds:.0f} s steps, up to {args.max_steps} steps")
+    try:
+        report = test.run()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if backend is not None:
+            backend.close()
+    report["mock"] = args.mock
+
+    output = Path(args.output) if args.output else REPORT_DIR / f"load-test-{stamp}.json"
+    output.write_text(json.dumps(report, indent=2))
+    if report["saturation"]:
+        print(f"Saturated at step {report['saturation']['step']}: " + "; ".join(report["saturation"]["reasons"]))
+    else:
+        print("The node did not saturate; raise --max-steps or the users per step")
+    if report["max_sustained"]:
+        sustained = report["max_sustained"]
+        print(f"Highest load within limits: {sustained['dashboards']} dashboards, "
+              f"{sustained['chats']} chats, {sustained['pulls']} pulls")
+    print(f"Report written to {output}")
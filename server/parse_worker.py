@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Entry point for the processes that parse documents for ingestion
+
+document_ingest starts this script as a child process. The spawned pool
+workers then re-import this small module as their main module rather
+than the API server (or the ingest CLI) with all of its blueprints.
+
+Jobs arrive on stdin as JSON lines, one [path, known_hash] pair per line.
+Results are written to stdout as JSON lines as each file finishes.
+"""
+import sys
+import json
+import multiprocessing
+
+from document_parsing import parse_file
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "0" else None
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    jobs = [tuple(json.loads(line)) for line in sys.stdin if line.strip()]
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=workers) as pool:
+        for result in pool.imap_unordered(parse_file, jobs, chunksize=chunksize):
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
@@ -0,0 +1,755 @@
+#!/usr/bin/env python3
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import threading
+import subprocess
+import configparser
+from pathlib import Path
+from flask import Blueprint, request, jsonify
+
+from gpu_arbiter import get_arbiter
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+DATA_DIR = Path(os.environ.get("DATA_DIR", REPO_ROOT / "data"))
+CONFIG_FILE = REPO_ROOT / "cfg" / "config.ini"
+POWER_DATA_DIR = DATA_DIR / "power"
+HOST_DEFAULTS_FILE = "host_defaults.json"
+
+# Host files (sysfs, /etc/nv_tegra_release) are read relative to this root,
+# so the governor can run against a fake tree built by `fake-sysfs`
+HOST_ROOT = Path(os.environ.get("FUSIONLOOM_HOST_ROOT", "/"))
+# With dry run set, commands are only reported and the real /sys is not
+# written; a fake tree under HOST_ROOT is still updated
+DRY_RUN = os.environ.get("FUSIONLOOM_POWER_DRY_RUN", "").lower() in ("1", "true", "yes")
+
+POWER_MODES = ["balanced", "performance", "efficiency"]
+POLICIES = ["manual", "load", "schedule"]
+
+# What each mode applies. CPU governors are tried in order until one is
+# available; max_freq is a fraction of the range between the CPU's minimum
+# and maximum frequency; gpu_power_limit is a fraction of the board's
+# default limit; ollama settings cap concurrent requests in the gateway and
+# set num_batch on requests that do not choose their own. balanced changes
+# nothing on the host: it restores the settings recorded before another
+# mode was first applied.
+MODE_SETTINGS = {
+    "performance": {
+        "cpu_governors": ["performance"],
+        "cpu_max_freq": 1.0,
+        "nvpmodel": 0,
+        "jetson_clocks": True,
+        "gpu_power_limit": 1.0,
+        "ollama": {"num_parallel": 4, "num_batch": 512}
+    },
+    "balanced": {
+        "cpu_governors": None,
+        "cpu_max_freq": None,
+        "nvpmodel": None,
+        "jetson_clocks": False,
+        "gpu_power_limit": None,
+        "ollama": {"num_parallel": 2, "num_batch": 256}
+    },
+    "efficiency": {
+        "cpu_governors": ["powersave", "conservative"],
+        "cpu_max_freq": 0.6,
+        "nvpmodel": 1,
+        "jetson_clocks": False,
+        "gpu_power_limit": 0.6,
+        "ollama": {"num_parallel": 1, "num_batch": 128}
+    }
+}
+
+# Load policy: the box counts as busy above these levels or while Ollama is
+# generating, steps down to balanced after BALANCED_AFTER quiet seconds and
+# to efficiency after IDLE_AFTER
+BUSY_CPU_LOAD = 0.6
+BUSY_GPU_PERCENT = 50
+BALANCED_AFTER = 60
+IDLE_AFTER = 300
+
+POLL_INTERVAL = 10
+COMMAND_TIMEOUT = 30
+
+power_governor = Blueprint('power_governor', __name__)
+
+def host_path(path):
+    """Resolve an absolute host path under HOST_ROOT"""
+    return HOST_ROOT / str(path).lstrip("/")
+
+def read_value(path, default=None):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+def write_value(path, value):
+    """Write a sysfs attribute; returns None or the error message"""
+    if DRY_RUN and HOST_ROOT == Path("/"):
+        return None
+    try:
+        with open(path, "w") as f:
+            f.write(str(value))
+        return None
+    except OSError as e:
+        return str(e)
+
+def run_command(args):
+    """Run a host command; returns (ok, output)"""
+    if DRY_RUN:
+        return True, "dry run"
+    if shutil.which(args[0]) is None:
+        return False, f"{args[0]} not found"
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, timeout=COMMAND_TIMEOUT)
+        output = (result.stdout + result.stderr).strip()
+        return result.returncode == 0, output
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return False, str(e)
+
+def cpufreq_dirs():
+    return sorted(glob.glob(str(host_path("/sys/devices/system/cpu/cpu[0-9]*/cpufreq"))))
+
+def is_jetson():
+    return host_path("/etc/nv_tegra_release").exists()
+
+def has_nvidia_smi():
+    return DRY_RUN or shutil.which("nvidia-smi") is not None
+
+def parse_schedule(value):
+    """Parse "08:00-18:00 performance, 18:00-08:00 efficiency" into (start, end, mode) minutes"""
+    entries = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        span, mode = part.split()
+        if mode not in POWER_MODES:
+            raise ValueError(f"Unknown power mode '{mode}' in schedule")
+        start, end = ([int(number) for number in clock.split(":")] for clock in span.split("-"))
+        entries.append((start[0] * 60 + start[1], end[0] * 60 + end[1], mode))
+    return entries
+
+def scheduled_mode(entries, minute):
+    """Return the mode scheduled at minute of the day, or None"""
+    for start, end, mode in entries:
+        # Spans may wrap past midnight
+        if (start <= minute < end) if start <= end else (minute >= start or minute < end):
+            return mode
+    return None
+
+class PowerMeter:
+    """Estimates system power draw from whatever sensors the host has
+
+    Sources: Intel/AMD RAPL package energy counters, hwmon power sensors
+    (including Jetson INA3221 rails) and nvidia-smi power.draw.
+    """
+
+    def __init__(self):
+        self.last_energy = {}
+
+    def sources(self):
+        found = []
+        if self._rapl_domains():
+            found.append("rapl")
+        if self._hwmon_sensors():
+            found.append("hwmon")
+        if has_nvidia_smi() and not DRY_RUN:
+            found.append("nvidia-smi")
+        return found
+
+    def _rapl_domains(self):
+        domains = []
+        for domain in glob.glob(str(host_path("/sys/class/powercap/intel-rapl:[0-9]*"))):
+            # Only top-level package domains; subdomains are included in them
+            if ":" not in os.path.basename(domain).split("intel-rapl:", 1)[1]:
+                domains.append(domain)
+        return domains
+
+    def _hwmon_sensors(self):
+        """Return [(kind, path, scale)] for readable power sensors"""
+        sensors = []
+        for hwmon in glob.glob(str(host_path("/sys/class/hwmon/hwmon*"))):
+            if read_value(os.path.join(hwmon, "name")) == "ina3221":
+                # Voltage (mV) times current (mA) per rail; VDD_IN is the whole board
+                rails = {}
+                for label_file in glob.glob(os.path.join(hwmon, "in*_label")):
+                    channel = os.path.basename(label_file)[2:-6]
+                    rails[read_value(label_file)] = channel
+                channels = [rails["VDD_IN"]] if "VDD_IN" in rails else list(rails.values())
+                for channel in channels:
+                    sensors.append(("rail", (os.path.join(hwmon, f"in{channel}_input"),
+                                             os.path.join(hwmon, f"curr{channel}_input")), 1e-6))
+            else:
+                for power_file in glob.glob(os.path.join(hwmon, "power[0-9]*_input")):
+                    sensors.append(("power", power_file, 1e-6))
+        return sensors
+
+    def sample(self):
+        """Return the current draw in watts, or None if nothing can be measured"""
+        total = None
+        now = time.time()
+        for domain in self._rapl_domains():
+            energy = read_value(os.path.join(domain, "energy_uj"))
+            if energy is None:
+                continue
+            energy = int(energy)
+            previous = self.last_energy.get(domain)
+            self.last_energy[domain] = (now, energy)
+            if previous and now > previous[0]:
+                delta = energy - previous[1]
+                if delta < 0:
+                    # The counter wrapped around
+                    delta += int(read_value(os.path.join(domain, "max_energy_range_uj"), "0"))
+                total = (total or 0.0) + delta / 1e6 / (now - previous[0])
+
+        for kind, path, scale in self._hwmon_sensors():
+            try:
+                if kind == "rail":
+                    value = float(read_value(path[0])) * float(read_value(path[1]))
+                else:
+                    value = float(read_value(path))
+                total = (total or 0.0) + value * scale
+            except (TypeError, ValueError):
+                continue
+
+        if has_nvidia_smi() and not DRY_RUN:
+            try:
+                output = subprocess.check_output(
+                    ['nvidia-smi', '--query-gpu=power.draw', '--format=csv,noheader,nounits'],
+                    stderr=subprocess.DEVNULL, timeout=5
+                ).decode()
+                total = (total or 0.0) + sum(float(line) for line in output.split('\n') if line.strip())
+            except Exception:
+                pass
+        return None if total is None else round(total, 2)
+
+class PowerGovernor:
+    """Applies power modes to the host and switches between them
+
+    The policy is manual (the configured mode), load (performance while
+    busy, stepping down when quiet) or schedule (modes by time of day).
+    Energy and completed work are accounted per mode to report
+    performance per watt.
+    """
+
+    def __init__(self):
+        config = configparser.ConfigParser()
+        if CONFIG_FILE.exists():
+            try:
+                config.read(CONFIG_FILE)
+            except configparser.Error as e:
+                print(f"Error reading power settings from {CONFIG_FILE}: {e}")
+        configured = config.get('Hardware', 'power_mode', fallback='balanced')
+        self.configured_mode = configured if configured in POWER_MODES else 'balanced'
+        policy = config.get('Power', 'policy', fallback='manual')
+        self.policy = policy if policy in POLICIES else 'manual'
+        try:
+            self.schedule = parse_schedule(config.get('Power', 'schedule', fallback=''))
+        except ValueError as e:
+            print(f"Ignoring power schedule: {e}")
+            self.schedule = []
+        # nvpmodel IDs differ between Jetson boards, so each can be overridden
+        self.nvpmodel_modes = {}
+        for mode in POWER_MODES:
+            self.nvpmodel_modes[mode] = MODE_SETTINGS[mode]["nvpmodel"]
+            value = config.get('Power', f'nvpmodel_{mode}', fallback='').strip()
+            if value:
+                try:
+                    self.nvpmodel_modes[mode] = int(value)
+                except ValueError:
+                    print(f"Ignoring [Power] nvpmodel_{mode} = {value}: not a mode ID")
+
+        self.lock = threading.Lock()
+        self.mode = None
+        self.switched_at = None
+        self.last_actions = []
+        self.last_busy = time.time()
+        self.listeners = []
+        # The host's own settings, saved before the first mode changes them
+        self.host_defaults = self._load_host_defaults()
+        self.meter = PowerMeter()
+        self.watts = None
+        self.last_sample = None
+        self.stats = {mode: {"seconds": 0.0, "joules": 0.0, "measured_seconds": 0.0, "tokens": 0, "images": 0}
+                      for mode in POWER_MODES}
+        self.thread = None
+
+    # Applying modes
+
+    def apply(self, mode):
+        """Apply a power mode to the host; returns the actions taken"""
+        if mode not in POWER_MODES:
+            raise ValueError(f"Unknown power mode '{mode}'; expected one of {', '.join(POWER_MODES)}")
+        settings = MODE_SETTINGS[mode]
+        if mode == "balanced":
+            actions = self._restore_cpufreq()
+            if is_jetson():
+                actions.extend(self._apply_jetson(mode, settings))
+            elif has_nvidia_smi():
+                actions.extend(self._restore_gpu_power_limit())
+            if self.host_defaults is not None and all(action['ok'] for action in actions):
+                # The host is back to its own settings; record them afresh next time
+                self._save_host_defaults(None)
+        else:
+            self._record_host_defaults()
+            actions = self._apply_cpufreq(settings)
+            if is_jetson():
+                actions.extend(self._apply_jetson(mode, settings))
+            elif has_nvidia_smi():
+                actions.extend(self._apply_gpu_power_limit(settings))
+
+        with self.lock:
+            self._account()
+            self.mode = mode
+            self.switched_at = time.time()
+            self.last_actions = actions
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(mode)
+        print(f"Power mode: {mode} ({sum(1 for action in actions if action['ok'])}/{len(actions)} settings applied)")
+        return actions
+
+    def _apply_cpufreq(self, settings):
+        actions = []
+        for cpufreq in cpufreq_dirs():
+            cpu = os.path.basename(os.path.dirname(cpufreq))
+            available = (read_value(os.path.join(cpufreq, "scaling_available_governors")) or "").split()
+            governor = next((name for name in settings["cpu_governors"] if name in available), None)
+            if governor:
+                error = write_value(os.path.join(cpufreq, "scaling_governor"), governor)
+                actions.append({"target": f"{cpu} governor", "value": governor, "ok": error is None, "error": error})
+
+            low = read_value(os.path.join(cpufreq, "cpuinfo_min_freq"))
+            high = read_value(os.path.join(cpufreq, "cpuinfo_max_freq"))
+            if low and high:
+                frequency = int(int(low) + (int(high) - int(low)) * settings["cpu_max_freq"])
+                error = write_value(os.path.join(cpufreq, "scaling_max_freq"), frequency)
+                actions.append({"target": f"{cpu} max frequency", "value": frequency, "ok": error is None, "error": error})
+        return actions
+
+    def _apply_jetson(self, mode, settings):
+        actions = []
+        nvpmodel = self.nvpmodel_modes.get(mode)
+        if nvpmodel is None and mode == "balanced":
+            # Back to the mode the board was in before the governor changed it
+            nvpmodel = (self.host_defaults or {}).get("nvpmodel")
+        if nvpmodel is not None:
+            ok, output = run_command(["nvpmodel", "-m", str(nvpmodel)])
+            actions.append({"target": "nvpmodel", "value": nvpmodel, "ok": ok, "error": None if ok else output})
+
+        store = POWER_DATA_DIR / "jetson_clocks.conf"
+        if settings["jetson_clocks"]:
+            if not store.exists():
+                # Save the default clocks so other modes can restore them
+                os.makedirs(POWER_DATA_DIR, exist_ok=True)
+                run_command(["jetson_clocks", "--store", str(store)])
+            ok, output = run_command(["jetson_clocks"])
+            actions.append({"target": "jetson_clocks", "value": "max", "ok": ok, "error": None if ok else output})
+        elif store.exists():
+            ok, output = run_command(["jetson_clocks", "--restore", str(store)])
+            actions.append({"target": "jetson_clocks", "value": "restore", "ok": ok, "error": None if ok else output})
+        return actions
+
+    def _apply_gpu_power_limit(self, settings):
+        if DRY_RUN:
+            return [{"target": "gpu power limit", "value": f"{settings['gpu_power_limit']:.0%} of default",
+                     "ok": True, "error": None}]
+        try:
+            output = subprocess.check_output(
+                ['nvidia-smi', '--query-gpu=power.default_limit,power.min_limit,power.max_limit',
+                 '--format=csv,noheader,nounits'],
+                stderr=subprocess.DEVNULL, timeout=5
+            ).decode()
+        except Exception as e:
+            return [{"target": "gpu power limit", "value": None, "ok": False, "error": str(e)}]
+
+        actions = []
+        for index, line in enumerate(line for line in output.split('\n') if line.strip()):
+            try:
+                default, low, high = (float(value) for value in line.split(','))
+            except ValueError:
+                # "[N/A]" on boards without adjustable limits
+                continue
+            limit = int(min(max(default * settings["gpu_power_limit"], low), high))
+            ok, result = run_command(["nvidia-smi", "-i", str(index), "-pl", str(limit)])
+            actions.append({"target": f"gpu{index} power limit", "value": limit, "ok": ok, "error": None if ok else result})
+        return actions
+
+    def add_listener(self, listener):
+        """Call listener(mode) after each mode change"""
+        with self.lock:
+            self.listeners.append(listener)
+
+    def ollama_settings(self):
+        return MODE_SETTINGS[self.mode or self.configured_mode]["ollama"]
+
+    # Host defaults
+
+    def _load_host_defaults(self):
+        try:
+            with open(POWER_DATA_DIR / HOST_DEFAULTS_FILE, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_host_defaults(self, defaults):
+        """Keep the host defaults on disk, so a restart in another mode can still restore them"""
+        self.host_defaults = defaults
+        path = POWER_DATA_DIR / HOST_DEFAULTS_FILE
+        try:
+            if defaults is None:
+                if path.exists():
+                    path.unlink()
+                return
+            os.makedirs(POWER_DATA_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(defaults, f, indent=2)
+        except OSError as e:
+            print(f"Error saving host power settings to {path}: {e}")
+
+    def _record_host_defaults(self):
+        """Save the host's settings before a mode first changes them"""
+        if self.host_defaults is not None:
+            return
+        defaults = {"cpufreq": {}, "nvpmodel": None, "gpu_power_limits": {}}
+        for cpufreq in cpufreq_dirs():
+            cpu = os.path.basename(os.path.dirname(cpufreq))
+            defaults["cpufreq"][cpu] = {
+                "governor": read_value(os.path.join(cpufreq, "scaling_governor")),
+                "max_freq": read_value(os.path.join(cpufreq, "scaling_max_freq"))
+            }
+        if is_jetson():
+            ok, output = run_command(["nvpmodel", "-q"])
+            # The last line of `nvpmodel -q` is the current mode ID
+            lines = output.split('\n') if ok else []
+            if lines and lines[-1].strip().isdigit():
+                defaults["nvpmodel"] = int(lines[-1])
+        elif has_nvidia_smi() and not DRY_RUN:
+            try:
+                output = subprocess.check_output(
+                    ['nvidia-smi', '--query-gpu=power.limit', '--format=csv,noheader,nounits'],
+                    stderr=subprocess.DEVNULL, timeout=5
+                ).decode()
+                for index, line in enumerate(line for line in output.split('\n') if line.strip()):
+                    try:
+                        defaults["gpu_power_limits"][str(index)] = int(float(line))
+                    except ValueError:
+                        continue
+            except Exception as e:
+                print(f"Error reading GPU power limits: {e}")
+        self._save_host_defaults(defaults)
+
+    def _restore_cpufreq(self):
+        actions = []
+        for cpu, saved in ((self.host_defaults or {}).get("cpufreq") or {}).items():
+            cpufreq = host_path(f"/sys/devices/system/cpu/{cpu}/cpufreq")
+            for name, target, value in (("scaling_governor", "governor", saved.get("governor")),
+                                        ("scaling_max_freq", "max frequency", saved.get("max_freq"))):
+                if value:
+                    error = write_value(cpufreq / name, value)
+                    actions.append({"target": f"{cpu} {target}", "value": value, "ok": error is None, "error": error})
+        return actions
+
+    def _restore_gpu_power_limit(self):
+        actions = []
+        for index, limit in ((self.host_defaults or {}).get("gpu_power_limits") or {}).items():
+            ok, result = run_command(["nvidia-smi", "-i", str(index), "-pl", str(limit)])
+            actions.append({"target": f"gpu{index} power limit", "value": limit, "ok": ok, "error": None if ok else result})
+        return actions
+
+    # Runtime switching
+
+    def set_policy(self, policy, mode=None):
+        """Switch policy; a manual policy applies mode (or the configured mode)"""
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'; expected one of {', '.join(POLICIES)}")
+        if policy == "schedule" and not self.schedule:
+            raise ValueError("No schedule is configured in [Power] schedule")
+        with self.lock:
+            self.policy = policy
+            if mode is not None:
+                self.configured_mode = mode
+        return self.evaluate(force=True)
+
+    def is_busy(self):
+        cores = os.cpu_count() or 1
+        try:
+            if os.getloadavg()[0] / cores >= BUSY_CPU_LOAD:
+                return True
+        except OSError:
+            pass
+        if get_arbiter().ollama_inflight > 0:
+            return True
+        if has_nvidia_smi() and not DRY_RUN:
+            try:
+                output = subprocess.check_output(
+                    ['nvidia-smi', '--query-gpu=utilization.gpu', '--format=csv,noheader,nounits'],
+                    stderr=subprocess.DEVNULL, timeout=5
+                ).decode()
+                return any(float(line) >= BUSY_GPU_PERCENT for line in output.split('\n') if line.strip())
+            except Exception:
+                pass
+        return False
+
+    def target_mode(self):
+        """The mode the current policy asks for"""
+        if self.policy == "schedule":
+            now = time.localtime()
+            return scheduled_mode(self.schedule, now.tm_hour * 60 + now.tm_min) or self.configured_mode
+        if self.policy == "load":
+            now = time.time()
+            if self.is_busy():
+                self.last_busy = now
+                return "performance"
+            quiet = now - self.last_busy
+            return "efficiency" if quiet >= IDLE_AFTER else "balanced" if quiet >= BALANCED_AFTER else "performance"
+        return self.configured_mode
+
+    def evaluate(self, force=False):
+        """Apply the target mode if it differs from the current one"""
+        mode = self.target_mode()
+        if force or mode != self.mode:
+            return self.apply(mode)
+        return []
+
+    # Accounting
+
+    def _account(self):
+        """Attribute the time and energy since the last sample to the current mode; call with the lock held"""
+        now = time.time()
+        if self.mode is not None and self.last_sample is not None:
+            elapsed = now - self.last_sample
+            stats = self.stats[self.mode]
+            stats["seconds"] += elapsed
+            if self.watts is not None:
+                stats["joules"] += self.watts * elapsed
+                stats["measured_seconds"] += elapsed
+        self.last_sample = now
+
+    def sample_power(self):
+        watts = self.meter.sample()
+        with self.lock:
+            self._account()
+            self.watts = watts
+
+    def record_work(self, kind, amount):
+        """Count completed work (tokens or images) toward the current mode"""
+        with self.lock:
+            mode = self.mode or self.configured_mode
+            self.stats[mode][kind] += amount
+
+    def efficiency(self):
+        report = {}
+        for mode, stats in self.stats.items():
+            joules = stats["joules"]
+            report[mode] = {
+                "seconds": round(stats["seconds"], 1),
+                "average_watts": round(joules / stats["measured_seconds"], 2) if stats["measured_seconds"] else None,
+                "tokens": stats["tokens"],
+                "images": stats["images"],
+                # Work per joule is throughput per watt
+                "tokens_per_joule": round(stats["tokens"] / joules, 4) if joules else None,
+                "images_per_kilojoule": round(stats["images"] * 1000 / joules, 4) if joules else None
+            }
+        return report
+
+    # Background loop
+
+    def start(self):
+        """Apply the policy's mode and keep re-evaluating it in the background"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="power-governor", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        self.sample_power()
+        while True:
+            try:
+                if self.mode is None or self.policy != "manual":
+                    self.evaluate()
+                self.sample_power()
+            except Exception as e:
+                print(f"Error in power governor: {e}")
+            time.sleep(POLL_INTERVAL)
+
+    def status(self):
+        with self.lock:
+            self._account()
+            return {
+                "mode": self.mode,
+                "policy": self.policy,
+                "configured_mode": self.configured_mode,
+                "switched_at": self.switched_at,
+                "schedule": [
+                    {"start": f"{start // 60:02d}:{start % 60:02d}", "end": f"{end // 60:02d}:{end % 60:02d}", "mode": mode}
+                    for start, end, mode in self.schedule
+                ],
+                "watts": self.watts,
+                "ollama": self.ollama_settings(),
+                "capabilities": {
+                    "cpufreq_cpus": len(cpufreq_dirs()),
+                    "jetson": is_jetson(),
+                    "nvidia_smi": has_nvidia_smi(),
+                    "power_sources": self.meter.sources(),
+                    "host_root": str(HOST_ROOT),
+                    "dry_run": DRY_RUN
+                },
+                "last_actions": self.last_actions,
+                "efficiency": self.efficiency()
+            }
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_governor():
+    """Return the shared PowerGovernor, creating it on first use"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = PowerGovernor()
+        return _governor
+
+@power_governor.route('/api/power')
+def power_status():
+    """Report the power mode, policy, power draw and performance per watt"""
+    return jsonify(get_governor().status())
+
+@power_governor.route('/api/power/mode', methods=['POST'])
+def set_power_mode():
+    """Switch mode or policy at runtime
+
+    {"mode": "efficiency"} applies a mode and holds it (manual policy);
+    {"policy": "load"} or {"policy": "schedule"} hands control back.
+    """
+    body = request.get_json(silent=True) or {}
+    mode = body.get('mode')
+    policy = body.get('policy', 'manual' if mode else None)
+    if policy is None:
+        return jsonify({'error': "'mode' or 'policy' is required"}), 400
+    if mode is not None and mode not in POWER_MODES:
+        return jsonify({'error': f"'mode' must be one of {', '.join(POWER_MODES)}"}), 400
+    try:
+        get_governor().set_policy(policy, mode=mode)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(get_governor().status())
+
+def create_fake_sysfs(root, cpus=4, jetson=False):
+    """Build a fake host tree to run the governor against
+
+    Run with FUSIONLOOM_HOST_ROOT=<root> and FUSIONLOOM_POWER_DRY_RUN=1 to
+    see which settings each mode writes without touching the real host.
+    """
+    root = Path(root)
+    for cpu in range(cpus):
+        cpufreq = root / "sys" / "devices" / "system" / "cpu" / f"cpu{cpu}" / "cpufreq"
+        os.makedirs(cpufreq, exist_ok=True)
+        files = {
+            "scaling_available_governors": "conservative ondemand userspace powersave performance schedutil",
+            "scaling_governor": "schedutil",
+            "cpuinfo_min_freq": "400000",
+            "cpuinfo_max_freq": "3000000",
+            "scaling_max_freq": "3000000"
+        }
+        for name, value in files.items():
+            (cpufreq / name).write_text(value + "\n")
+
+    rapl = root / "sys" / "class" / "powercap" / "intel-rapl:0"
+    os.makedirs(rapl, exist_ok=True)
+    (rapl / "name").write_text("package-0\n")
+    (rapl / "energy_uj").write_text("0\n")
+    (rapl / "max_energy_range_uj").write_text("262143328850\n")
+
+    if jetson:
+        (root / "etc").mkdir(parents=True, exist_ok=True)
+        (root / "etc" / "nv_tegra_release").write_text("# R35 (release), REVISION: 4.1\n")
+        hwmon = root / "sys" / "class" / "hwmon" / "hwmon0"
+        os.makedirs(hwmon, exist_ok=True)
+        (hwmon / "name").write_text("ina3221\n")
+        (hwmon / "in1_label").write_text("VDD_IN\n")
+        (hwmon / "in1_input").write_text("5000\n")
+        (hwmon / "curr1_input").write_text("1600\n")
+    return root
+
+def check_fake_sysfs(root, jetson=False):
+    """Apply each mode to a fresh fake host tree and compare what it holds afterwards
+
+    Returns a list of mismatches; an empty list means every mode wrote the
+    expected cpufreq settings and balanced restored the original ones.
+    """
+    global HOST_ROOT, POWER_DATA_DIR, DRY_RUN
+    root = create_fake_sysfs(root, jetson=jetson)
+    HOST_ROOT, POWER_DATA_DIR, DRY_RUN = root, root / "fusionloom-power", True
+    originals = {path: (read_value(os.path.join(path, "scaling_governor")), read_value(os.path.join(path, "scaling_max_freq")))
+                 for path in cpufreq_dirs()}
+
+    governor = PowerGovernor()
+    failures = []
+    for mode in ["performance", "efficiency", "balanced"]:
+        governor.apply(mode)
+        for path, (original_governor, original_max) in originals.items():
+            if mode == "balanced":
+                expected_governor, expected_max = original_governor, original_max
+            else:
+                settings = MODE_SETTINGS[mode]
+                available = read_value(os.path.join(path, "scaling_available_governors")).split()
+                expected_governor = next(name for name in settings["cpu_governors"] if name in available)
+                low = int(read_value(os.path.join(path, "cpuinfo_min_freq")))
+                high = int(read_value(os.path.join(path, "cpuinfo_max_freq")))
+                expected_max = str(int(low + (high - low) * settings["cpu_max_freq"]))
+            for name, expected in (("scaling_governor", expected_governor), ("scaling_max_freq", expected_max)):
+                actual = read_value(os.path.join(path, name))
+                if actual != expected:
+                    failures.append(f"{mode}: {os.path.join(path, name)} is {actual}, expected {expected}")
+        if mode != "balanced" and governor.host_defaults is None:
+            failures.append(f"{mode}: host defaults were not recorded")
+    if governor.host_defaults is not None:
+        failures.append("balanced: host defaults were not cleared after restoring them")
+    return failures
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply and inspect FusionLoom power modes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the host's power capabilities and draw")
+    apply_parser = commands.add_parser("apply", help="Apply a power mode")
+    apply_parser.add_argument("mode", choices=POWER_MODES)
+    fake_parser = commands.add_parser("fake-sysfs", help="Create a fake host tree for testing")
+    fake_parser.add_argument("root", help="Directory to create it in")
+    fake_parser.add_argument("--cpus", type=int, default=4)
+    fake_parser.add_argument("--jetson", action="store_true", help="Include Jetson files and power rails")
+    check_parser = commands.add_parser("check", help="Apply every mode to a fake host tree and check the result")
+    check_parser.add_argument("root", help="Empty directory to create the fake tree in")
+    check_parser.add_argument("--jetson", action="store_true", help="Include Jetson files and power rails")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        failures = check_fake_sysfs(args.root, jetson=args.jetson)
+        for failure in failures:
+            print(f"FAILED {failure}")
+        print(f"{len(failures)} mismatches")
+        sys.exit(1 if failures else 0)
+
+    if args.command == "fake-sysfs":
+        root = create_fake_sysfs(args.root, cpus=args.cpus, jetson=args.jetson)
+        print(f"Created a fake host tree in {root}. Try:")
+        print(f"  FUSIONLOOM_HOST_ROOT={root} FUSIONLOOM_POWER_DRY_RUN=1 python3 {sys.argv[0]} apply efficiency")
+        sys.exit(0)
+
+    governor = get_governor()
+    if args.command == "apply":
+        actions = governor.apply(args.mode)
+        for action in actions:
+            print(f"{'ok' if action['ok'] else 'FAILED':6} {action['target']} = {action['value']}"
+                  + (f" ({action['error']})" if action['error'] else ""))
+        sys.exit(0 if all(action['ok'] for action in actions) else 1)
+
+    governor.sample_power()
+    print(json.dumps(governor.status(), indent=2))
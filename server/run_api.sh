@@ -4,7 +4,10 @@
 chmod +x system_info.py
 
 # Install required dependencies if not already installed
-pip install flask flask-cors
+pip install -r requirements.txt
+
+# Bundle, hash and precompress the UI's static assets
+python3 build_assets.py
 
 # Run the system info API server
 python3 system_info.py --serve 5050
@@ -0,0 +1,579 @@
+import os
+import re
+import json
+import math
+import time
+import queue
+import struct
+import threading
+import http.client
+import configparser
+import importlib.util
+import urllib.parse
+from pathlib import Path
+from flask import Blueprint, jsonify, request
+
+from llm_gateway import stream_chat
+
+# flask-sock is optional; without it the streaming endpoints answer 503
+WEBSOCKET_AVAILABLE = importlib.util.find_spec("flask_sock") is not None
+
+if WEBSOCKET_AVAILABLE:
+    from flask_sock import Sock
+    sock = Sock()
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+CONFIG_FILE = REPO_ROOT / "cfg" / "config.ini"
+
+# Service URLs come from the environment, then the [Endpoints] section the
+# installer writes to config.ini
+SERVICES = {
+    "stt": {"env": "FUSIONLOOM_STT_URL", "config_key": "stt_api", "default_url": "http://localhost:5501/api/stt"},
+    "tts": {"env": "FUSIONLOOM_TTS_URL", "config_key": "tts_api", "default_url": "http://localhost:5500/api/tts"}
+}
+SERVICE_TIMEOUT = 60
+
+# Clients stream 16-bit little-endian mono PCM
+DEFAULT_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+# An utterance ends after this much silence, or when the buffer is full
+MAX_UTTERANCE_SECONDS = 30
+END_OF_SPEECH_SECONDS = 0.6
+# Silence kept ahead of the first speech so its onset is not clipped
+PRE_ROLL_SECONDS = 0.3
+SPEECH_RMS_THRESHOLD = 500
+# New audio needed before the next partial transcript
+PARTIAL_INTERVAL_SECONDS = 0.5
+
+# Sentences shorter than this wait for more text, so TTS is not called per word
+MIN_SENTENCE_CHARS = 12
+MAX_SENTENCE_CHARS = 240
+SENTENCE_END = re.compile(r"[.!?。！？]+[\"')\]]*\s+|\n+")
+
+AUDIO_CHUNK_SIZE = 16384
+
+DEFAULT_VOICE_MODEL = os.environ.get("FUSIONLOOM_VOICE_MODEL", "llama3")
+
+speech = Blueprint('speech', __name__)
+
+def service_url(name):
+    """Return the endpoint of the STT or TTS service"""
+    settings = SERVICES[name]
+    url = os.environ.get(settings["env"])
+    if not url and CONFIG_FILE.exists():
+        config = configparser.ConfigParser()
+        try:
+            config.read(CONFIG_FILE)
+            url = config.get('Endpoints', settings["config_key"], fallback=None)
+        except configparser.Error as e:
+            print(f"Error reading {settings['config_key']} from {CONFIG_FILE}: {e}")
+    if not url:
+        return settings["default_url"]
+    # The installer records the service root; the API lives under /api/<name>
+    if not urllib.parse.urlsplit(url).path.strip('/'):
+        url = url.rstrip('/') + urllib.parse.urlsplit(settings["default_url"]).path
+    return url
+
+def wav_header(data_length, sample_rate):
+    """Return the 44-byte header of a mono 16-bit PCM WAV file"""
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_length, b'WAVE', b'fmt ', 16, 1, 1,
+        sample_rate, sample_rate * SAMPLE_WIDTH, SAMPLE_WIDTH, 16, b'data', data_length
+    )
+
+def frame_rms(frame):
+    """Root mean square of a PCM frame, sampling every fourth sample"""
+    samples = memoryview(frame)[:len(frame) - len(frame) % SAMPLE_WIDTH].cast('h')[::4]
+    if not len(samples):
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+class PcmBuffer:
+    """Preallocated audio buffer handed between stages as memoryviews
+
+    Frames are written in place and transcription reads views of the buffer,
+    so an utterance is not copied again between the socket and the STT request.
+    """
+
+    def __init__(self, capacity):
+        self.data = bytearray(capacity)
+        self.view = memoryview(self.data)
+        self.length = 0
+
+    def append(self, frame):
+        """Copy as much of frame as fits; returns False once the buffer is full"""
+        count = min(len(frame), len(self.data) - self.length)
+        self.view[self.length:self.length + count] = frame[:count]
+        self.length += count
+        return self.length < len(self.data)
+
+    def keep_tail(self, count):
+        """Drop all but the last count bytes"""
+        count = min(count, self.length)
+        self.view[:count] = bytes(self.view[self.length - count:self.length])
+        self.length = count
+
+    def reset(self):
+        self.length = 0
+
+class SpeechServiceClient:
+    """Keep-alive connection to the STT or TTS service"""
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        self.https = parsed.scheme == 'https'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path or '/'
+        self.conn = None
+        self.chunk = bytearray(AUDIO_CHUNK_SIZE)
+
+    def _request(self, content_type, parts):
+        """POST the buffers in parts as one body, without joining them first"""
+        for attempt in range(2):
+            if self.conn is None:
+                cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                self.conn = cls(self.host, self.port, timeout=SERVICE_TIMEOUT)
+            try:
+                self.conn.putrequest('POST', self.path)
+                self.conn.putheader('Content-Type', content_type)
+                self.conn.putheader('Content-Length', str(sum(len(part) for part in parts)))
+                self.conn.endheaders()
+                for part in parts:
+                    self.conn.send(part)
+                response = self.conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                self.close()
+                # The service may have closed the kept-alive socket
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                detail = response.read()[:200].decode('utf-8', errors='replace')
+                raise RuntimeError(f"{self.path} returned HTTP {response.status}: {detail}")
+            return response
+
+    def transcribe(self, pcm, sample_rate):
+        """Send PCM audio as WAV and return the transcript"""
+        response = self._request('audio/wav', [wav_header(len(pcm), sample_rate), pcm])
+        return (json.loads(response.read() or b'{}').get('text') or '').strip()
+
+    def synthesize(self, text, voice, on_chunk):
+        """Synthesize text, passing the audio to on_chunk as it arrives
+
+        on_chunk receives views of a reused buffer and must consume them
+        before returning. Returns the audio's content type.
+        """
+        body = {'text': text}
+        if voice:
+            body['voice'] = voice
+        response = self._request('application/json', [json.dumps(body).encode('utf-8')])
+        view = memoryview(self.chunk)
+        while True:
+            count = response.readinto(self.chunk)
+            if not count:
+                break
+            on_chunk(view[:count])
+        return response.headers.get('Content-Type', 'audio/wav')
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class TranscriptionStream:
+    """Turns streamed PCM frames into partial and final transcripts
+
+    Partial transcripts of the current utterance are requested every
+    PARTIAL_INTERVAL_SECONDS of new audio, skipping one if the previous is
+    still running. An utterance is finalized after END_OF_SPEECH_SECONDS of
+    silence; its buffer then goes to the transcription worker while frames
+    continue into a fresh buffer.
+    """
+
+    def __init__(self, emit, sample_rate=DEFAULT_SAMPLE_RATE, client=None):
+        self.emit = emit
+        self.sample_rate = sample_rate
+        self.bytes_per_second = sample_rate * SAMPLE_WIDTH
+        self.client = client or SpeechServiceClient(service_url("stt"))
+        self.capacity = MAX_UTTERANCE_SECONDS * self.bytes_per_second
+        self.free = queue.Queue()
+        self.buffer = PcmBuffer(self.capacity)
+        self.utterance = 0
+        self._start_utterance()
+
+        self.jobs = queue.Queue()
+        self.partial_pending = False
+        self.worker = threading.Thread(target=self._run, name="stt-stream", daemon=True)
+        self.worker.start()
+
+    def _start_utterance(self):
+        self.heard_speech = False
+        self.silence = 0.0
+        self.last_partial = 0
+        self.ended_at = None
+
+    def feed(self, frame):
+        room = self.buffer.append(frame)
+        if frame_rms(frame) >= SPEECH_RMS_THRESHOLD:
+            self.heard_speech = True
+            self.silence = 0.0
+        else:
+            self.silence += len(frame) / self.bytes_per_second
+
+        if not self.heard_speech:
+            # Only leading silence so far: keep the pre-roll and drop the rest
+            if self.buffer.length > self.bytes_per_second:
+                self.buffer.keep_tail(int(PRE_ROLL_SECONDS * self.bytes_per_second) & ~1)
+            return
+        if self.silence >= END_OF_SPEECH_SECONDS or not room:
+            self.finish()
+        elif self.buffer.length - self.last_partial >= PARTIAL_INTERVAL_SECONDS * self.bytes_per_second:
+            if not self.partial_pending:
+                self.partial_pending = True
+                self.last_partial = self.buffer.length
+                self.jobs.put(("partial", self.utterance, self.buffer, self.buffer.length, time.time()))
+
+    def finish(self):
+        """End the current utterance and transcribe it"""
+        if self.heard_speech:
+            self.jobs.put(("final", self.utterance, self.buffer, self.buffer.length, time.time()))
+            try:
+                self.buffer = self.free.get_nowait()
+            except queue.Empty:
+                self.buffer = PcmBuffer(self.capacity)
+            self.utterance += 1
+        else:
+            self.buffer.reset()
+        self._start_utterance()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            kind, utterance, buffer, length, queued_at = job
+            try:
+                # Frames before length are not written again until the
+                # buffer is recycled after its final transcript
+                text = self.client.transcribe(buffer.view[:length], self.sample_rate)
+                self.emit({
+                    "type": kind,
+                    "utterance": utterance,
+                    "text": text,
+                    "audio_seconds": round(length / self.bytes_per_second, 2),
+                    "latency_ms": round((time.time() - queued_at) * 1000, 1)
+                })
+            except Exception as e:
+                self.emit({"type": "error", "utterance": utterance, "error": str(e)})
+            finally:
+                if kind == "partial":
+                    self.partial_pending = False
+                else:
+                    buffer.reset()
+                    self.free.put(buffer)
+
+    def close(self):
+        """Transcribe any speech still buffered and stop the worker"""
+        self.finish()
+        self.jobs.put(None)
+        self.worker.join()
+        self.client.close()
+
+class SentenceSplitter:
+    """Collects streamed text and hands back complete sentences"""
+
+    def __init__(self):
+        self.text = ""
+
+    def feed(self, text):
+        self.text += text
+        sentences = []
+        while True:
+            cut = None
+            for match in SENTENCE_END.finditer(self.text):
+                if match.end() >= MIN_SENTENCE_CHARS:
+                    cut = match.end()
+                    break
+            if cut is None and len(self.text) > MAX_SENTENCE_CHARS:
+                # No sentence end in sight; break at a comma or space instead
+                head = self.text[:MAX_SENTENCE_CHARS]
+                cut = max(head.rfind(", ") + 2, head.rfind(" ") + 1) or MAX_SENTENCE_CHARS
+            if cut is None:
+                return sentences
+            sentence = self.text[:cut].strip()
+            self.text = self.text[cut:]
+            if sentence:
+                sentences.append(sentence)
+
+    def flush(self):
+        sentence, self.text = self.text.strip(), ""
+        return [sentence] if sentence else []
+
+class SynthesisStream:
+    """Synthesizes sentences in order and streams their audio
+
+    Each sentence is announced with an audio_start message, followed by its
+    audio as binary frames and an audio_end message. Sentences are queued,
+    so synthesis of one overlaps with generation of the next.
+    """
+
+    def __init__(self, writer, voice=None, client=None):
+        self.writer = writer
+        self.voice = voice
+        self.client = client or SpeechServiceClient(service_url("tts"))
+        self.sentences = queue.Queue()
+        self.generation = 0
+        self.count = 0
+        self.worker = threading.Thread(target=self._run, name="tts-stream", daemon=True)
+        self.worker.start()
+
+    def say(self, text):
+        self.sentences.put((self.generation, self.count, text, time.time()))
+        self.count += 1
+
+    def cancel(self):
+        """Drop queued sentences and stop the one being streamed"""
+        self.generation += 1
+        while True:
+            try:
+                self.sentences.get_nowait()
+            except queue.Empty:
+                return
+            self.sentences.task_done()
+
+    def busy(self):
+        """Whether any sentence is queued or still being streamed"""
+        return self.sentences.unfinished_tasks > 0
+
+    def _run(self):
+        while True:
+            item = self.sentences.get()
+            if item is None:
+                return
+            try:
+                self._speak(*item)
+            finally:
+                self.sentences.task_done()
+
+    def _speak(self, generation, number, text, queued_at):
+        """Stream one sentence, unless it was cancelled while queued"""
+        if generation != self.generation:
+            return
+        self.writer.json({"type": "audio_start", "sentence": number, "text": text})
+        first_audio = []
+
+        def on_chunk(view):
+            if generation != self.generation:
+                raise InterruptedError()
+            if not first_audio:
+                first_audio.append(time.time())
+            self.writer.audio(view)
+
+        try:
+            content_type = self.client.synthesize(text, self.voice, on_chunk)
+            self.writer.json({
+                "type": "audio_end",
+                "sentence": number,
+                "content_type": content_type,
+                "latency_ms": round(((first_audio or [time.time()])[0] - queued_at) * 1000, 1)
+            })
+        except InterruptedError:
+            # The rest of the response is abandoned with the connection
+            self.client.close()
+            self.writer.json({"type": "audio_end", "sentence": number, "cancelled": True})
+        except Exception as e:
+            self.writer.json({"type": "error", "sentence": number, "error": str(e)})
+
+    def close(self):
+        self.sentences.put(None)
+        self.worker.join()
+        self.client.close()
+
+class SocketWriter:
+    """Serializes sends from the pipeline's threads onto one websocket"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.lock = threading.Lock()
+
+    def json(self, message):
+        with self.lock:
+            self.ws.send(json.dumps(message))
+
+    def audio(self, view):
+        # The websocket library needs bytes; this is the pipeline's only copy
+        with self.lock:
+            self.ws.send(bytes(view))
+
+def receive_messages(ws):
+    """Yield (binary, data) for each websocket message until it closes"""
+    while True:
+        try:
+            message = ws.receive()
+        except Exception:
+            return
+        if message is None:
+            return
+        if isinstance(message, str):
+            try:
+                yield False, json.loads(message)
+            except ValueError:
+                continue
+        else:
+            yield True, message
+
+def sample_rate_arg():
+    try:
+        return int(request.args.get('sample_rate', DEFAULT_SAMPLE_RATE))
+    except ValueError:
+        return DEFAULT_SAMPLE_RATE
+
+def stt_session(ws):
+    """Stream PCM frames in; receive partial and final transcripts as JSON"""
+    writer = SocketWriter(ws)
+    stream = TranscriptionStream(writer.json, sample_rate=sample_rate_arg())
+    try:
+        for binary, message in receive_messages(ws):
+            if binary:
+                stream.feed(message)
+            elif message.get('type') == 'end':
+                stream.finish()
+    finally:
+        stream.close()
+
+def tts_session(ws):
+    """Stream text in, token by token if need be; receive audio per sentence
+
+    Messages: {"type": "text", "text": "..."}, {"type": "flush"} to speak
+    the remaining text, and {"type": "cancel"} to stop speaking.
+    """
+    writer = SocketWriter(ws)
+    synthesis = SynthesisStream(writer, voice=request.args.get('voice'))
+    splitter = SentenceSplitter()
+    try:
+        for binary, message in receive_messages(ws):
+            if binary:
+                continue
+            kind = message.get('type')
+            if kind == 'text':
+                for sentence in splitter.feed(message.get('text', '')):
+                    synthesis.say(sentence)
+            elif kind == 'flush':
+                for sentence in splitter.flush():
+                    synthesis.say(sentence)
+            elif kind == 'cancel':
+                splitter.flush()
+                synthesis.cancel()
+    finally:
+        synthesis.close()
+
+def voice_session(ws):
+    """Full voice loop: speech in, transcript to the LLM, spoken reply out
+
+    Each final transcript is sent to the model through the gateway; the
+    reply is streamed back as token messages and spoken sentence by
+    sentence while it is still being generated. Speaking over the reply
+    interrupts it.
+    """
+    writer = SocketWriter(ws)
+    model = request.args.get('model', DEFAULT_VOICE_MODEL)
+    rag = request.args.get('rag', '').lower() in ('1', 'true', 'yes')
+    synthesis = SynthesisStream(writer, voice=request.args.get('voice'))
+    history = []
+    # Guards history and the current reply's cancellation, so an interrupted
+    # reply cannot queue another sentence after interrupt() returns
+    lock = threading.Lock()
+    reply = {"thread": None, "cancelled": threading.Event(), "closed": False}
+
+    def respond(messages, answer, cancelled):
+        splitter = SentenceSplitter()
+        try:
+            for token in stream_chat(messages, model, rag=rag):
+                with lock:
+                    if cancelled.is_set():
+                        break
+                    answer["content"] += token
+                    for sentence in splitter.feed(token):
+                        synthesis.say(sentence)
+                writer.json({"type": "token", "text": token})
+            with lock:
+                if not cancelled.is_set():
+                    for sentence in splitter.flush():
+                        synthesis.say(sentence)
+        except Exception as e:
+            if not reply["closed"]:
+                writer.json({"type": "error", "error": f"Chat failed: {e}"})
+        # An interrupted reply may only wind down after the session has ended
+        if not reply["closed"]:
+            writer.json({"type": "reply_end", "interrupted": cancelled.is_set()})
+
+    def interrupt():
+        """Stop the current reply without waiting for its thread, which may be blocked on the model"""
+        with lock:
+            reply["cancelled"].set()
+            synthesis.cancel()
+            reply["cancelled"] = threading.Event()
+
+    def on_transcript(message):
+        writer.json(message)
+        speaking = (reply["thread"] is not None and reply["thread"].is_alive()) or synthesis.busy()
+        if message["type"] == "partial" and message["text"] and speaking:
+            interrupt()
+        elif message["type"] == "final" and message["text"]:
+            interrupt()
+            with lock:
+                # The exchange takes its place in the history now; the answer
+                # fills in as it streams, and stays partial if interrupted
+                answer = {"role": "assistant", "content": ""}
+                history.append({"role": "user", "content": message["text"]})
+                messages = [dict(entry) for entry in history]
+                history.append(answer)
+                cancelled = reply["cancelled"]
+            reply["thread"] = threading.Thread(target=respond, args=(messages, answer, cancelled),
+                                               name="voice-reply", daemon=True)
+            reply["thread"].start()
+
+    stream = TranscriptionStream(on_transcript, sample_rate=sample_rate_arg())
+    try:
+        for binary, message in receive_messages(ws):
+            if binary:
+                stream.feed(message)
+            elif message.get('type') == 'end':
+                stream.finish()
+            elif message.get('type') == 'cancel':
+                interrupt()
+    finally:
+        stream.close()
+        reply["closed"] = True
+        interrupt()
+        synthesis.close()
+
+STREAMING_ENDPOINTS = {
+    '/api/speech/stt/stream': stt_session,
+    '/api/speech/tts/stream': tts_session,
+    '/api/speech/voice': voice_session
+}
+
+def unavailable():
+    return jsonify({'error': "Streaming speech requires 'flask-sock'"}), 503
+
+for path, session in STREAMING_ENDPOINTS.items():
+    if WEBSOCKET_AVAILABLE:
+        sock.route(path, bp=speech)(session)
+    else:
+        speech.add_url_rule(path, endpoint=session.__name__, view_func=unavailable)
+
+@speech.route('/api/speech/status')
+def speech_status():
+    return jsonify({
+        'streaming': WEBSOCKET_AVAILABLE,
+        'stt_url': service_url("stt"),
+        'tts_url': service_url("tts"),
+        'sample_rate': DEFAULT_SAMPLE_RATE,
+        'endpoints': list(STREAMING_ENDPOINTS)
+    })
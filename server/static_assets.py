@@ -0,0 +1,94 @@
+import os
+import json
+from pathlib import Path
+from flask import Blueprint, request, send_file, abort
+
+# Set up paths
+SCRIPT_DIR = Path(__file__).parent.absolute()
+REPO_ROOT = SCRIPT_DIR.parent
+UI_DIR = REPO_ROOT / "ui"
+STATIC_DIR = UI_DIR / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_FILE = DIST_DIR / "manifest.json"
+
+# Hashed filenames never change content, so browsers may cache them forever
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Unhashed files (index.html, images) must be revalidated
+REVALIDATE_CACHE = "no-cache"
+
+# Precompressed variants in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+MIMETYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml"
+}
+
+static_assets = Blueprint('static_assets', __name__)
+
+def load_manifest():
+    """Load the build manifest, or None if the assets have not been built"""
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def accepted_encodings():
+    """Return the content codings the client accepts"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if coding:
+            accepted.add(coding.lower())
+    return accepted
+
+def send_asset(path, cache_control):
+    """Send a file, preferring a precompressed variant the client accepts"""
+    if not path.is_file():
+        abort(404)
+
+    mimetype = MIMETYPES.get(path.suffix)
+    accepted = accepted_encodings()
+    for coding, suffix in ENCODINGS:
+        variant = Path(f"{path}{suffix}")
+        if coding in accepted and variant.is_file():
+            response = send_file(variant, mimetype=mimetype, conditional=True, etag=True)
+            response.headers['Content-Encoding'] = coding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@static_assets.route('/')
+@static_assets.route('/index.html')
+def index():
+    """Serve the built index.html, falling back to the unbundled page"""
+    # The built page references its bundles as static/dist/..., relative to /
+    if (DIST_DIR / 'index.html').is_file() and load_manifest():
+        return send_asset(DIST_DIR / 'index.html', REVALIDATE_CACHE)
+    return send_asset(UI_DIR / 'index.html', REVALIDATE_CACHE)
+
+@static_assets.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    """Serve a content-hashed bundle with immutable caching"""
+    if filename.endswith(('.gz', '.br')) or os.path.basename(filename) != filename:
+        abort(404)
+    cache_control = REVALIDATE_CACHE if filename in ('index.html', 'manifest.json') else IMMUTABLE_CACHE
+    return send_asset(DIST_DIR / filename, cache_control)
+
+@static_assets.route('/static/<path:filename>')
+def static_asset(filename):
+    """Serve an unbundled static file (images, or sources during development)"""
+    path = (STATIC_DIR / filename).resolve()
+    if STATIC_DIR.resolve() not in path.parents:
+        abort(404)
+    return send_asset(path, REVALIDATE_CACHE)
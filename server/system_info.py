@@ -6,21 +6,125 @@ import platform
 import subprocess
 from flask import Flask, jsonify
 from flask_cors import CORS
+from static_assets import static_assets
+from chat_search import chat_search
+from document_ingest import document_ingest
+from llm_gateway import llm_gateway
+from fleet import fleet, register_local_node
+from gpu_arbiter import gpu_arbiter
+from image_jobs import image_jobs
+from speech import speech
+from power_governor import power_governor, get_governor
+from tracing import tracing
+from cloud_gateway import cloud_gateway
 
-app = Flask(__name__)
+# The UI's static files are served by the static_assets blueprint instead
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for all routes
+# Registered first so request spans cover the other blueprints' hooks
+app.register_blueprint(tracing)
+app.register_blueprint(static_assets)
+app.register_blueprint(chat_search)
+app.register_blueprint(document_ingest)
+app.register_blueprint(llm_gateway)
+app.register_blueprint(cloud_gateway)
+app.register_blueprint(fleet)
+app.register_blueprint(gpu_arbiter)
+app.register_blueprint(image_jobs)
+app.register_blueprint(speech)
+app.register_blueprint(power_governor)
+
+# Hardware does not change while the server runs, so it is detected once
+_system_info = None
+
+# Previous /proc/stat sample for CPU usage without psutil
+_last_cpu_times = None
 
 @app.route('/api/system-info')
 def get_system_info():
     """Get system information and return as JSON"""
-    system_info = {
-        'architecture': get_architecture(),
-        'cpu': get_cpu_info(),
-        'gpu': get_gpu_info(),
-        'ram': get_ram_info(),
-        'os': get_os_info()
+    return jsonify(collect_system_info())
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Get current CPU, memory and GPU utilization and return as JSON"""
+    return jsonify(collect_metrics())
+
+def collect_system_info():
+    """Get system information, detecting it on first use"""
+    global _system_info
+    if _system_info is None:
+        _system_info = {
+            'architecture': get_architecture(),
+            'cpu': get_cpu_info(),
+            'gpu': get_gpu_info(),
+            'ram': get_ram_info(),
+            'os': get_os_info()
+        }
+    return _system_info
+
+def collect_metrics():
+    """Get current utilization percentages"""
+    return {
+        'cpu_percent': get_cpu_usage(),
+        'memory_percent': get_memory_usage(),
+        'gpu_percent': get_gpu_usage()
     }
-    return jsonify(system_info)
+
+def get_cpu_usage():
+    """Get CPU usage since the previous call, in percent"""
+    global _last_cpu_times
+    try:
+        import psutil
+        return psutil.cpu_percent(interval=None)
+    except ImportError:
+        pass
+
+    try:
+        with open('/proc/stat', 'r') as f:
+            fields = [int(value) for value in f.readline().split()[1:]]
+        # idle + iowait count as idle time
+        idle, total = fields[3] + fields[4], sum(fields)
+        previous = _last_cpu_times
+        _last_cpu_times = (idle, total)
+        if previous and total > previous[1]:
+            return round(100.0 * (1 - (idle - previous[0]) / (total - previous[1])), 1)
+    except Exception:
+        pass
+    return None
+
+def get_memory_usage():
+    """Get memory usage in percent"""
+    try:
+        import psutil
+        return psutil.virtual_memory().percent
+    except ImportError:
+        pass
+
+    try:
+        meminfo = {}
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                meminfo[key] = int(value.split()[0])
+        return round(100.0 * (1 - meminfo['MemAvailable'] / meminfo['MemTotal']), 1)
+    except Exception:
+        pass
+    return None
+
+def get_gpu_usage():
+    """Get GPU utilization in percent (NVIDIA only)"""
+    try:
+        output = subprocess.check_output(
+            ['nvidia-smi', '--query-gpu=utilization.gpu', '--format=csv,noheader,nounits'],
+            stderr=subprocess.DEVNULL, timeout=2
+        ).decode().strip()
+        values = [float(line) for line in output.split('\n') if line.strip()]
+        if values:
+            return round(sum(values) / len(values), 1)
+    except Exception:
+        pass
+    return None
 
 def get_architecture():
     """Get system architecture"""
@@ -235,15 +339,12 @@ def get_os_info():
     
     return platform.system()
 
+# The fleet view reports this node without an HTTP round trip to itself
+register_local_node(collect_system_info, collect_metrics)
+
 if __name__ == '__main__':
     # If run directly, print system info to stdout
-    system_info = {
-        'architecture': get_architecture(),
-        'cpu': get_cpu_info(),
-        'gpu': get_gpu_info(),
-        'ram': get_ram_info(),
-        'os': get_os_info()
-    }
+    system_info = collect_system_info()
     print(json.dumps(system_info, indent=2))
     
     # If --serve flag is provided, start the API server
@@ -251,4 +352,6 @@ if __name__ == '__main__':
         port = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
         print(f"Starting system info API server on port {port}...")
         print(f"API will be available at http://localhost:{port}/api/system-info")
+        # Apply the configured power mode and follow the [Power] policy
+        get_governor().start()
         app.run(host='0.0.0.0', port=port, debug=False)
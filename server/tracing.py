@@ -0,0 +1,393 @@
+import os
+import re
+import sys
+import json
+import time
+import secrets
+import threading
+import collections
+import contextvars
+from contextlib import contextmanager
+from flask import Blueprint, Response, g, request, jsonify
+
+# Completed traces are kept in memory, oldest evicted first
+MAX_TRACES = int(os.environ.get("FUSIONLOOM_TRACE_MAX_TRACES", "2000"))
+MAX_SPANS_PER_TRACE = 256
+
+# Requests to these paths are not traced: the trace and profile endpoints
+# themselves, and static files
+UNTRACED_PREFIXES = ("/api/traces", "/api/profile", "/static")
+
+# Profiles are limited in length; shorter intervals cost more CPU
+MAX_PROFILE_SECONDS = 60
+MIN_PROFILE_INTERVAL_MS = 1
+# Leaf functions of threads that are only waiting
+IDLE_FUNCTIONS = {"wait", "wait_for", "select", "poll", "accept", "get", "_wait_for_tstate_lock",
+                  "serve_forever", "readinto", "recv", "recv_into", "sleep"}
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+tracing = Blueprint('tracing', __name__)
+
+_current = contextvars.ContextVar("fusionloom_span", default=None)
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(self, name, trace_id=None, parent_id=None, start=None, **attributes):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start if start is not None else time.time()
+        self.duration_ms = None
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, status=None, end=None):
+        """Finish the span and hand it to the store; later calls are ignored"""
+        if self.duration_ms is not None:
+            return
+        if status:
+            self.status = status
+        self.duration_ms = round(((end if end is not None else time.time()) - self.start) * 1000, 3)
+        get_trace_store().add(self)
+
+    def record_child(self, name, start, duration_ms, **attributes):
+        """Add an already-finished child span, e.g. a phase timed by an upstream service"""
+        child = Span(name, trace_id=self.trace_id, parent_id=self.span_id, start=start, **attributes)
+        child.end(end=start + duration_ms / 1000)
+        return child
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+class TraceStore:
+    """Bounded store of spans grouped by trace"""
+
+    def __init__(self, max_traces=MAX_TRACES):
+        self.max_traces = max_traces
+        self.lock = threading.Lock()
+        self.traces = collections.OrderedDict()
+        self.dropped_spans = 0
+
+    def add(self, span):
+        with self.lock:
+            spans = self.traces.get(span.trace_id)
+            if spans is None:
+                spans = self.traces[span.trace_id] = []
+                while len(self.traces) > self.max_traces:
+                    self.traces.popitem(last=False)
+            if len(spans) >= MAX_SPANS_PER_TRACE:
+                self.dropped_spans += 1
+                return
+            spans.append(span.to_dict())
+
+    def get(self, trace_id):
+        with self.lock:
+            spans = self.traces.get(trace_id)
+            return sorted(spans, key=lambda span: span["start"]) if spans else None
+
+    def summaries(self, name=None, min_duration_ms=None, since=None, status=None, limit=100):
+        """Summarize the newest traces matching the filters"""
+        with self.lock:
+            traces = list(self.traces.items())
+        results = []
+        for trace_id, spans in reversed(traces):
+            spans = list(spans)
+            # The root may have a remote parent, so look for spans whose parent is not stored here
+            ids = {span["span_id"] for span in spans}
+            roots = [span for span in spans if span["parent_id"] not in ids]
+            roots = [span for span in roots if span["attributes"].get("source") != "client"] or roots or spans
+            root = min(roots, key=lambda span: span["start"])
+            start = min(span["start"] for span in spans)
+            end = max(span["start"] + (span["duration_ms"] or 0) / 1000 for span in spans)
+            summary = {
+                "trace_id": trace_id,
+                "name": root["name"],
+                "start": start,
+                "duration_ms": round((end - start) * 1000, 3),
+                "spans": len(spans),
+                "status": "error" if any(span["status"] == "error" for span in spans) else "ok"
+            }
+            if name and name not in summary["name"]:
+                continue
+            if min_duration_ms is not None and summary["duration_ms"] < min_duration_ms:
+                continue
+            if since is not None and start < since:
+                continue
+            if status and summary["status"] != status:
+                continue
+            results.append(summary)
+            if len(results) >= limit:
+                break
+        return results
+
+    def export(self):
+        with self.lock:
+            return [{"trace_id": trace_id, "spans": list(spans)} for trace_id, spans in self.traces.items()]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "traces": len(self.traces),
+                "spans": sum(len(spans) for spans in self.traces.values()),
+                "max_traces": self.max_traces,
+                "dropped_spans": self.dropped_spans
+            }
+
+_trace_store = None
+_trace_store_lock = threading.Lock()
+
+def get_trace_store():
+    """Return the shared TraceStore, creating it on first use"""
+    global _trace_store
+    with _trace_store_lock:
+        if _trace_store is None:
+            _trace_store = TraceStore()
+        return _trace_store
+
+def current_span():
+    return _current.get()
+
+def start_span(name, **attributes):
+    """Start a child of the current span (or a new trace); call end() on it"""
+    parent = _current.get()
+    if parent is None:
+        return Span(name, **attributes)
+    return Span(name, trace_id=parent.trace_id, parent_id=parent.span_id, **attributes)
+
+@contextmanager
+def span(name, **attributes):
+    """Trace a with block as a child of the current span"""
+    current = start_span(name, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=str(e) or type(e).__name__)
+        current.status = "error"
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+def inject_headers(headers, current=None):
+    """Add the W3C traceparent header for the current span to headers"""
+    current = current or _current.get()
+    if current is not None:
+        headers['traceparent'] = current.traceparent()
+    return headers
+
+def record_ollama_timings(parent, chunk, started):
+    """Turn the durations in Ollama's final response into spans
+
+    Ollama reports nanoseconds for model loading, prompt evaluation and
+    generation; the phases run in that order from when the request was sent.
+    """
+    timings = {key: chunk[key] / 1e6 for key in
+               ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+               if isinstance(chunk.get(key), (int, float))}
+    parent.set(**{f"ollama.{key}_ms": round(value, 3) for key, value in timings.items()})
+    for key in ("prompt_eval_count", "eval_count"):
+        if key in chunk:
+            parent.set(**{f"ollama.{key}": chunk[key]})
+    if chunk.get("eval_count") and timings.get("eval_duration"):
+        parent.set(**{"ollama.tokens_per_second": round(chunk["eval_count"] / timings["eval_duration"] * 1000, 2)})
+
+    offset = started
+    for name, key in (("ollama.load", "load_duration"), ("ollama.prompt_eval", "prompt_eval_duration"),
+                      ("ollama.eval", "eval_duration")):
+        if key in timings:
+            parent.record_child(name, offset, timings[key])
+            offset += timings[key] / 1000
+
+# Request spans
+
+@tracing.before_app_request
+def begin_request_span():
+    if request.path.startswith(UNTRACED_PREFIXES):
+        _current.set(None)
+        return
+    trace_id = parent_id = None
+    match = TRACEPARENT.match(request.headers.get('traceparent', ''))
+    if match:
+        trace_id, parent_id = match.groups()
+    root = Span(f"{request.method} {request.path}", trace_id=trace_id, parent_id=parent_id,
+                **{"http.method": request.method, "http.path": request.path})
+    _current.set(root)
+    g.trace_root = root
+
+@tracing.after_app_request
+def finish_request_span(response):
+    root = g.get('trace_root')
+    if root is None:
+        return response
+    if request.url_rule is not None:
+        root.set(**{"http.route": request.url_rule.rule})
+    root.set(**{"http.status": response.status_code})
+    response.headers['traceparent'] = root.traceparent()
+    response.headers['X-Trace-Id'] = root.trace_id
+    # Streamed responses finish when the last chunk has been sent
+    response.call_on_close(lambda: root.end(status="error" if response.status_code >= 500 else None))
+    return response
+
+@tracing.teardown_app_request
+def fail_request_span(error):
+    root = g.get('trace_root')
+    if root is not None and error is not None:
+        root.set(error=str(error))
+        root.end(status="error")
+
+# Sampling profiler
+
+_profile_lock = threading.Lock()
+
+def frame_label(frame):
+    code = frame.f_code
+    # Labels use the definition line so samples anywhere in a function merge
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+def sample_stacks(seconds, interval, include_idle=False):
+    """Sample every thread's stack; returns ({folded stack: count}, samples taken)
+
+    Stacks are root-first and ';'-separated, as flamegraph.pl and
+    speedscope expect, with the thread name as the root frame.
+    """
+    own = threading.get_ident()
+    counts = collections.Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            if not include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+    return counts, samples
+
+# Trace endpoints
+
+@tracing.route('/api/traces')
+def list_traces():
+    """Summaries of recent traces, newest first
+
+    Filters: name (substring of the root span name), min_duration_ms,
+    since (epoch seconds), status (ok or error) and limit.
+    """
+    args = request.args
+    try:
+        min_duration = float(args['min_duration_ms']) if args.get('min_duration_ms') else None
+        since = float(args['since']) if args.get('since') else None
+        limit = min(max(int(args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': "'min_duration_ms' and 'since' must be numbers and 'limit' an integer"}), 400
+    store = get_trace_store()
+    return jsonify({
+        'traces': store.summaries(name=request.args.get('name'), min_duration_ms=min_duration, since=since,
+                                  status=request.args.get('status'), limit=limit),
+        'store': store.stats()
+    })
+
+@tracing.route('/api/traces/<trace_id>')
+def get_trace(trace_id):
+    spans = get_trace_store().get(trace_id)
+    if spans is None:
+        return jsonify({'error': 'Unknown trace'}), 404
+    return jsonify({'trace_id': trace_id, 'spans': spans})
+
+@tracing.route('/api/traces/spans', methods=['POST'])
+def add_client_spans():
+    """Record spans measured elsewhere, e.g. browser timings for a request
+
+    Body: {"spans": [{"trace_id", "name", "start", "duration_ms", ...}]}.
+    """
+    body = request.get_json(silent=True) or {}
+    added = 0
+    for item in body.get('spans', [])[:MAX_SPANS_PER_TRACE]:
+        try:
+            client_span = Span(str(item['name']), trace_id=str(item['trace_id']), parent_id=item.get('parent_id'),
+                               start=float(item['start']), **dict(item.get('attributes') or {}, source='client'))
+            client_span.end(status=item.get('status'), end=client_span.start + float(item['duration_ms']) / 1000)
+            added += 1
+        except (KeyError, TypeError, ValueError):
+            continue
+    return jsonify({'added': added}), 201
+
+@tracing.route('/api/traces/export')
+def export_traces():
+    """Download all stored traces as JSON
+
+    ?format=chrome produces Trace Event Format for chrome://tracing and Perfetto.
+    """
+    traces = get_trace_store().export()
+    if request.args.get('format') == 'chrome':
+        events = []
+        for pid, trace in enumerate(traces, 1):
+            for item in trace['spans']:
+                events.append({
+                    'name': item['name'], 'ph': 'X', 'pid': pid, 'tid': 1,
+                    'ts': item['start'] * 1e6, 'dur': (item['duration_ms'] or 0) * 1000,
+                    'args': dict(item['attributes'], trace_id=item['trace_id'], span_id=item['span_id'])
+                })
+        data = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    else:
+        data = {'exported_at': time.time(), 'traces': traces}
+    response = Response(json.dumps(data), mimetype='application/json')
+    response.headers['Content-Disposition'] = f"attachment; filename=fusionloom-traces-{int(time.time())}.json"
+    return response
+
+@tracing.route('/api/profile')
+def profile():
+    """Sample the running server's threads and return their stacks
+
+    ?seconds=5&interval_ms=10. The default text response is the folded
+    format read by flamegraph.pl and speedscope; ?format=json returns
+    {"stacks": {stack: count}}. Idle threads are skipped unless ?idle=1.
+    """
+    seconds = min(max(request.args.get('seconds', 5.0, type=float), 0.1), MAX_PROFILE_SECONDS)
+    interval = max(request.args.get('interval_ms', 10.0, type=float), MIN_PROFILE_INTERVAL_MS) / 1000
+    include_idle = request.args.get('idle', '').lower() in ('1', 'true', 'yes')
+
+    if not _profile_lock.acquire(blocking=False):
+        return jsonify({'error': 'A profile is already running'}), 409
+    try:
+        started = time.time()
+        counts, samples = sample_stacks(seconds, interval, include_idle=include_idle)
+    finally:
+        _profile_lock.release()
+
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'started': started,
+            'seconds': seconds,
+            'interval_ms': interval * 1000,
+            'samples': samples,
+            'stacks': dict(counts.most_common())
+        })
+    folded = "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+    return Response(folded + "\n", mimetype='text/plain')
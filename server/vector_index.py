@@ -0,0 +1,180 @@
+import os
+import json
+import threading
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many vectors an exact scan is already fast enough
+IVF_MIN_VECTORS = 2048
+# Retrain the coarse quantizer once the index has grown by this factor
+IVF_RETRAIN_GROWTH = 4
+IVF_MAX_LISTS = 4096
+IVF_TRAIN_SAMPLE = 20000
+IVF_TRAIN_ITERATIONS = 10
+IVF_DEFAULT_NPROBE = 8
+
+class VectorIndex:
+    """On-disk inverted-file (IVF) index over unit-length float32 vectors
+
+    Vectors are appended to a flat file and addressed by position. Once the
+    index is large enough, a k-means coarse quantizer assigns every vector to
+    a list, and searches only score the vectors in the nprobe lists closest
+    to the query. Scores are inner products, i.e. cosine similarity for
+    normalized embeddings.
+    """
+
+    def __init__(self, path, dim):
+        self.path = Path(path)
+        self.dim = dim
+        self.lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+
+        self.vectors_file = self.path / "vectors.f32"
+        self.assignments_file = self.path / "assignments.i32"
+        self.centroids_file = self.path / "centroids.npy"
+        self.meta_file = self.path / "index.json"
+
+        self.centroids = None
+        self.trained_size = 0
+        self._load()
+
+    def _load(self):
+        """Read the index files into memory"""
+        vectors = np.zeros((0, self.dim), dtype=np.float32)
+        if self.vectors_file.exists():
+            vectors = np.fromfile(self.vectors_file, dtype=np.float32)
+            # Drop a partially written trailing row left by an interrupted append
+            rows = len(vectors) // self.dim
+            vectors = vectors[:rows * self.dim].reshape(rows, self.dim)
+
+        self.count = len(vectors)
+        self._vectors = np.zeros((max(1024, self.count * 2), self.dim), dtype=np.float32)
+        self._vectors[:self.count] = vectors
+        self._assignments = np.full(len(self._vectors), -1, dtype=np.int32)
+
+        if self.meta_file.exists() and self.centroids_file.exists():
+            with open(self.meta_file, 'r') as f:
+                meta = json.load(f)
+            self.trained_size = meta.get("trained_size", 0)
+            self.centroids = np.load(self.centroids_file)
+
+            assignments = np.fromfile(self.assignments_file, dtype=np.int32) if self.assignments_file.exists() else []
+            known = min(len(assignments), self.count)
+            self._assignments[:known] = assignments[:known]
+            if known < self.count:
+                # Vectors appended after the last assignment write
+                self._assignments[known:self.count] = self._assign(self._vectors[known:self.count])
+                self._write_assignments()
+
+    def _grow(self, needed):
+        """Grow the in-memory buffers to hold at least needed vectors"""
+        if needed <= len(self._vectors):
+            return
+        capacity = max(needed, len(self._vectors) * 2)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.count] = self._vectors[:self.count]
+        assignments = np.full(capacity, -1, dtype=np.int32)
+        assignments[:self.count] = self._assignments[:self.count]
+        self._vectors, self._assignments = vectors, assignments
+
+    def _assign(self, vectors):
+        """Return the nearest centroid for each vector"""
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _write_assignments(self):
+        tmp = self.assignments_file.with_suffix(".tmp")
+        self._assignments[:self.count].tofile(tmp)
+        os.replace(tmp, self.assignments_file)
+
+    def add(self, vectors):
+        """Append vectors and return their positions"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self.lock:
+            start = self.count
+            self._grow(start + len(vectors))
+            self._vectors[start:start + len(vectors)] = vectors
+            self.count += len(vectors)
+
+            with open(self.vectors_file, "ab") as f:
+                f.write(vectors.tobytes())
+
+            if self.centroids is not None:
+                assignments = self._assign(vectors)
+                self._assignments[start:self.count] = assignments
+                with open(self.assignments_file, "ab") as f:
+                    f.write(assignments.tobytes())
+
+            if self.count >= IVF_MIN_VECTORS and self.count >= self.trained_size * IVF_RETRAIN_GROWTH:
+                self.train()
+
+            return list(range(start, self.count))
+
+    def train(self):
+        """(Re)build the coarse quantizer with spherical k-means"""
+        with self.lock:
+            data = self._vectors[:self.count]
+            nlist = int(min(IVF_MAX_LISTS, max(16, np.sqrt(self.count))))
+            rng = np.random.default_rng(0)
+            sample = data[rng.choice(self.count, min(self.count, IVF_TRAIN_SAMPLE), replace=False)]
+
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(IVF_TRAIN_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # Empty lists keep their previous centroid
+                filled = norms[:, 0] > 0
+                centroids[filled] = sums[filled] / norms[filled]
+
+            self.centroids = centroids.astype(np.float32)
+            self.trained_size = self.count
+            self._assignments[:self.count] = self._assign(data)
+
+            np.save(self.centroids_file, self.centroids)
+            self._write_assignments()
+            with open(self.meta_file, 'w') as f:
+                json.dump({"trained_size": self.trained_size, "nlist": nlist, "dim": self.dim}, f)
+
+    def search(self, query, k=10, nprobe=IVF_DEFAULT_NPROBE, allowed=None):
+        """Return [(position, score)] for the k best matches
+
+        allowed is an optional boolean mask over positions; positions where it
+        is False (deleted or filtered out) are never returned.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self.lock:
+            if self.count == 0:
+                return []
+
+            if self.centroids is None:
+                candidates = np.arange(self.count)
+            else:
+                probe = np.argsort(self.centroids @ query)[-nprobe:]
+                candidates = np.nonzero(np.isin(self._assignments[:self.count], probe))[0]
+
+            if allowed is not None:
+                candidates = candidates[allowed[candidates]]
+            if len(candidates) == 0:
+                return []
+
+            scores = self._vectors[candidates] @ query
+
+        k = min(k, len(candidates))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(candidates[i]), float(scores[i])) for i in best]
+
+    def stats(self):
+        """Return a summary of the index state"""
+        with self.lock:
+            return {
+                "vectors": self.count,
+                "trained": self.centroids is not None,
+                "lists": 0 if self.centroids is None else len(self.centroids),
+                "trained_size": self.trained_size
+            }
@@ -4,7 +4,8 @@
 import { showNotification } from '../../modules/notifications.js';
 
 // OpenAI API endpoint and key
-let openaiEndpoint = 'https://api.openai.com/v1/chat/completions';
+// Requests go through the backend, which queues them to stay under the rate limits
+let openaiEndpoint = 'http://localhost:5050/api/providers/openai/v1/chat/completions';
 let openaiApiKey = '';
 
 /**
@@ -4,7 +4,8 @@
 import { showNotification } from '../../modules/notifications.js';
 
 // Claude API endpoint and key
-let claudeEndpoint = 'https://api.anthropic.com/v1/messages';
+// Requests go through the backend, which queues them to stay under the rate limits
+let claudeEndpoint = 'http://localhost:5050/api/providers/anthropic/v1/messages';
 let claudeApiKey = '';
 
 /**
@@ -4,7 +4,8 @@
 import { showNotification } from '../../modules/notifications.js';
 
 // Gemini API endpoint and key
-let geminiEndpoint = 'https://generativelanguage.googleapis.com/v1/models';
+// Requests go through the backend, which queues them to stay under the rate limits
+let geminiEndpoint = 'http://localhost:5050/api/providers/gemini/v1/models';
 let geminiApiKey = '';
 
 /**
@@ -1,6 +1,13 @@
 // FusionLoom v0.3 - LLM Chat History Module
 // Manages chat history for all LLM providers
 
+// Backend service that indexes chats for semantic search
+const HISTORY_API = 'http://localhost:5050/api/history';
+
+// Delay before a saved chat is sent for indexing, so bursts of saves coalesce
+const INDEX_DEBOUNCE_MS = 1000;
+const pendingIndexTimers = new Map();
+
 /**
  * Generate a unique ID for a new chat
  * @returns {string} A unique ID
@@ -88,6 +95,52 @@ export function saveChat(provider, chatId, chatData) {
     };
     
     saveChatHistory(provider, history);
+    scheduleChatIndexing(provider, chatId);
+}
+
+/**
+ * Send a saved chat to the backend for semantic indexing, debounced per chat
+ * @param {string} provider - The LLM provider
+ * @param {string} chatId - The ID of the chat
+ */
+function scheduleChatIndexing(provider, chatId) {
+    const timerKey = `${provider}:${chatId}`;
+    clearTimeout(pendingIndexTimers.get(timerKey));
+    
+    pendingIndexTimers.set(timerKey, setTimeout(() => {
+        pendingIndexTimers.delete(timerKey);
+        const chat = loadChat(provider, chatId);
+        if (!chat) return;
+        
+        fetch(`${HISTORY_API}/index`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                provider: provider,
+                chat_id: chatId,
+                chat_name: chat.name,
+                messages: chat.messages || []
+            })
+        }).catch(error => {
+            // Search indexing is best-effort; the chat is already saved locally
+            console.warn('Could not index chat for search:', error);
+        });
+    }, INDEX_DEBOUNCE_MS));
+}
+
+/**
+ * Remove a chat from the backend's semantic index
+ * @param {string} provider - The LLM provider
+ * @param {string} chatId - The ID of the chat
+ */
+function removeChatFromIndex(provider, chatId) {
+    const timerKey = `${provider}:${chatId}`;
+    clearTimeout(pendingIndexTimers.get(timerKey));
+    pendingIndexTimers.delete(timerKey);
+    
+    fetch(`${HISTORY_API}/index/${encodeURIComponent(provider)}/${encodeURIComponent(chatId)}`, {
+        method: 'DELETE'
+    }).catch(error => console.warn('Could not remove chat from search index:', error));
 }
 
 /**
@@ -113,6 +166,7 @@ export function deleteChat(provider, chatId) {
     if (history[chatId]) {
         delete history[chatId];
         saveChatHistory(provider, history);
+        removeChatFromIndex(provider, chatId);
         return true;
     }
     
@@ -220,7 +274,18 @@ export function importChatHistory(provider, jsonData) {
             }
         }
         
+        // The import replaces the whole history: chats it drops or overwrites
+        // leave the search index, and every imported chat is indexed afresh
+        const previous = getChatHistory(provider);
         saveChatHistory(provider, history);
+        for (const chatId in previous) {
+            if (JSON.stringify(previous[chatId]) !== JSON.stringify(history[chatId])) {
+                removeChatFromIndex(provider, chatId);
+            }
+        }
+        for (const chatId in history) {
+            scheduleChatIndexing(provider, chatId);
+        }
         return true;
     } catch (error) {
         console.error('Error importing chat history:', error);
@@ -233,7 +298,11 @@ export function importChatHistory(provider, jsonData) {
  * @param {string} provider - The LLM provider
  */
 export function clearChatHistory(provider) {
+    const history = getChatHistory(provider);
     saveChatHistory(provider, {});
+    for (const chatId in history) {
+        removeChatFromIndex(provider, chatId);
+    }
 }
 
 /**
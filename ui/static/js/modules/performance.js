@@ -1,21 +1,27 @@
 // FusionLoom v0.3 - Performance Module
 
+const API_BASE = 'http://localhost:5050/api';
+
 /**
- * Update all performance gauges with random values (for demo purposes)
- * In a real implementation, this would fetch actual system metrics
+ * Update all performance gauges with the server's current utilization
+ * Metrics the server cannot measure (e.g. GPU without nvidia-smi) show 0%
  */
 export function updatePerformanceGauges() {
-    // CPU usage (random value between 10% and 80%)
-    const cpuUsage = Math.floor(Math.random() * 70) + 10;
-    updateGauge('cpu', cpuUsage);
-    
-    // Memory usage (random value between 20% and 90%)
-    const memoryUsage = Math.floor(Math.random() * 70) + 20;
-    updateGauge('memory', memoryUsage);
-    
-    // GPU usage (random value between 0% and 100%)
-    const gpuUsage = Math.floor(Math.random() * 100);
-    updateGauge('gpu', gpuUsage);
+    fetch(`${API_BASE}/metrics`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`API returned ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(metrics => {
+            updateGauge('cpu', Math.round(metrics.cpu_percent || 0));
+            updateGauge('memory', Math.round(metrics.memory_percent || 0));
+            updateGauge('gpu', Math.round(metrics.gpu_percent || 0));
+        })
+        .catch(error => {
+            console.error('Error fetching performance metrics:', error);
+        });
 }
 
 /**